@@ -17,6 +17,7 @@ except Exception:
 
 from ..settings import OLLAMA_MODEL
 from ...services.chatbot_service import text_to_flags
+from ...services.guardrails import get_matcher
 from .crisis_flow import crisis_response
 
 PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
@@ -25,7 +26,7 @@ def _load(path: Path) -> str:
     return path.read_text(encoding="utf-8") if path.exists() else ""
 
 SYSTEM = _load(PROMPTS_DIR / "system_sano.txt")
-BLOCKLIST = [l.strip() for l in _load(PROMPTS_DIR / "guardrails_bloqueo.txt").splitlines() if l.strip()]
+# BLOCKLIST (guardrails_bloqueo.txt) se carga en services/guardrails
 ESCALATION = _load(PROMPTS_DIR / "escalation_templates.txt")
 
 # Personas disponibles para el avatar (niño, niña, tortuga)
@@ -35,9 +36,16 @@ PERSONAS: Dict[str, str] = {
     "tortuga": "Tono pausado, invita a ir lento y respirar, usa visualizaciones de seguridad."
 }
 
+FALLBACK_REPLY = (
+    "Gracias por confiarme esto. Estoy aquí contigo. "
+    "¿Te parece si hacemos una respiración 4-4-6 (inhala 4, sostén 4, exhala 6) "
+    "y luego me cuentas qué parte se siente más pesada ahora mismo?\n"
+    "Si en algún momento te sientes en riesgo, puedo mostrarte el botón SOS "
+    "o ayudarte a contactar a la Línea de la Vida (800 911 2000) o 911."
+)
+
 def _blocked(text: str) -> bool:
-    t = text.lower()
-    return any(p in t for p in BLOCKLIST)
+    return get_matcher().has_flag(text, "blocklist")
 
 def generate_response(user_text: str, persona: str = "tortuga") -> str:
     """
@@ -71,10 +79,10 @@ def generate_response(user_text: str, persona: str = "tortuga") -> str:
             pass
 
     # Fallback sin LLM: respuesta empática breve y segura
-    return (
-        "Gracias por confiarme esto. Estoy aquí contigo. "
-        "¿Te parece si hacemos una respiración 4-4-6 (inhala 4, sostén 4, exhala 6) "
-        "y luego me cuentas qué parte se siente más pesada ahora mismo?\n"
-        "Si en algún momento te sientes en riesgo, puedo mostrarte el botón SOS "
-        "o ayudarte a contactar a la Línea de la Vida (800 911 2000) o 911."
-    )
+    return FALLBACK_REPLY
+
+def fallback_response(user_text: str) -> str:
+    """Respuesta segura sin LLM (también la usa /ai/* cuando el circuito del LLM está abierto)."""
+    if "explicit_ideation" in text_to_flags(user_text) or _blocked(user_text):
+        return crisis_response(user_text)
+    return FALLBACK_REPLY
@@ -40,6 +40,10 @@ def connect_to_mongo():
     # appointments: consulta rápida por usuario + when
     _db.appointments.create_index([("user_id", 1), ("when", 1)])
 
+    # translation_cache: expira por TTL (expires_at) y se recorta por antigüedad
+    _db.translation_cache.create_index("expires_at", expireAfterSeconds=0)
+    _db.translation_cache.create_index("created_at")
+
     return _db
 
 
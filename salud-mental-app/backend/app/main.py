@@ -2,7 +2,7 @@
 """
 App FastAPI: CORS, lifespan (startup/shutdown), routers + middleware de trazas.
 """
-import logging, time
+import asyncio, logging, time
 
 # ⬇️ AÑADE ESTO MUY ARRIBA, ANTES DE IMPORTAR CUALQUIER ROUTER
 from dotenv import load_dotenv, find_dotenv
@@ -10,10 +10,18 @@ load_dotenv(find_dotenv(), override=True)  # carga backend/.env
 
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from .db.mongo import connect_to_mongo, disconnect_from_mongo
+from .services.ollama_client import connect_ollama, close_ollama, pool_stats, run_health_checks
+from .services.model_warmup import OLLAMA_WARM_MODELS, model_warmer
+from .services.model_router import MODEL_ROUTING_MODELS
+from .services.greeting_pool import greeting_pool
+from .services.circuit_breaker import CircuitOpen, all_stats as breaker_stats
+from .services import deadline
 from .core.config import settings
+from .telemetry.timing import current_spans, finish_request, observe_late_spans, start_request
 from .routes import (
     auth, users, therapists, assessments, triage, sos,
     notifications, directory, content, ads, appointments,
@@ -30,7 +38,22 @@ http_logger = logging.getLogger("app.http")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     connect_to_mongo()
+    connect_ollama()          # pool HTTP keep-alive compartido por los /ai/* (uno o varios hosts)
+    health_task = asyncio.create_task(run_health_checks())   # saca/readmite hosts de OLLAMA_HOSTS
+    # precarga + keep-alive de OLLAMA_MODEL, OLLAMA_WARM_MODELS y los modelos del ruteo
+    # (con el prefijo de sistema evaluado)
+    warmup_task = asyncio.create_task(
+        model_warmer.run([ai.MODEL_DEFAULT, *OLLAMA_WARM_MODELS, *MODEL_ROUTING_MODELS],
+                         prefixes=[ai.SYSTEM_PREFIX])
+    )
+    catalogs_task = asyncio.create_task(ai.warm_catalogs())   # DASS-21/EEA localizados
+    greetings_task = asyncio.create_task(greeting_pool.run(ai.produce_pooled_greeting))   # saludos pregenerados
     yield
+    greetings_task.cancel()
+    catalogs_task.cancel()
+    warmup_task.cancel()
+    health_task.cancel()
+    await close_ollama()
     disconnect_from_mongo()
 
 app = FastAPI(title="Salud Mental API", version="0.1.0", lifespan=lifespan)
@@ -48,20 +71,50 @@ app.add_middleware(
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start = time.time()
+    timing = start_request(request.url.path)   # spans por etapa (solo /ai y /flows)
+    spans = current_spans()
+    # deadline por clase de endpoint (el cliente puede acortarlo con X-Request-Deadline-Ms)
+    budget = deadline.start_request(request.url.path, request.headers.get(deadline.DEADLINE_HEADER))
     try:
         response = await call_next(request)
         dur = round(time.time() - start, 4)
         http_logger.info(f"{request.method} {request.url.path} -> {response.status_code} in {dur}s")
+        if timing is not None:
+            flushed = len(spans)
+            server_timing = finish_request(timing)
+            timing = None
+            if server_timing:
+                response.headers.append("Server-Timing", f"{server_timing}, total;dur={dur * 1000:.1f}")
+            # SSE: las etapas del cuerpo corren después del header; van a los histogramas al terminar
+            response.body_iterator = observe_late_spans(response.body_iterator, spans, flushed)
         return response
     except Exception as e:
         dur = round(time.time() - start, 4)
         http_logger.exception(f"{request.method} {request.url.path} EXC after {dur}s: {e}")
         raise
+    finally:
+        if timing is not None:
+            finish_request(timing)
+        deadline.finish_request(budget)
+
+# ---------------- Backend caído: 503 inmediato ----------------
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request: Request, exc: CircuitOpen):
+    return JSONResponse({"detail": f"Servicio temporalmente no disponible ({exc.name})"},
+                        status_code=503, headers={"Retry-After": str(exc.retry_after)})
+
+# ---------------- Deadline de la petición agotado: 504 ----------------
+@app.exception_handler(deadline.DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: deadline.DeadlineExceeded):
+    return JSONResponse({"detail": f"Tiempo de respuesta agotado ({exc.stage})"}, status_code=504)
 
 # ---------------- Healthcheck ----------------
 @app.get("/health", tags=["misc"])
 async def health():
-    return {"ok": True}
+    # ok = proceso vivo; llm.ready = todos los modelos precargados y residentes;
+    # breakers = estado de los circuitos hacia Ollama/OpenAI; ollama = hosts del pool
+    return {"ok": True, "llm": model_warmer.status(), "breakers": breaker_stats(),
+            "ollama": pool_stats()}
 
 # ---------------- Routers ----------------
 app.include_router(auth.router,         prefix="/auth",         tags=["auth"])
@@ -1,29 +1,57 @@
 # app/routes/ai.py
 # Router FastAPI para IA: Ollama (chat) + OpenAI (náhuatl, TTS)
-import os, re, time, base64, requests, logging, io
-from typing import Tuple, Any
-from fastapi import APIRouter, Query, HTTPException, Body
-from fastapi.responses import StreamingResponse, JSONResponse
-from unidecode import unidecode
-from openai import OpenAI
+import os, re, time, base64, logging, json, mmap, hashlib, asyncio, random, io
+from typing import Tuple, Any, AsyncIterator, BinaryIO, List
+from fastapi import APIRouter, Query, HTTPException, Body, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from openai import AsyncOpenAI
 
-# pip install -U langchain-ollama
-from langchain_ollama import OllamaLLM
+from fastapi.concurrency import run_in_threadpool
 
 # Conexión Mongo compartida
 from ..db.mongo import get_db
 from bson.objectid import ObjectId  # ✅ validar/convertir el sid
+from ..services.guardrails import BANNED_TERMS, get_matcher, normalize
+from ..services.ollama_client import OLLAMA_HOST, OLLAMA_HOSTS, OllamaError, OllamaRequestError, get_ollama
+from ..services.generation_policy import all_stats as policy_stats, policy_for
+from ..services.generation_profiles import (
+    all_stats as profile_stats, generate_with_profile, profile_for, shaped_stream,
+)
+from ..services.model_router import model_router
+from ..services.greeting_pool import NAME_SLOT, greeting_pool
+from ..ai.chains.empathetic_chat import fallback_response
+from ..services.circuit_breaker import CircuitOpen, breaker
+from ..services.deadline import (
+    DeadlineExceeded, bounded, budget, call_mongo, check as check_deadline, mongo_deadline,
+    stats as deadline_stats,
+)
+from ..services.llm_scheduler import (
+    LLMSaturated, PRIORITY_BULK, PRIORITY_CONTENT, PRIORITY_CRISIS, PRIORITY_INTERACTIVE, llm_scheduler,
+)
+from ..telemetry.metrics import histogram, snapshot as metrics_snapshot
+from ..telemetry.timing import span
+from starlette.background import BackgroundTask
+from ..services.batch_translation import NAHUATL_BATCH_MAX_ITEMS, translate_batch
+from ..services.translation_cache import cache_key, translation_cache
+from ..services.singleflight import SingleFlight
+from ..services.tts_cache import audio_cache, audio_key
+from ..services import memory_store
+from ..services.memory_summarizer import MEMORY_MODE, memory_summarizer, render as render_memory
+from ..services.sentence_pipeline import SentenceSplitter, ordered_pipeline
+from ..services.session_cache import session_cache
+from ..services.catalogs import catalog_store
 
 router = APIRouter()
 log = logging.getLogger("uvicorn.info")
 
 # ------------------- Config -------------------
-OLLAMA_HOST   = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
 MODEL_DEFAULT = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 OPENAI_KEY    = os.getenv("OPENAI_API_KEY", "")
 
 TEMPERATURE_DEFAULT = float(os.getenv("LLM_TEMPERATURE", "0.5"))
 TOP_P_DEFAULT       = float(os.getenv("LLM_TOP_P", "0.5"))
+# Más variedad en el pool de saludos pregenerados (cada uno se sirve una sola vez)
+GREETING_POOL_TEMPERATURE = float(os.getenv("GREETING_POOL_TEMPERATURE", "0.9"))
 
 # Voz TTS por defecto (las voces disponibles incluyen: alloy, verse, shimmer, coral, breeze, etc.)
 TTS_VOICE_DEFAULT   = os.getenv("TTS_VOICE", "shimmer")
@@ -32,17 +60,8 @@ TTS_VOICE_DEFAULT   = os.getenv("TTS_VOICE", "shimmer")
 MEMORY_MAX_TURNS = 10  # pares user/assistant a conservar
 
 # ------------------- Guardrails -------------------
-banned_terms = [
-    "suicidio","suicidarme","suicidarse","suicidios","suicidio asistido",
-    "quitarme la vida","me quiero matar","me mato","matarme","matarme ahora",
-    "asesinarme","hacerme daño","autolesion","autolesión","autolesionarme",
-    "lastimarme","me quiero lastimar","ahorcarme","cortarme",
-    "cortarse las venas","cortar las venas","envenenarme","ideación suicida",
-    "ideacion suicida","ideación suicida pasiva","deseo de estar muerto",
-    "desesperanza","falta de propósito","sentirse atrapado","retiro social",
-    "cambios de ánimo","comportamiento imprudente","cortarse / cortes",
-    "quemarse","autolesión / lesión auto-infligida","automutilación"
-]
+# Las listas viven en services/guardrails; el autómata se construye una vez al importar.
+banned_terms = BANNED_TERMS
 
 REFUSAL_PATTERNS = [
     r"\blo siento,\s*pero\s*no puedo\b",
@@ -53,104 +72,279 @@ REFUSAL_PATTERNS = [
     r"\bno puedo generar\b",
     r"\bno puedo hablar\b",
 ]
-
-def normalize(txt: str) -> str:
-    return re.sub(r"\s+", " ", unidecode(txt.lower())).strip()
+_REFUSAL_RE = re.compile("|".join(REFUSAL_PATTERNS), flags=re.IGNORECASE)
 
 def contains_banned(text: str) -> bool:
-    norm = normalize(text)
-    banned_norm = [normalize(t) for t in banned_terms]
-    return any(t in norm for t in banned_norm)
+    return get_matcher().has_flag(text, "banned")
 
 def contains_refusal(text: str) -> bool:
-    t = normalize(text)
-    return any(re.search(pat, t, flags=re.IGNORECASE) for pat in REFUSAL_PATTERNS)
-
-def make_llm(model_name: str, temperature: float, top_p: float):
-    return OllamaLLM(
-        model=model_name,
-        base_url=OLLAMA_HOST,
-        temperature=temperature,
-        top_p=top_p,
-    )
-
-def safe_generate(llm, prompt: str, max_retries=3) -> Tuple[str, float, int, bool]:
+    return _REFUSAL_RE.search(normalize(text)) is not None
+
+def _llm_error(e: Exception) -> HTTPException:
+    if isinstance(e, LLMSaturated):
+        return HTTPException(status_code=e.status_code, detail=f"LLM saturado: {e.reason}",
+                             headers={"Retry-After": str(e.retry_after)})
+    if isinstance(e, OllamaRequestError):   # p. ej. ?model= inexistente: error del cliente
+        return HTTPException(status_code=400, detail=f"Ollama rechazó la petición: {e}")
+    return HTTPException(status_code=500, detail=f"Ollama error: {e}")
+
+# Respuestas seguras cuando el circuito del LLM está abierto (services/circuit_breaker)
+# o se acabó el deadline de la petición (services/deadline)
+_DEGRADED_TEXT = {
+    "saludos": "Hola {name}, soy CoralIA. Me alegra que estés aquí. ¿Cómo te sientes hoy?",
+    "mindfullness": (
+        "1. Siéntate cómodamente y apoya los pies en el suelo. "
+        "2. Inhala por la nariz contando 4. "
+        "3. Sostén el aire contando 4. "
+        "4. Exhala despacio contando 6 y repite tres veces, notando cómo se afloja tu cuerpo."
+    ),
+    "eea": "**{paso}**: escribe con calma y sin juzgarte lo que recuerdas, piensas y sientes en este paso.",
+}
+
+async def _degraded_reply(endpoint: str, name: str, lang: str, sid_oid, model_name: str,
+                          texto_usuario: str = "", **fmt) -> dict:
+    """Circuito abierto o deadline vencido: texto seguro en milisegundos, sin esperar a Ollama."""
+    tpl = _DEGRADED_TEXT.get(endpoint)
+    texto = tpl.format(name=name, **fmt) if tpl else fallback_response(texto_usuario)
+    texto_out = await maybe_translate(texto, lang)
+    if sid_oid:
+        await _remember_reply(sid_oid, texto_out)
+    return {
+        "persona": name, "modelo": model_name, "respuesta": texto_out, "tiempo": 0.0,
+        "intentos": 0, "flagged": False, "degraded": True, "lang": lang
+    }
+
+# Prioridad de admisión por endpoint (services/llm_scheduler): la conversación primero
+ENDPOINT_PRIORITY = {
+    "respuestas": PRIORITY_CRISIS,
+    "saludos": PRIORITY_INTERACTIVE,
+    "eea": PRIORITY_INTERACTIVE,
+    "mindfullness": PRIORITY_CONTENT,
+}
+
+# Coalescencia (single-flight) de prompts idénticos: opt-in por endpoint, porque
+# los usuarios que coinciden comparten el mismo muestreo.
+COALESCE_ENDPOINTS = {
+    e.strip() for e in os.getenv("LLM_COALESCE_ENDPOINTS", "saludos,eea").split(",") if e.strip()
+}
+_llm_flight = SingleFlight()
+
+def _coalesce(endpoint: str) -> bool:
+    return endpoint in COALESCE_ENDPOINTS
+
+STRICT_RULES = (
+    "\n\nREGLA ESTRICTA:\n"
+    "- No uses frases de rechazo como 'no puedo...' ni negativas similares.\n"
+    "- Evita por completo términos de autolesión/suicidio.\n"
+    "- Si el tema es sensible, contiene con empatía, ofrece un micro-paso seguro y termina con una pregunta breve.\n"
+    "- Mantén el español, cálido y respetuoso.\n"
+)
+
+def _passes_guardrails(out: str) -> bool:
+    with span("guardrails"):
+        return not contains_banned(out) and not contains_refusal(out)
+
+async def safe_generate(model_name: str, prompt: str, temperature: float, top_p: float,
+                        max_retries=3, coalesce: bool = False,
+                        endpoint: str | None = None,
+                        system: str | None = None,
+                        priority: int | None = None) -> Tuple[str, float, int, bool]:
     """
     Reintenta si el modelo usa términos prohibidos o frases de rechazo.
+    Usa el cliente Ollama compartido (pool keep-alive); la espera es await, no bloquea hilos.
+    Con `endpoint`, su política (services/generation_policy) elige entre reintentos en serie
+    y LLM_SPECULATIVE_N candidatos especulativos en paralelo según la tasa de salidas marcadas.
+    Con coalesce=True, peticiones concurrentes con el mismo (modelo, temperatura, top_p, prompt)
+    comparten una sola generación en vuelo. `system` (los endpoints pasan SYSTEM_PREFIX) va en el campo
+    system de Ollama para reutilizar el prefijo ya evaluado. La admisión pasa por llm_scheduler
+    (prioridad según ENDPOINT_PRIORITY o `priority`), con un cupo por cada generación simultánea
+    (todos los candidatos en modo especulativo); si está saturado lanza LLMSaturated. La latencia y los
+    reintentos de cada generación alimentan model_router (ruteo de modelo por presupuesto).
     Devuelve: (texto, tiempo, intentos, flagged)
     """
+    policy = policy_for(endpoint) if endpoint else None
+    mode = policy.choose() if policy else "serial"
+    width = policy.speculative_n if mode == "speculative" else 1   # generaciones simultáneas
+
+    if priority is None:
+        priority = ENDPOINT_PRIORITY.get(endpoint, PRIORITY_INTERACTIVE)
+
+    async def _run():
+        with span("llm_queue"):
+            try:
+                release = await llm_scheduler.admit(model_name, priority, max_wait=budget("llm_queue"),
+                                                    permits=width)
+            except LLMSaturated:
+                check_deadline("llm_queue")   # la espera se cortó por el deadline: fallback, no 503
+                raise
+        try:
+            start = time.perf_counter()
+            if mode == "speculative":
+                res = await _speculative_generate(model_name, prompt, temperature, top_p, width,
+                                                  system, endpoint)
+            else:
+                res = await _serial_generate(model_name, prompt, temperature, top_p, max_retries, policy,
+                                             system, endpoint)
+            elapsed = time.perf_counter() - start
+        finally:
+            release()
+        histogram(f"llm.{mode}").observe(elapsed)
+        if endpoint:
+            histogram(f"llm.{mode}.{endpoint}").observe(elapsed)
+            model_router.record(endpoint, model_name, elapsed, res[2] > 1 or res[3])
+        return res
+
+    if not coalesce:
+        return await _run()
+    key = hashlib.sha256(
+        json.dumps([model_name, temperature, top_p, max_retries, mode, system, endpoint, prompt]).encode("utf-8")
+    ).hexdigest()
+    return await _llm_flight.do(key, _run)
+
+async def _serial_generate(model_name: str, prompt: str, temperature: float, top_p: float,
+                           max_retries: int, policy=None, system: str | None = None,
+                           endpoint: str | None = None) -> Tuple[str, float, int, bool]:
+    ollama = get_ollama()
+    profile = profile_for(endpoint)
     out, dur = "", 0.0
     for attempt in range(1, max_retries + 1):
         start = time.time()
-        out = llm.invoke(prompt)
+        with span("llm", f"intento {attempt}"):
+            data = await generate_with_profile(ollama, model_name, prompt, profile, endpoint,
+                                               temperature=temperature, top_p=top_p, system=system)
+        out = data.get("response", "")
         dur = round(time.time() - start, 4)
         log.info(f"[AI attempt {attempt}] out={out!r}")
 
-        if not contains_banned(out) and not contains_refusal(out):
+        ok = _passes_guardrails(out)
+        if policy and attempt == 1:
+            policy.record(not ok)
+        if ok:
             return out.strip(), dur, attempt, False
 
         # Refuerzo de reglas si falló
-        prompt += (
-            "\n\nREGLA ESTRICTA:\n"
-            "- No uses frases de rechazo como 'no puedo...' ni negativas similares.\n"
-            "- Evita por completo términos de autolesión/suicidio.\n"
-            "- Si el tema es sensible, contiene con empatía, ofrece un micro-paso seguro y termina con una pregunta breve.\n"
-            "- Mantén el español, cálido y respetuoso.\n"
-        )
+        prompt += STRICT_RULES
     return out.strip(), dur, max_retries, True
 
-# ------------------- Memoria en Mongo -------------------
-def _ensure_sid(sid: str) -> Any:
+async def _speculative_generate(model_name: str, prompt: str, temperature: float, top_p: float,
+                                n: int, system: str | None = None,
+                                endpoint: str | None = None) -> Tuple[str, float, int, bool]:
     """
-    Valida el sid, lo convierte a ObjectId y verifica que exista una sesión.
-    Soporta 'sessions' y (opcional) 'flow_sessions'.
+    Lanza n candidatos a la vez (el 1º con el prompt original, el resto con reglas estrictas,
+    semillas y temperaturas variadas). Devuelve el primero que pasa los guardrails y cancela el resto.
+    No alimenta la política: los cancelados sesgarían la tasa (ver services/generation_policy).
     """
+    ollama = get_ollama()
+    profile = profile_for(endpoint)
+    start = time.time()
+
+    async def _candidate(i: int):
+        return i, await generate_with_profile(
+            ollama, model_name,
+            prompt if i == 0 else prompt + STRICT_RULES,
+            temperature=min(temperature + 0.1 * i, 1.5),
+            top_p=top_p,
+            system=system,
+            profile=profile, endpoint=endpoint,
+            options={"seed": random.randrange(2**31)},
+        )
+
+    tasks = [asyncio.create_task(_candidate(i)) for i in range(n)]
+    last, done, error = "", 0, None
+    with span("llm", f"especulativo x{n}"):
+        try:
+            for fut in asyncio.as_completed(tasks):
+                try:
+                    i, data = await fut
+                except OllamaError as e:
+                    error = e
+                    continue
+                done += 1
+                out = data.get("response", "")
+                log.info(f"[AI candidate {i} ({done}/{n})] out={out!r}")
+                if _passes_guardrails(out):
+                    return out.strip(), round(time.time() - start, 4), done, False
+                last = out
+            if not done and error is not None:
+                raise error
+            return last.strip(), round(time.time() - start, 4), done, True
+        finally:
+            for t in tasks:
+                t.cancel()   # cierra la conexión: Ollama aborta la generación
+
+# ------------------- Memoria en Mongo -------------------
+def _parse_sid(sid: str) -> ObjectId:
     sid = (sid or "").strip()
     if not sid:
         raise HTTPException(400, "sid faltante")
-
     try:
-        oid = ObjectId(sid)
+        return ObjectId(sid)
     except Exception:
         raise HTTPException(400, "sid inválido")
 
+def _session_exists(oid: ObjectId) -> bool:
     db = get_db()
-    session_doc = (
-        db.get_collection("sessions").find_one({"_id": oid})
-        or db.get_collection("flow_sessions").find_one({"_id": oid})
+    exists = bool(
+        db.get_collection("sessions").find_one({"_id": oid}, {"_id": 1})
+        or db.get_collection("flow_sessions").find_one({"_id": oid}, {"_id": 1})
     )
-    if not session_doc:
+    session_cache.remember(oid, exists)
+    return exists
+
+def _ensure_sid(sid: str) -> Any:
+    """
+    Valida el sid, lo convierte a ObjectId y verifica que exista una sesión.
+    Soporta 'sessions' y (opcional) 'flow_sessions'. Usa la caché de sesiones
+    (positiva y negativa) antes de ir a Mongo.
+    """
+    oid = _parse_sid(sid)
+    known = session_cache.lookup(oid)
+    if known is None:
+        known = _session_exists(oid)
+    if not known:
         raise HTTPException(404, "Sesión no encontrada")
+    return oid
 
+async def _ensure_sid_async(sid: str) -> Any:
+    """Igual que _ensure_sid; solo usa el threadpool si la caché no conoce el sid."""
+    oid = _parse_sid(sid)
+    known = session_cache.lookup(oid)
+    if known is None:
+        with span("sid"):
+            known = await run_in_threadpool(call_mongo, "sid", _session_exists, oid)
+    if not known:
+        raise HTTPException(404, "Sesión no encontrada")
     return oid
 
 def _append_memory(sid_oid, role: str, text: str):
-    db = get_db()
-    db.get_collection("ai_messages").insert_one({
-        "session_id": sid_oid,
-        "role": role,            # "user" / "assistant"
-        "text": text,
-        "ts": time.time(),
-    })
-    # Recortar memoria a los últimos MEMORY_MAX_TURNS*2 mensajes
-    msgs = list(db.get_collection("ai_messages")
-                  .find({"session_id": sid_oid})
-                  .sort("ts", 1))
-    excess = max(0, len(msgs) - (MEMORY_MAX_TURNS * 2))
-    if excess > 0:
-        ids_to_delete = [m["_id"] for m in msgs[:excess]]
-        db.get_collection("ai_messages").delete_many({"_id": {"$in": ids_to_delete}})
+    # Un solo update atómico: $push + $slice a los últimos MEMORY_MAX_TURNS*2 mensajes
+    try:
+        with span("memory_write"), mongo_deadline("memory_write"):
+            memory_store.append(sid_oid, [(role, text)], max_messages=MEMORY_MAX_TURNS * 2)
+    except DeadlineExceeded:
+        log.warning(f"[memory] sin tiempo para guardar el turno ({role}) de {sid_oid}")
+
+async def _remember_reply(sid_oid, text: str) -> None:
+    """Guarda la respuesta del asistente y, en MEMORY_MODE=summary, agenda el resumen incremental."""
+    await run_in_threadpool(_append_memory, sid_oid, "assistant", text)
+    if MEMORY_MODE == "summary":
+        memory_summarizer.schedule(sid_oid)
 
 def _get_memory_text(sid_oid, max_turns: int = MEMORY_MAX_TURNS) -> str:
     """
-    Devuelve un bloque de contexto plano con los últimos turnos user/assistant.
+    Devuelve un bloque de contexto plano con los últimos turnos user/assistant
+    (en MEMORY_MODE=summary: resumen + últimos turnos dentro del presupuesto de tokens).
     """
     if not sid_oid:
         return ""
-    db = get_db()
-    cur = db.get_collection("ai_messages").find({"session_id": sid_oid}).sort("ts", 1)
-    msgs = [{"role": m["role"], "text": m["text"]} for m in cur]
-    msgs = msgs[-max_turns*2:]
+    try:
+        with span("memory_read"), mongo_deadline("memory_read"):
+            if MEMORY_MODE == "summary":
+                summary, msgs = memory_store.get_context(sid_oid, max_turns * 2)
+                return render_memory(summary, msgs)
+            msgs = memory_store.get_messages(sid_oid, max_turns * 2)
+    except DeadlineExceeded:
+        return ""   # sin memoria antes que sin respuesta
     lines = []
     for m in msgs:
         prefix = "Usuario:" if m["role"] == "user" else "Asistente:"
@@ -158,6 +352,22 @@ def _get_memory_text(sid_oid, max_turns: int = MEMORY_MAX_TURNS) -> str:
     return "\n".join(lines)
 
 # ------------------- Prompts -------------------
+# Prefijo de sistema ESTABLE (idéntico para todos los endpoints, idiomas y sesiones): va en el campo
+# `system` de Ollama y siempre al inicio, así el runner reutiliza su KV-cache y solo evalúa el sufijo.
+# Todo lo variable (idioma, memoria, contexto) vive en las plantillas de sufijo.
+TEMPLATE_SISTEMA = """
+Eres CoralIA, acompañante emocional breve, cálido y respetuoso. Sin enlaces.
+
+REGLA DE SEGURIDAD:
+No menciones términos de autolesión/suicidio:
+{lista_prohibidas}
+
+REGLA ANTI-RECHAZO:
+Nunca uses negativas del tipo "no puedo..." ni similares.
+"""
+
+SYSTEM_PREFIX = TEMPLATE_SISTEMA.format(lista_prohibidas=", ".join(banned_terms))
+
 TEMPLATE_SALUDO = """
 {lang_prefix}
 Genera un ÚNICO saludo en el idioma indicado (30–70 palabras).
@@ -167,13 +377,6 @@ No repitas frases de relleno.
 Memoria (resumen de últimos turnos):
 {memoria}
 
-REGLA DE SEGURIDAD:
-No menciones términos de autolesión/suicidio:
-{lista_prohibidas}
-
-REGLA ANTI-RECHAZO:
-Nunca uses negativas del tipo "no puedo..." ni similares.
-
 Contexto: Bienvenida para {name}; enfócate solo en saludar a {name}.
 """
 
@@ -187,13 +390,6 @@ Termina con una pregunta abierta breve para continuar la conversación.
 Memoria (últimos turnos):
 {memoria}
 
-REGLA DE SEGURIDAD:
-No menciones términos de autolesión/suicidio:
-{lista_prohibidas}
-
-REGLA ANTI-RECHAZO:
-Nunca uses negativas del tipo "no puedo..." ni similares.
-
 Contexto y mensaje actual: {contexto}
 """
 
@@ -205,22 +401,6 @@ Genera un ejercicio breve de mindfulness con lista numerada (≥ 4 pasos).
 Memoria resumida:
 {memoria}
 
-REGLA DE SEGURIDAD:
-No menciones términos de autolesión/suicidio:
-{lista_prohibidas}
-
-Contexto: {contexto}
-"""
-
-TEMPLATE_DASS21 = """
-{lang_prefix}
-Genera las 21 preguntas del DASS-21 separadas por saltos de línea, sin encabezados ni enlaces.
-No incluyas el nombre de CoralIA.
-
-REGLA DE SEGURIDAD:
-No menciones términos de autolesión/suicidio:
-{lista_prohibidas}
-
 Contexto: {contexto}
 """
 
@@ -229,10 +409,6 @@ TEMPLATE_EEA = """
 Genera SOLO UN paso del ejercicio de escritura emocional autoreflexiva (EEA) (20–70 palabras),
 usa **negritas** al inicio si el idioma lo permite.
 
-REGLA DE SEGURIDAD:
-No menciones términos de autolesión/suicidio:
-{lista_prohibidas}
-
 Contexto: {contexto}
 """
 
@@ -248,49 +424,102 @@ def crisis_reply(name: str) -> str:
     )
 
 # ------------------- OpenAI helpers (traducción/voz) -------------------
-def require_openai() -> OpenAI:
+TRANSLATE_MODEL = os.getenv("OPENAI_TRANSLATE_MODEL", "gpt-4.1-mini")
+
+_openai_async: AsyncOpenAI | None = None
+
+def require_async_openai() -> AsyncOpenAI:
+    """Cliente OpenAI asíncrono compartido por proceso (para handlers async)."""
+    global _openai_async
     if not OPENAI_KEY:
         raise HTTPException(status_code=400, detail="Falta OPENAI_API_KEY en variables de entorno.")
-    return OpenAI(api_key=OPENAI_KEY)
+    if _openai_async is None:
+        _openai_async = AsyncOpenAI(api_key=OPENAI_KEY)
+    return _openai_async
 
-def translate_es_to_nah(text: str) -> str:
+_translate_flight = SingleFlight()
+
+async def translate_es_to_nah(text: str) -> str:
     """
     Traduce español → náhuatl preservando estructura y longitud relativa.
+    Consulta primero la caché (L1 en proceso, L2 en Mongo); solo los fallos llaman a OpenAI.
     """
+    cached = translation_cache.get_local(text, TRANSLATE_MODEL)
+    if cached is not None:
+        return cached
+    # Traducciones idénticas en vuelo se fusionan en una sola llamada
+    key = cache_key(text, TRANSLATE_MODEL)
+    return await _translate_flight.do(key, lambda: _translate_uncached(text))
+
+async def _translate_uncached(text: str) -> str:
     try:
-        client = require_openai()
-
-        def _ask(prompt_text: str) -> str:
-            system = "Eres un asistente de traducción de español a náhuatl (variante central). Devuelve solo la traducción."
-            user_prompt = (
-                "Traduce el texto al náhuatl. Traduce palabra por palabra. "
-                "No repitas o cicles palabras. Solo regresa la traducción, no agregues nada extra. "
-                "Si no existe una palabra, usa la más similar. Refrasea si hace falta para coherencia. "
-                f"Texto: {prompt_text}"
-            )
-            chat = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                temperature=0.2,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user_prompt},
-                ],
-            )
-            return (chat.choices[0].message.content or "").strip()
-
-        out = _ask(text)
-        return out if out else text
+        cached = await run_in_threadpool(call_mongo, "translate", translation_cache.get_remote, text, TRANSLATE_MODEL)
+        if cached is not None:
+            return cached
+
+        out = await _openai_translate(text)
+        if not out:
+            return text
+        await run_in_threadpool(call_mongo, "translate", translation_cache.put, text, TRANSLATE_MODEL, out)
+        return out
 
     except Exception as e:
         log.warning(f"[translate_es_to_nah] fallback by error: {e}")
         return text
 
-def maybe_translate(text: str, lang: str) -> str:
-    lang = (lang or "es-MX").lower()
-    if lang in ("nah", "nhe", "nhi", "nch", "nahuatl"):
-        return translate_es_to_nah(text)
+_TRANSLATE_SYSTEM = "Eres un asistente de traducción de español a náhuatl (variante central). Devuelve solo la traducción."
+_TRANSLATE_RULES = (
+    "No repitas o cicles palabras. Solo regresa la traducción, no agregues nada extra. "
+    "Si no existe una palabra, usa la más similar. Refrasea si hace falta para coherencia. "
+)
+
+async def _openai_translate(text: str) -> str:
+    """Una llamada a OpenAI (sin caché ni fallback: lanza si falla)."""
+    client = require_async_openai()
+    user_prompt = (
+        "Traduce el texto al náhuatl. Traduce palabra por palabra. "
+        f"{_TRANSLATE_RULES}"
+        f"Texto: {text}"
+    )
+    chat = await bounded("translate", breaker("openai").call(lambda: client.chat.completions.create(
+        model=TRANSLATE_MODEL,
+        temperature=0.2,
+        messages=[
+            {"role": "system", "content": _TRANSLATE_SYSTEM},
+            {"role": "user", "content": user_prompt},
+        ],
+    )))
+    return (chat.choices[0].message.content or "").strip()
+
+async def _openai_translate_batch(texts: List[str]) -> str:
+    """Varios textos en una llamada; respuesta JSON {"traducciones": [...]} en el mismo orden."""
+    client = require_async_openai()
+    user_prompt = (
+        f"Traduce al náhuatl cada uno de los {len(texts)} textos de la lista JSON. {_TRANSLATE_RULES}"
+        'Responde SOLO con JSON: {"traducciones": [...]} con exactamente una traducción por texto, '
+        "en el mismo orden.\n"
+        f"Textos: {json.dumps(texts, ensure_ascii=False)}"
+    )
+    chat = await bounded("translate", breaker("openai").call(lambda: client.chat.completions.create(
+        model=TRANSLATE_MODEL,
+        temperature=0.2,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": _TRANSLATE_SYSTEM},
+            {"role": "user", "content": user_prompt},
+        ],
+    )))
+    return chat.choices[0].message.content or ""
+
+async def maybe_translate(text: str, lang: str) -> str:
+    if _is_nahuatl(lang):
+        with span("translate"):
+            return await translate_es_to_nah(text)
     return text
 
+def _is_nahuatl(lang: str) -> bool:
+    return (lang or "es-MX").lower() in ("nah", "nhe", "nhi", "nch", "nahuatl")
+
 def prefix_lang_instruction(lang: str) -> str:
     lang = (lang or "es-MX").lower()
     if lang in ("nah", "nhe", "nhi", "nch", "nahuatl"):
@@ -300,16 +529,15 @@ def prefix_lang_instruction(lang: str) -> str:
 
 # ------------------- Endpoints de salud/diagnóstico -------------------
 @router.get("/ping")
-def ping():
-    return {"ok": True, "model_default": MODEL_DEFAULT, "ollama_host": OLLAMA_HOST}
+async def ping():
+    return {"ok": True, "model_default": MODEL_DEFAULT, "ollama_host": OLLAMA_HOST, "ollama_hosts": OLLAMA_HOSTS}
 
 @router.get("/debug/ollama")
-def debug_ollama():
+async def debug_ollama():
     try:
-        r = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=3)
-        return {"ok": True, "status": r.status_code, "body": r.json()}
+        return {"ok": True, "status": 200, "body": await get_ollama().tags()}
     except Exception as e:
-        return {"ok": False, "error": str(e), "host": OLLAMA_HOST}
+        return {"ok": False, "error": str(e), "hosts": OLLAMA_HOSTS}
 
 @router.get("/memory")
 def memory(sid: str = Query(...)):
@@ -318,9 +546,30 @@ def memory(sid: str = Query(...)):
     txt = _get_memory_text(sid_oid, MEMORY_MAX_TURNS)
     return {"sid": sid, "memory": txt}
 
+@router.get("/metrics")
+async def metrics():
+    """Métricas en proceso de los componentes de IA (cachés, etc.)."""
+    return {
+        "translation_cache": translation_cache.stats(),
+        "tts_cache": audio_cache.stats(),
+        "session_cache": session_cache.stats(),
+        "llm_coalescing": _llm_flight.stats(),
+        "translation_coalescing": _translate_flight.stats(),
+        "generation_policy": policy_stats(),
+        "generation_profiles": profile_stats(),
+        "model_router": model_router.stats(),
+        "greeting_pool": greeting_pool.stats(),
+        "deadlines": deadline_stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "memory": memory_summarizer.stats(),
+        "histograms": metrics_snapshot(),
+    }
+
 # ------------------- Endpoints IA (Ollama) -------------------
+# Los handlers son async: el LLM y la traducción se esperan con await; PyMongo
+# (bloqueante) se delega al threadpool con run_in_threadpool.
 @router.get("/saludos")
-def saludos(
+async def saludos(
     name: str = Query("Invitado"),
     sid: str | None = Query(None),
     model: str | None = Query(None),
@@ -331,37 +580,85 @@ def saludos(
     sid_oid = None
     memoria = ""
     if sid:
-        sid_oid = _ensure_sid(sid)
-        memoria = _get_memory_text(sid_oid)
+        sid_oid = await _ensure_sid_async(sid)
+        memoria = await run_in_threadpool(_get_memory_text, sid_oid)
+
+    # Sin memoria que personalizar (y sin parámetros de generación a medida): saludo pregenerado
+    if not memoria and model is None and temp is None and topp is None:
+        pooled = greeting_pool.take(_greeting_lang(lang), name)
+        if pooled:
+            texto_out, model_name = pooled
+            if sid_oid:
+                await _remember_reply(sid_oid, texto_out)
+            return {
+                "persona": name, "modelo": model_name,
+                "respuesta": texto_out, "tiempo": 0.0, "intentos": 0,
+                "flagged": False, "lang": lang, "pooled": True
+            }
 
     prompt = TEMPLATE_SALUDO.format(
         lang_prefix=prefix_lang_instruction(lang),
-        lista_prohibidas=", ".join(banned_terms),
         memoria=memoria or "(sin mensajes previos)",
         name=name,
     )
 
-    model_name = model or MODEL_DEFAULT
+    model_name = model or model_router.choose("saludos", MODEL_DEFAULT)
     temperature = float(temp) if temp is not None else TEMPERATURE_DEFAULT
     topp = float(topp) if topp is not None else TOP_P_DEFAULT
 
     try:
-        llm = make_llm(model_name, temperature, topp)
-        texto, t, n, flagged = safe_generate(llm, prompt)
-        texto_out = maybe_translate(texto, lang)
+        texto, t, n, flagged = await safe_generate(model_name, prompt, temperature, topp,
+                                                   coalesce=_coalesce("saludos"), endpoint="saludos",
+                                                   system=SYSTEM_PREFIX)
+        texto_out = await maybe_translate(texto, lang)
 
         if sid_oid:
-            _append_memory(sid_oid, "assistant", texto_out)
+            await _remember_reply(sid_oid, texto_out)
         return {
             "persona": name, "modelo": model_name,
             "respuesta": texto_out, "tiempo": t, "intentos": n,
             "flagged": flagged, "lang": lang
         }
+    except (CircuitOpen, DeadlineExceeded):
+        return await _degraded_reply("saludos", name, lang, sid_oid, model_name)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ollama error: {e}")
+        raise _llm_error(e)
+
+def _greeting_lang(lang: str) -> str:
+    # Los buckets del pool: náhuatl o español (cualquier otro lang se responde en español)
+    return "nah" if _is_nahuatl(lang) else "es-MX"
+
+async def produce_pooled_greeting(lang: str) -> Tuple[str, str] | None:
+    """Productor del pool de saludos: genera con NAME_SLOT en lugar del nombre (prioridad BULK)."""
+    if _is_nahuatl(lang) and not OPENAI_KEY:
+        return None   # sin traducción el bucket náhuatl no se puede llenar
+    prompt = TEMPLATE_SALUDO.format(
+        lang_prefix=prefix_lang_instruction(lang),
+        memoria="(sin mensajes previos)",
+        name=NAME_SLOT,
+    ) + f"\nEscribe {NAME_SLOT} tal cual (con llaves) donde va el nombre.\n"
+    model_name = model_router.choose("saludos", MODEL_DEFAULT)
+    texto, _, _, flagged = await safe_generate(model_name, prompt, GREETING_POOL_TEMPERATURE, TOP_P_DEFAULT,
+                                               endpoint="saludos", system=SYSTEM_PREFIX,
+                                               priority=PRIORITY_BULK)
+    if flagged:
+        return None
+    texto_out = await maybe_translate(texto, lang)
+    if (_is_nahuatl(lang) and texto_out == texto) or not _passes_guardrails(texto_out):
+        return None   # traducción caída (devolvió el español) o la traducción tropezó con guardrails
+    return texto_out, model_name
+
+def _respuestas_prompt(name: str, interaccion: str, sid_oid, lang: str) -> str:
+    memoria = _get_memory_text(sid_oid, MEMORY_MAX_TURNS) if sid_oid else ""
+    context = f"Nombre: {name}. Mensaje: {interaccion}"
+    return TEMPLATE_RESPUESTAS.format(
+        lang_prefix=prefix_lang_instruction(lang),
+        memoria=memoria or "(sin historial en esta sesión)",
+        contexto=context
+    )
 
 @router.get("/respuestas")
-def respuestas(
+async def respuestas(
     name: str = Query("Invitado"),
     interaccion: str = Query("¿Cómo estás?"),
     sid: str | None = Query(None),
@@ -372,51 +669,299 @@ def respuestas(
 ):
     sid_oid = None
     if sid:
-        sid_oid = _ensure_sid(sid)
-        _append_memory(sid_oid, "user", interaccion)
+        sid_oid = await _ensure_sid_async(sid)
+        await run_in_threadpool(_append_memory, sid_oid, "user", interaccion)
 
     # Detección de crisis en la ENTRADA
     if is_crisis_input(interaccion):
         crisis_text = crisis_reply(name)
-        crisis_text = maybe_translate(crisis_text, lang)
+        crisis_text = await maybe_translate(crisis_text, lang)
         if sid_oid:
-            _append_memory(sid_oid, "assistant", crisis_text)
+            await _remember_reply(sid_oid, crisis_text)
         return {
             "persona": name, "modelo": model or MODEL_DEFAULT,
             "respuesta": crisis_text, "crisis": True, "lang": lang
         }
 
-    memoria = _get_memory_text(sid_oid, MEMORY_MAX_TURNS) if sid_oid else ""
-    context = f"Nombre: {name}. Mensaje: {interaccion}"
-
-    prompt = TEMPLATE_RESPUESTAS.format(
-        lang_prefix=prefix_lang_instruction(lang),
-        lista_prohibidas=", ".join(banned_terms),
-        memoria=memoria or "(sin historial en esta sesión)",
-        contexto=context
-    )
+    prompt = await run_in_threadpool(_respuestas_prompt, name, interaccion, sid_oid, lang)
 
-    model_name = model or MODEL_DEFAULT
+    model_name = model or model_router.choose("respuestas", MODEL_DEFAULT)
     temperature = float(temp) if temp is not None else max(0.7, TEMPERATURE_DEFAULT)
     topp = float(topp) if topp is not None else max(0.85, TOP_P_DEFAULT)
 
     try:
-        llm = make_llm(model_name, temperature, topp)
-        texto, t, n, flagged = safe_generate(llm, prompt)
-        texto_out = maybe_translate(texto, lang)
+        texto, t, n, flagged = await safe_generate(model_name, prompt, temperature, topp,
+                                                   endpoint="respuestas", system=SYSTEM_PREFIX)
+        texto_out = await maybe_translate(texto, lang)
 
         if sid_oid:
-            _append_memory(sid_oid, "assistant", texto_out)
+            await _remember_reply(sid_oid, texto_out)
         return {
             "persona": name, "modelo": model_name,
             "respuesta": texto_out, "tiempo": t, "intentos": n,
             "flagged": flagged, "crisis": False, "lang": lang
         }
+    except (CircuitOpen, DeadlineExceeded):
+        return {**await _degraded_reply("respuestas", name, lang, sid_oid, model_name, interaccion),
+                "crisis": False}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ollama error: {e}")
+        raise _llm_error(e)
+
+# ------------------- Streaming SSE -------------------
+# Se retiene la cola del stream (longitud del término/rechazo más largo) hasta verificarla,
+# así un término prohibido se detecta antes de que llegue completo al cliente.
+STREAM_HOLDBACK = max(get_matcher().max_term_len, 40)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _stream_violates(window: str) -> bool:
+    return contains_banned(window) or contains_refusal(window)
+
+async def _admit_stream(model_name: str):
+    """
+    Turno del scheduler para los endpoints SSE, pedido antes de abrir el stream y acotado por el deadline.
+    Devuelve release(), o None si el deadline venció en la cola (el stream responde con el fallback).
+    Saturación sin deadline vencido → 429/503 inmediato.
+    """
+    try:
+        return await llm_scheduler.admit(model_name, ENDPOINT_PRIORITY["respuestas"], max_wait=budget("llm_queue"))
+    except LLMSaturated as e:
+        try:
+            check_deadline("llm_queue")
+        except DeadlineExceeded:
+            return None
+        raise _llm_error(e)
+    except DeadlineExceeded:
+        return None
+
+@router.get("/respuestas/stream")
+async def respuestas_stream(
+    name: str = Query("Invitado"),
+    interaccion: str = Query("¿Cómo estás?"),
+    sid: str | None = Query(None),
+    model: str | None = Query(None),
+    temp: float | None = Query(None),
+    topp: float | None = Query(None),
+    lang: str = Query("es-MX"),
+):
+    """
+    Variante SSE de /respuestas: envía tokens conforme se generan.
+    Eventos: `token` {text}, `crisis` {text} (reemplaza lo enviado), `done` {respuesta, ...}, `error`.
+    Guardrails sobre una ventana deslizante; ante violación corta a crisis_reply.
+    En náhuatl no se puede traducir token a token: se genera completo y se envía en un evento.
+    """
+    sid_oid = None
+    if sid:
+        sid_oid = await _ensure_sid_async(sid)
+        await run_in_threadpool(_append_memory, sid_oid, "user", interaccion)
+
+    model_name = model or model_router.choose("respuestas", MODEL_DEFAULT)
+    temperature = float(temp) if temp is not None else max(0.7, TEMPERATURE_DEFAULT)
+    topp = float(topp) if topp is not None else max(0.85, TOP_P_DEFAULT)
+
+    # El turno en el scheduler se pide ANTES de abrir el stream: si está saturado, 429/503 inmediato.
+    # (Crisis no usa LLM; náhuatl pasa por safe_generate, que pide su propio turno.)
+    release, queue_expired = (lambda: None), False
+    if not is_crisis_input(interaccion) and not _is_nahuatl(lang):
+        admitted = await _admit_stream(model_name)
+        if admitted is None:
+            queue_expired = True
+        else:
+            release = admitted
+
+    async def _finish(texto: str, **extra) -> str:
+        if sid_oid:
+            await _remember_reply(sid_oid, texto)
+        return _sse("done", {
+            "persona": name, "modelo": model_name, "respuesta": texto,
+            "lang": lang, **extra
+        })
+
+    async def _gen():
+        start = time.time()
+        if is_crisis_input(interaccion):
+            crisis_text = await maybe_translate(crisis_reply(name), lang)
+            yield _sse("crisis", {"text": crisis_text})
+            yield await _finish(crisis_text, crisis=True, flagged=False, tiempo=round(time.time() - start, 4))
+            return
+
+        prompt = await run_in_threadpool(_respuestas_prompt, name, interaccion, sid_oid, lang)
+        try:
+            if queue_expired:
+                raise DeadlineExceeded("llm_queue")
+            if _is_nahuatl(lang):
+                texto, t, n, flagged = await safe_generate(model_name, prompt, temperature, topp,
+                                                           endpoint="respuestas", system=SYSTEM_PREFIX)
+                texto_out = await maybe_translate(texto, lang)
+                yield _sse("token", {"text": texto_out})
+                yield await _finish(texto_out, crisis=False, flagged=flagged, tiempo=t, intentos=n)
+                return
+
+            buf, sent, ttfb = "", 0, None
+            stream = shaped_stream(get_ollama(), model_name, prompt, profile_for("respuestas"),
+                                   "respuestas", temperature=temperature, top_p=topp, system=SYSTEM_PREFIX)
+            try:
+                async for chunk in stream:
+                    buf += chunk
+                    if _stream_violates(buf[max(0, sent - STREAM_HOLDBACK):]):
+                        await stream.aclose()   # corta la generación antes de responder con la crisis
+                        crisis_text = crisis_reply(name)
+                        log.info(f"[AI stream] corte a crisis tras {len(buf)} chars")
+                        yield _sse("crisis", {"text": crisis_text})
+                        yield await _finish(crisis_text, crisis=False, flagged=True,
+                                            tiempo=round(time.time() - start, 4))
+                        return
+                    safe_upto = len(buf) - STREAM_HOLDBACK
+                    if safe_upto > sent:
+                        if ttfb is None:
+                            ttfb = round(time.time() - start, 4)
+                        yield _sse("token", {"text": buf[sent:safe_upto]})
+                        sent = safe_upto
+            finally:
+                await stream.aclose()
+
+            if sent < len(buf):
+                yield _sse("token", {"text": buf[sent:]})
+            yield await _finish(buf.strip(), crisis=False, flagged=False,
+                                tiempo=round(time.time() - start, 4),
+                                ttfb=ttfb if ttfb is not None else round(time.time() - start, 4))
+        except (CircuitOpen, DeadlineExceeded):
+            texto = await maybe_translate(fallback_response(interaccion), lang)
+            yield _sse("token", {"text": texto})
+            yield await _finish(texto, crisis=False, flagged=False, degraded=True,
+                                tiempo=round(time.time() - start, 4))
+        except Exception as e:
+            log.warning(f"[AI stream] error: {e}")
+            yield _sse("error", {"detail": f"Ollama error: {e}"})
+        finally:
+            release()
+
+    return StreamingResponse(
+        _gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release),   # por si el stream nunca llega a iterarse
+    )
+
+@router.get("/respuestas/voz")
+async def respuestas_voz(
+    name: str = Query("Invitado"),
+    interaccion: str = Query("¿Cómo estás?"),
+    sid: str | None = Query(None),
+    model: str | None = Query(None),
+    temp: float | None = Query(None),
+    topp: float | None = Query(None),
+    lang: str = Query("es-MX"),
+    voice: str = Query(TTS_VOICE_DEFAULT),
+    fmt: str = Query("mp3"),
+):
+    """
+    /respuestas con voz, en pipeline por oraciones (SSE): cada oración generada se traduce (náhuatl)
+    y se sintetiza mientras el LLM sigue con las siguientes; el audio sale en orden.
+    Eventos: `segment` {index, texto, format, audio_b64}, `crisis` {texto, format, audio_b64},
+    `done` {respuesta, segments, ttfa, tiempo, ...}, `error`.
+    """
+    require_async_openai()   # sin TTS no hay nada que transmitir: 400 antes de abrir el stream
+    fmt = _sanitize_tts_format(fmt)
+    sid_oid = None
+    if sid:
+        sid_oid = await _ensure_sid_async(sid)
+        await run_in_threadpool(_append_memory, sid_oid, "user", interaccion)
+
+    model_name = model or model_router.choose("respuestas", MODEL_DEFAULT)
+    temperature = float(temp) if temp is not None else max(0.7, TEMPERATURE_DEFAULT)
+    topp = float(topp) if topp is not None else max(0.85, TOP_P_DEFAULT)
+    crisis_in = is_crisis_input(interaccion)
+
+    release, queue_expired = (lambda: None), False
+    if not crisis_in:
+        admitted = await _admit_stream(model_name)
+        if admitted is None:
+            queue_expired = True
+        else:
+            release = admitted
+
+    async def _voiced(texto: str) -> dict:
+        texto_out = await maybe_translate(texto, lang)
+        raw = await _synthesize_cached(texto_out, voice, fmt)
+        return {"texto": texto_out, "format": fmt, "audio_b64": base64.b64encode(raw).decode("utf-8")}
+
+    async def _stage(i: int, sentence: str) -> dict:
+        return {"index": i, **await _voiced(sentence)}
+
+    state = {"flagged": False, "degraded": False}
+
+    async def _sentences():
+        """Oraciones del LLM; cada una pasa los guardrails (con la cola de la anterior) antes de salir."""
+        if queue_expired:
+            raise DeadlineExceeded("llm_queue")
+        prompt = await run_in_threadpool(_respuestas_prompt, name, interaccion, sid_oid, lang)
+        splitter, tail = SentenceSplitter(), ""
+        stream = shaped_stream(get_ollama(), model_name, prompt, profile_for("respuestas"),
+                               "respuestas", temperature=temperature, top_p=topp, system=SYSTEM_PREFIX)
+        try:
+            async for chunk in stream:
+                for sentence in splitter.feed(chunk):
+                    if _stream_violates(tail + sentence):
+                        state["flagged"] = True
+                        return
+                    tail = sentence[-STREAM_HOLDBACK:]
+                    yield sentence
+            for sentence in splitter.flush():
+                if _stream_violates(tail + sentence):
+                    state["flagged"] = True
+                    return
+                yield sentence
+        finally:
+            await stream.aclose()   # corte por guardrails: suelta la conexión con Ollama
+            release()   # el LLM terminó: liberar el turno aunque sigan traducción/TTS
+
+    async def _gen():
+        start = time.time()
+        ttfa, textos = None, []
+        try:
+            if not crisis_in:
+                try:
+                    async for seg in ordered_pipeline(_sentences(), _stage):
+                        if ttfa is None:
+                            ttfa = round(time.time() - start, 4)
+                            histogram("pipeline.ttfa").observe(ttfa)
+                        textos.append(seg["texto"])
+                        yield _sse("segment", seg)
+                except (CircuitOpen, DeadlineExceeded):
+                    state["degraded"] = True
+                    seg = await _stage(len(textos), fallback_response(interaccion))
+                    textos.append(seg["texto"])
+                    yield _sse("segment", seg)
+            if crisis_in or state["flagged"]:
+                seg = await _voiced(crisis_reply(name))
+                textos = [seg["texto"]]
+                yield _sse("crisis", seg)
+            respuesta = " ".join(textos)
+            if sid_oid:
+                await _remember_reply(sid_oid, respuesta)
+            yield _sse("done", {
+                "persona": name, "modelo": model_name, "respuesta": respuesta, "lang": lang,
+                "segments": len(textos), "crisis": crisis_in, "flagged": state["flagged"],
+                "degraded": state["degraded"],
+                "ttfa": ttfa, "tiempo": round(time.time() - start, 4),
+            })
+        except Exception as e:
+            log.warning(f"[AI voz] error: {e}")
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            release()
+
+    return StreamingResponse(
+        _gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release),
+    )
 
 @router.get("/mindfullness")
-def mindfullness(
+async def mindfullness(
     name: str = Query("Invitado"),
     interaccion: str = Query("Necesito un ejercicio de mindfulness para relajarme."),
     sid: str | None = Query(None),
@@ -428,39 +973,40 @@ def mindfullness(
     sid_oid = None
     memoria = ""
     if sid:
-        sid_oid = _ensure_sid(sid)
-        _append_memory(sid_oid, "user", interaccion)
-        memoria = _get_memory_text(sid_oid)
+        sid_oid = await _ensure_sid_async(sid)
+        await run_in_threadpool(_append_memory, sid_oid, "user", interaccion)
+        memoria = await run_in_threadpool(_get_memory_text, sid_oid)
 
     context = f"Genera un ejercicio enumerado (≥4 pasos) para {name}; acorde a: {interaccion}."
     prompt = TEMPLATE_MINDFULLNESS.format(
         lang_prefix=prefix_lang_instruction(lang),
-        lista_prohibidas=", ".join(banned_terms),
         memoria=memoria or "(sin historial en esta sesión)",
         contexto=context
     )
 
-    model_name = model or MODEL_DEFAULT
+    model_name = model or model_router.choose("mindfullness", MODEL_DEFAULT)
     temperature = float(temp) if temp is not None else TEMPERATURE_DEFAULT
     topp = float(topp) if topp is not None else TOP_P_DEFAULT
 
     try:
-        llm = make_llm(model_name, temperature, topp)
-        texto, t, n, flagged = safe_generate(llm, prompt)
-        texto_out = maybe_translate(texto, lang)
+        texto, t, n, flagged = await safe_generate(model_name, prompt, temperature, topp,
+                                                   endpoint="mindfullness", system=SYSTEM_PREFIX)
+        texto_out = await maybe_translate(texto, lang)
 
         if sid_oid:
-            _append_memory(sid_oid, "assistant", texto_out)
+            await _remember_reply(sid_oid, texto_out)
         return {
             "persona": name, "modelo": model_name,
             "respuesta": texto_out, "tiempo": t, "intentos": n,
             "flagged": flagged, "lang": lang
         }
+    except (CircuitOpen, DeadlineExceeded):
+        return await _degraded_reply("mindfullness", name, lang, sid_oid, model_name)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ollama error: {e}")
+        raise _llm_error(e)
 
 @router.get("/eea")
-def eea(
+async def eea(
     name: str = Query("Invitado"),
     paso: str = Query("Elección del evento"),
     sid: str | None = Query(None),
@@ -470,38 +1016,39 @@ def eea(
     lang: str = Query("es-MX"),
 ):
     sid_oid = None
-    memoria = ""
     if sid:
-        sid_oid = _ensure_sid(sid)
-        memoria = _get_memory_text(sid_oid)
+        sid_oid = await _ensure_sid_async(sid)
 
     context = f"Genera el texto del paso EEA para {name}; el paso es: {paso}."
     prompt = TEMPLATE_EEA.format(
         lang_prefix=prefix_lang_instruction(lang),
-        lista_prohibidas=", ".join(banned_terms),
         contexto=context
     )
 
-    model_name = model or MODEL_DEFAULT
+    model_name = model or model_router.choose("eea", MODEL_DEFAULT)
     temperature = float(temp) if temp is not None else TEMPERATURE_DEFAULT
     topp = float(topp) if topp is not None else TOP_P_DEFAULT
 
     try:
-        llm = make_llm(model_name, temperature, topp)
-        texto, t, n, flagged = safe_generate(llm, prompt)
-        texto_out = maybe_translate(texto, lang)
+        texto, t, n, flagged = await safe_generate(model_name, prompt, temperature, topp,
+                                                   coalesce=_coalesce("eea"), endpoint="eea",
+                                                   system=SYSTEM_PREFIX)
+        texto_out = await maybe_translate(texto, lang)
 
         if sid_oid:
-            _append_memory(sid_oid, "assistant", texto_out)
+            await _remember_reply(sid_oid, texto_out)
         return {
             "persona": name, "modelo": model_name, "respuesta": texto_out,
             "tiempo": t, "intentos": n, "flagged": flagged, "lang": lang
         }
+    except (CircuitOpen, DeadlineExceeded):
+        return await _degraded_reply("eea", name, lang, sid_oid, model_name, paso=paso)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ollama error: {e}")
+        raise _llm_error(e)
 
 @router.get("/dass21")
-def dass21(
+async def dass21(
+    request: Request,
     name: str = Query("Invitado"),
     sid: str | None = Query(None),
     model: str | None = Query(None),
@@ -509,46 +1056,84 @@ def dass21(
     topp: float | None = Query(None),
     lang: str = Query("es-MX"),
 ):
+    """
+    Preguntas DASS-21 desde el catálogo localizado en memoria (sin LLM).
+    model/temp/topp se aceptan por compatibilidad, pero ya no aplican.
+    """
     # Aceptamos sid para evitar 400 aunque no se use
     if sid:
-        _ensure_sid(sid)
-
-    context = f"Genera las preguntas del DASS-21 para {name}; separadas por salto de línea; no incluyas CoralIA."
-    prompt = TEMPLATE_DASS21.format(
-        lang_prefix=prefix_lang_instruction(lang),
-        lista_prohibidas=", ".join(banned_terms),
-        contexto=context
-    )
-
-    model_name = model or MODEL_DEFAULT
-    temperature = float(temp) if temp is not None else TEMPERATURE_DEFAULT
-    topp = float(topp) if topp is not None else TOP_P_DEFAULT
-
+        await _ensure_sid_async(sid)
+
+    cat = await catalog_store.get("dass21", lang, translate_es_to_nah, TRANSLATE_MODEL)
+    headers = _catalog_headers(cat)
+    if headers["ETag"] in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({
+        "persona": name, "modelo": "catalogo",
+        "respuesta": "\n".join(cat["items"]), "tiempo": 0.0, "intentos": 0,
+        "flagged": False, "lang": lang, "version": cat["version"]
+    }, headers=headers)
+
+# ------------------- Catálogos localizados -------------------
+CATALOG_LANGS = [l.strip() for l in os.getenv("CATALOG_LANGS", "nah").split(",") if l.strip()]
+
+async def warm_catalogs() -> None:
+    """Tarea de arranque: construye/carga los catálogos no canónicos (requiere OpenAI)."""
+    if not OPENAI_KEY:
+        return
     try:
-        llm = make_llm(model_name, temperature, topp)
-        texto, t, n, flagged = safe_generate(llm, prompt)
-        texto_out = maybe_translate(texto, lang)
-        return {
-            "persona": name, "modelo": model_name,
-            "respuesta": texto_out, "tiempo": t, "intentos": n,
-            "flagged": flagged, "lang": lang
-        }
+        await catalog_store.warm(CATALOG_LANGS, translate_es_to_nah, TRANSLATE_MODEL)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ollama error: {e}")
+        log.warning(f"[catalogs] warm-up falló: {e}")
+
+def _catalog_headers(cat: dict) -> dict:
+    """ETag del contenido servido; un catálogo incompleto no se cachea (se reconstruirá con la traducción)."""
+    return {"ETag": f'"{cat["etag"]}"',
+            "Cache-Control": "public, max-age=3600" if cat.get("complete", True) else "no-cache"}
+
+@router.get("/catalogs/{name}")
+async def catalog(name: str, request: Request, lang: str = Query("es-MX")):
+    """Instrumento estático localizado (dass21, eea_steps) con ETag del contenido servido."""
+    if name not in catalog_store.sources:
+        raise HTTPException(404, "Catálogo no encontrado")
+    cat = await catalog_store.get(name, lang, translate_es_to_nah, TRANSLATE_MODEL)
+    headers = _catalog_headers(cat)
+    if headers["ETag"] in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({
+        "name": name, "lang": cat["lang"], "version": cat["version"],
+        "status": cat.get("status"), "complete": cat.get("complete", True),
+        "items": cat["items"],
+    }, headers=headers)
 
 # ------------------- OpenAI: traducción y TTS -------------------
 @router.get("/nahuatl")
-def nahuatl(texto: str = Query(..., description="Texto en español a traducir")):
-    client = require_openai()
-    chat = client.chat.completions.create(
-        model="gpt-4.1-mini",  # o "gpt-4o-mini"
-        messages=[
-            {"role": "system", "content": "Eres un asistente de traducción de español a náhuatl (variante central). Devuelve solo la traducción."},
-            {"role": "user", "content": f"Traduce el texto al náhuatl. Traduce palabra por palabra. No repitas ni cicles palabras. Solo regresa la traducción, sin extras. Si no existe una palabra usa la más similar. Refrasea si hace falta para coherencia. Texto: {texto}"},
-        ],
-        temperature=0.2
-    )
-    return {"traduccion": (chat.choices[0].message.content or "").strip()}
+async def nahuatl(texto: str = Query(..., description="Texto en español a traducir")):
+    """
+    Traducción por el mismo camino que el resto del router: caché L1/L2, llamadas idénticas
+    fusionadas y OpenAI acotado por el deadline ("translate") y el breaker; si falla, regresa el texto fuente.
+    """
+    require_async_openai()   # sin OPENAI_API_KEY: 400
+    with span("translate"):
+        return {"traduccion": await translate_es_to_nah(texto)}
+
+@router.post("/nahuatl/batch")
+async def nahuatl_batch(
+    payload: dict = Body(..., example={"texts": ["Respira profundo.", "¿Cómo te sientes hoy?"]})
+):
+    """
+    Traduce muchos textos español → náhuatl. Deduplica, usa la caché de traducciones y empaqueta
+    los faltantes en pocas llamadas a OpenAI. Devuelve `items` en el orden de entrada, cada uno con
+    {index, ok, traduccion, cached} o {index, ok: false, error}.
+    """
+    texts = payload.get("texts")
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        raise HTTPException(400, "'texts' debe ser una lista de cadenas")
+    if len(texts) > NAHUATL_BATCH_MAX_ITEMS:
+        raise HTTPException(413, f"Máximo {NAHUATL_BATCH_MAX_ITEMS} textos por petición")
+    require_async_openai()
+    return await translate_batch(texts, TRANSLATE_MODEL, translation_cache,
+                                 _openai_translate_batch, _openai_translate)
 
 # ---------- Helpers de audio ----------
 def _mime_from_fmt(fmt: str) -> str:
@@ -571,14 +1156,156 @@ def _sanitize_tts_format(fmt: str) -> str:
         return "mp3"      # fallback seguro
     return f
 
+# ---------- Caché de audio + respuestas con Range/ETag ----------
+TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_RANGE_CHUNK = 64 * 1024
+
+async def _synthesize_cached(text: str, voice: str, fmt: str) -> bytes:
+    """Devuelve el audio desde la caché; si falta, sintetiza (fusionando peticiones idénticas)."""
+    client = require_async_openai()
+
+    async def _synth() -> bytes:
+        speech = await bounded("tts", breaker("openai").call(lambda: client.audio.speech.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text,
+            response_format=fmt
+        )))
+        return speech.content
+
+    with span("tts"):   # la espera a un stream_fill ajeno también queda dentro del deadline
+        return await bounded("tts", audio_cache.get_or_synthesize(text, voice, fmt, TTS_MODEL, _synth))
+
+async def _tts_upstream(text: str, voice: str, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Audio de OpenAI TTS conforme llega (streaming), contado en el breaker de openai.
+    La lentitud se mide hasta el primer trozo: el resto del tiempo lo marca el ritmo del cliente.
+    """
+    client = require_async_openai()
+    cb = breaker("openai")
+    cb.allow()
+    start, ttfb, outcome = time.perf_counter(), None, None
+    try:
+        async with client.audio.speech.with_streaming_response.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text,
+            response_format=fmt
+        ) as resp:
+            async for chunk in resp.iter_bytes(_RANGE_CHUNK):
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                yield chunk
+        outcome = (ttfb or 0.0) > cb.slow_after
+    except Exception as e:
+        outcome = e
+        raise
+    finally:
+        if outcome is None:
+            cb.abandon(time.perf_counter() - start if ttfb is None else 0.0)   # el cliente se fue
+        elif isinstance(outcome, Exception):
+            cb.record_error(outcome)
+        else:
+            cb.record(outcome)
+
+def _iter_range(f: BinaryIO, start: int, end: int):
+    """Trozos [start, end] del audio ya abierto; el descriptor sigue válido aunque la caché lo expulse."""
+    with f:
+        if end < start:
+            return
+        view = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if isinstance(f, io.BufferedReader)
+                else f.getbuffer())   # BytesIO: audio recién sintetizado que ya no estaba en disco
+        with view:
+            for pos in range(start, end + 1, _RANGE_CHUNK):
+                yield bytes(view[pos:min(pos + _RANGE_CHUNK, end + 1)])
+
+def _audio_response(request: Request, f: BinaryIO, key: str, fmt: str) -> Response:
+    """
+    Sirve audio ya abierto (caché): 304 con If-None-Match, 206 con Range y 200 completo, ambos desde
+    un mmap del descriptor (no de la ruta: una expulsión concurrente puede borrar el archivo).
+    """
+    etag = f'"{key}"'
+    size = f.seek(0, io.SEEK_END)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=86400",
+        "Content-Disposition": f'inline; filename="speech.{fmt}"',
+    }
+    if etag in (request.headers.get("if-none-match") or ""):
+        f.close()
+        return Response(status_code=304, headers=headers)
+
+    range_hdr = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    m = _RANGE_RE.match(range_hdr.strip()) if range_hdr else None
+    if range_hdr and (if_range is None or if_range == etag):
+        if not m or m.group(1) == m.group(2) == "":
+            f.close()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+        else:   # sufijo: últimos N bytes
+            start, end = max(0, size - int(m.group(2))), size - 1
+        if start >= size or start > end:
+            f.close()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        return StreamingResponse(
+            _iter_range(f, start, end),
+            status_code=206,
+            media_type=_mime_from_fmt(fmt),
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}",
+                     "Content-Length": str(end - start + 1)},
+            background=BackgroundTask(f.close),   # por si el cuerpo nunca llega a iterarse
+        )
+
+    return StreamingResponse(_iter_range(f, 0, size - 1), media_type=_mime_from_fmt(fmt),
+                             headers={**headers, "Content-Length": str(size)},
+                             background=BackgroundTask(f.close))
+
+async def _stream_tts(text: str, voice: str, fmt: str, key: str, done: asyncio.Future) -> StreamingResponse:
+    """
+    Fallo de caché con la llave ya reservada (audio_cache.claim): transmite el audio mientras OpenAI
+    lo genera y lo guarda en la caché a la vez. Se espera el primer trozo antes de responder para que
+    los errores (sin API key, circuito abierto, 4xx) salgan con su código y no como un 200 truncado.
+    """
+    fill = audio_cache.stream_fill(key, fmt, _tts_upstream(text, voice, fmt), done)
+    try:
+        with span("tts"):
+            first = await bounded("tts", fill.__anext__())
+    except StopAsyncIteration:
+        raise HTTPException(502, "TTS sin audio")
+    except BaseException:
+        await fill.aclose()
+        audio_cache.release(key, done)   # por si el stream nunca llegó a arrancar
+        raise
+
+    async def _chunks():
+        yield first
+        async for chunk in fill:
+            yield chunk
+
+    return StreamingResponse(
+        _chunks(),
+        media_type=_mime_from_fmt(fmt),
+        headers={"ETag": f'"{key}"', "Cache-Control": "private, max-age=86400",
+                 "Content-Disposition": f'inline; filename="speech.{fmt}"'},
+    )
+
 # ---------- TTS moderno: bytes (recomendado para Flutter Web) ----------
 @router.post("/tts_bytes")
-def tts_bytes(
+async def tts_bytes(
+    request: Request,
     payload: dict = Body(..., example={"text": "Hola, ¿cómo estás?", "voice": "shimmer", "format": "mp3"})
 ):
     """
-    Devuelve audio binario generado por OpenAI TTS.
+    Devuelve audio binario generado por OpenAI TTS (desde la caché en disco si ya existe).
     body: { text: str, voice?: str, format?: "mp3"|"opus"|"aac"|"flac"|"wav"|"pcm" }
+    Soporta Range / If-Range / If-None-Match (ETag = llave de contenido).
+    Fallo de caché: el audio se transmite conforme llega de OpenAI mientras se guarda (sin Range);
+    con Range, o si la misma síntesis ya está en curso, se espera el audio completo.
     """
     text  = (payload.get("text")  or "").strip()
     voice = (payload.get("voice") or TTS_VOICE_DEFAULT).strip()
@@ -587,51 +1314,20 @@ def tts_bytes(
     if not text:
         raise HTTPException(400, "Falta 'text'")
 
-    client = require_openai()
-
-    # A) Streaming en chunks (si tu SDK lo soporta)
-    try:
-        def _gen():
-            with client.audio.speech.with_streaming_response.create(
-                model="gpt-4o-mini-tts",
-                voice=voice,
-                input=text,
-                response_format=fmt
-            ) as resp:
-                for chunk in resp.iter_bytes():
-                    yield chunk
-
-        return StreamingResponse(
-            _gen(),
-            media_type=_mime_from_fmt(fmt),
-            headers={
-                "Content-Disposition": f'inline; filename="speech.{fmt}"',
-                "Accept-Ranges": "bytes",
-                "Cache-Control": "no-store"
-            }
-        )
-    except AttributeError:
-        # B) Fallback sin streaming (lee todo a memoria)
-        speech = client.audio.speech.create(
-            model="gpt-4o-mini-tts",
-            voice=voice,
-            input=text,
-            response_format=fmt
-        )
-        audio_bytes = speech.read() if hasattr(speech, "read") else getattr(speech, "content", b"")
-        buf = io.BytesIO(audio_bytes)
-        return StreamingResponse(
-            buf,
-            media_type=_mime_from_fmt(fmt),
-            headers={
-                "Content-Disposition": f'inline; filename="speech.{fmt}"',
-                "Cache-Control": "no-store"
-            }
-        )
+    key = audio_key(text, voice, fmt, TTS_MODEL)
+    f = audio_cache.open(key, fmt)
+    if f is None and not request.headers.get("range"):
+        done = audio_cache.claim(key)   # sin await de por medio: solo una petición transmite
+        if done is not None:
+            return await _stream_tts(text, voice, fmt, key, done)
+    if f is None:
+        data = await _synthesize_cached(text, voice, fmt)
+        f = audio_cache.open(key, fmt) or io.BytesIO(data)   # pudo expulsarse ya: se sirve de memoria
+    return _audio_response(request, f, key, fmt)
 
 # ---------- TTS: base64 (compat) ----------
 @router.post("/tts_b64")
-def tts_b64(
+async def tts_b64(
     payload: dict = Body(..., example={"text": "Hola, ¿cómo estás?", "voice": "shimmer", "format": "mp3"})
 ):
     text  = (payload.get("text")  or "").strip()
@@ -641,32 +1337,18 @@ def tts_b64(
     if not text:
         raise HTTPException(400, "Falta 'text'")
 
-    client = require_openai()
-    speech = client.audio.speech.create(
-        model="gpt-4o-mini-tts",
-        voice=voice,
-        input=text,
-        response_format=fmt
-    )
-    raw = speech.read() if hasattr(speech, "read") else getattr(speech, "content", b"")
+    raw = await _synthesize_cached(text, voice, fmt)
     audio_b64 = base64.b64encode(raw).decode("utf-8")
     return JSONResponse({"audio_b64": audio_b64, "format": fmt, "voice": voice})
 
 # ---------- TTS legacy: GET con base64 (mantener si ya lo usas) ----------
 @router.get("/genera_voz")
-def genera_voz(
+async def genera_voz(
     prompt: str = Query(..., description="Texto a sintetizar"),
     lang: str = Query(TTS_VOICE_DEFAULT, description="Voz (alloy, verse, shimmer, etc.)"),
     fmt: str = Query("mp3", description="Formato de salida (mp3/opus/aac/flac/wav/pcm)")
 ):
-    client = require_openai()
     fmt_sane = _sanitize_tts_format(fmt)
-    speech = client.audio.speech.create(
-        model="gpt-4o-mini-tts",
-        voice=lang,
-        input=prompt,
-        response_format=fmt_sane
-    )
-    raw = speech.read() if hasattr(speech, "read") else getattr(speech, "content", b"")
+    raw = await _synthesize_cached(prompt, lang, fmt_sane)
     audio_b64 = base64.b64encode(raw).decode("utf-8")
     return {"audio_b64": audio_b64, "format": fmt_sane, "voice": lang}
@@ -1,10 +1,16 @@
 # app/routes/flows.py
 from fastapi import APIRouter, Body, HTTPException
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any
 from datetime import datetime
 from bson import ObjectId  # <- usar ObjectId real
+from pymongo import ReturnDocument
 from ..db.mongo import get_db
+from ..services.guardrails import get_matcher
+from ..services.session_cache import session_cache
+from ..services.catalogs import catalog_store
+from ..services.deadline import mongo_deadline
+from ..telemetry.timing import span
 
 router = APIRouter()
 
@@ -18,6 +24,10 @@ class DassAnswerIn(BaseModel):
     index: int = Field(ge=0, le=20)     # 0..20
     value: int = Field(ge=0, le=3)      # 0..3
 
+class DassAnswersIn(BaseModel):
+    session_id: str
+    answers: List[Annotated[int, Field(ge=0, le=3)]] = Field(min_length=21, max_length=21)
+
 class NegotiationIn(BaseModel):
     session_id: str
     user_message: str
@@ -26,6 +36,7 @@ class EeaStepIn(BaseModel):
     session_id: str
     step_key: str   # "eleccion_del_evento", "escritura_libre", etc.
     user_text: str
+    lang: str = "es-MX"
 
 # ------------------------- HELPERS -------------------------
 def _oid(s: str) -> ObjectId:
@@ -93,12 +104,29 @@ def _severity(score: int, kind: str) -> str:
         return "extremo"
     return "desconocido"
 
-# ------------------------- NEGOCIACIÓN (contención + compromiso) -------------------------
-CRISIS_KEYWORDS = ["quiero", "matar", "suic", "autoles", "hacerme daño", "lastimarme", "no quiero vivir"]
+def _dass21_scores(vals: List[int]) -> Dict[str, Any]:
+    dep = _sum_items(vals, DEP_IDX) * 2
+    anx = _sum_items(vals, ANX_IDX) * 2
+    str_ = _sum_items(vals, STR_IDX) * 2
+    return {
+        "depresion": {"score": dep, "severity": _severity(dep, "DEP")},
+        "ansiedad":  {"score": anx, "severity": _severity(anx, "ANX")},
+        "estres":    {"score": str_, "severity": _severity(str_, "STR")},
+    }
+
+def _dass21_progress(answers: List[Optional[int]]) -> Dict[str, Any]:
+    """Siguiente pregunta pendiente o, si ya están las 21, puntajes y severidades."""
+    answers = list(answers) + [None] * (21 - len(answers))
+    try:
+        next_idx = answers.index(None)
+    except ValueError:
+        return {"done": True, "scores": _dass21_scores([int(v) for v in answers]), "next_flow": "NEGOTIATION"}
+    return {"done": False, "next_index": next_idx, "next_text": DASS21_QUESTIONS[next_idx]}
 
+# ------------------------- NEGOCIACIÓN (contención + compromiso) -------------------------
+# CRISIS_KEYWORDS se define en services/guardrails (categoría "crisis" del autómata)
 def _is_crisis(text: str) -> bool:
-    t = text.lower()
-    return any(k in t for k in CRISIS_KEYWORDS)
+    return get_matcher().has_flag(text, "crisis")
 
 def negotiation_reply(user_msg: str) -> Dict[str, Any]:
     # Mensaje seguro y breve.
@@ -121,6 +149,10 @@ EEA_STEPS = {
     "cierre_positivo":          "**Cierre positivo**: escribe una frase de autocuidado o un plan breve para ti (algo pequeño y concreto que harás hoy)."
 }
 
+# Textos canónicos para los catálogos localizados (services/catalogs)
+catalog_store.register_source("dass21", DASS21_QUESTIONS)
+catalog_store.register_source("eea_steps", EEA_STEPS)
+
 # ------------------------- ENDPOINTS -------------------------
 
 @router.post("/first-contact/start")
@@ -136,7 +168,9 @@ def first_contact_start(payload: StartSessionIn):
         "state": "DASS21",
         "answers": [None] * 21
     }
-    res = db.sessions.insert_one(session)
+    with span("session_write"), mongo_deadline("session_write"):
+        res = db.sessions.insert_one(session)
+    session_cache.mark_created(res.inserted_id)   # invalida un posible negativo en /ai/*
     return {
         "session_id": str(res.inserted_id),
         "flow": "DASS21",
@@ -151,7 +185,8 @@ def dass21_question(session_id: str, index: int):
     """
     db = get_db()
     sid = _oid(session_id)
-    s = db.sessions.find_one({"_id": sid})
+    with span("session_read"), mongo_deadline("session_read"):
+        s = db.sessions.find_one({"_id": sid})
     if not s:
         raise HTTPException(404, "Sesión no encontrada")
     if not (0 <= index < 21):
@@ -162,43 +197,49 @@ def dass21_question(session_id: str, index: int):
 def dass21_answer(payload: DassAnswerIn):
     """
     Guarda respuesta. Si completa 21, devuelve puntajes y severidades.
+    Un solo viaje a Mongo: $set posicional sobre answers.<index> y se evalúa el documento ya actualizado
+    (dos respuestas concurrentes ya no se pisan la lista completa).
     """
     db = get_db()
     sid = _oid(payload.session_id)
-    s = db.sessions.find_one({"_id": sid})
+    if not (0 <= payload.index < 21):
+        raise HTTPException(400, "Índice fuera de rango")
+    with span("session_write"), mongo_deadline("session_write"):
+        s = db.sessions.find_one_and_update(
+            {"_id": sid},
+            {"$set": {f"answers.{payload.index}": payload.value}},
+            projection={"answers": 1},
+            return_document=ReturnDocument.AFTER,
+        )
     if not s:
         raise HTTPException(404, "Sesión no encontrada")
 
-    answers = s.get("answers", [None] * 21)
-    if not (0 <= payload.index < 21):
-        raise HTTPException(400, "Índice fuera de rango")
-    answers[payload.index] = payload.value
-    db.sessions.update_one({"_id": sid}, {"$set": {"answers": answers}})
+    progress = _dass21_progress(s.get("answers") or [])
+    if progress["done"]:
+        with span("session_write"), mongo_deadline("session_write"):
+            db.sessions.update_one(
+                {"_id": sid},
+                {"$set": {"state": "NEGOTIATION", "dass21_result": progress["scores"]}}
+            )
+    return progress
 
-    # siguiente
-    try:
-        next_idx = answers.index(None)
-        return {
-            "done": False,
-            "next_index": next_idx,
-            "next_text": DASS21_QUESTIONS[next_idx]
-        }
-    except ValueError:
-        # completo
-        vals = [int(v) for v in answers]
-        dep = _sum_items(vals, DEP_IDX) * 2
-        anx = _sum_items(vals, ANX_IDX) * 2
-        str_ = _sum_items(vals, STR_IDX) * 2
-        result = {
-            "depresion": {"score": dep, "severity": _severity(dep, "DEP")},
-            "ansiedad":  {"score": anx, "severity": _severity(anx, "ANX")},
-            "estres":    {"score": str_, "severity": _severity(str_, "STR")},
-        }
-        db.sessions.update_one(
+@router.post("/dass21/answers")
+def dass21_answers(payload: DassAnswersIn):
+    """
+    Guarda las 21 respuestas de una vez (cuestionario contestado sin conexión) y devuelve puntajes.
+    """
+    db = get_db()
+    sid = _oid(payload.session_id)
+    result = _dass21_scores(payload.answers)
+    with span("session_write"), mongo_deadline("session_write"):
+        s = db.sessions.find_one_and_update(
             {"_id": sid},
-            {"$set": {"state": "NEGOTIATION", "dass21_result": result}}
+            {"$set": {"answers": payload.answers, "state": "NEGOTIATION", "dass21_result": result}},
+            projection={"_id": 1},
         )
-        return {"done": True, "scores": result, "next_flow": "NEGOTIATION"}
+    if not s:
+        raise HTTPException(404, "Sesión no encontrada")
+    return {"done": True, "scores": result, "next_flow": "NEGOTIATION"}
 
 @router.post("/negotiation/message")
 def negotiation_message(payload: NegotiationIn):
@@ -208,21 +249,24 @@ def negotiation_message(payload: NegotiationIn):
     """
     db = get_db()
     sid = _oid(payload.session_id)
-    s = db.sessions.find_one({"_id": sid})
+    with span("session_read"), mongo_deadline("session_read"):
+        s = db.sessions.find_one({"_id": sid})
     if not s:
         raise HTTPException(404, "Sesión no encontrada")
 
-    crisis = _is_crisis(payload.user_message)
+    with span("guardrails"):
+        crisis = _is_crisis(payload.user_message)
     out = negotiation_reply(payload.user_message)
 
-    db.interactions.insert_one({
-        "session_id": sid,
-        "type": "negotiation",
-        "user_message": payload.user_message,
-        "bot_message": out["message"],
-        "crisis_detected": crisis,
-        "created_at": datetime.utcnow()
-    })
+    with span("db_write"), mongo_deadline("db_write"):
+        db.interactions.insert_one({
+            "session_id": sid,
+            "type": "negotiation",
+            "user_message": payload.user_message,
+            "bot_message": out["message"],
+            "crisis_detected": crisis,
+            "created_at": datetime.utcnow()
+        })
 
     return {"crisis_detected": crisis, **out}
 
@@ -233,20 +277,24 @@ def eea_step(payload: EeaStepIn):
     """
     db = get_db()
     sid = _oid(payload.session_id)
-    s = db.sessions.find_one({"_id": sid})
+    with span("session_read"), mongo_deadline("session_read"):
+        s = db.sessions.find_one({"_id": sid})
     if not s:
         raise HTTPException(404, "Sesión no encontrada")
 
-    step = EEA_STEPS.get(payload.step_key)
-    if not step:
+    if payload.step_key not in EEA_STEPS:
         raise HTTPException(400, "step_key inválido")
+    # Texto localizado desde memoria (catálogo); si aún no está construido, el canónico
+    localized = catalog_store.get_cached("eea_steps", payload.lang) or {}
+    step = localized.get("items", EEA_STEPS).get(payload.step_key) or EEA_STEPS[payload.step_key]
 
-    db.eea_entries.insert_one({
-        "session_id": sid,
-        "step_key": payload.step_key,
-        "user_text": payload.user_text,
-        "created_at": datetime.utcnow()
-    })
+    with span("db_write"), mongo_deadline("db_write"):
+        db.eea_entries.insert_one({
+            "session_id": sid,
+            "step_key": payload.step_key,
+            "user_text": payload.user_text,
+            "created_at": datetime.utcnow()
+        })
 
     return {
         "step_key": payload.step_key,
@@ -0,0 +1,125 @@
+# app/services/batch_translation.py
+"""
+Traducción por lotes español → náhuatl (POST /ai/nahuatl/batch).
+- Deduplica (misma llave de caché = misma traducción) y consulta primero la caché
+  (L1 en proceso, L2 en Mongo con una sola consulta $in).
+- Los faltantes se empaquetan en el menor número de llamadas posible según una
+  estimación de tokens (NAHUATL_BATCH_TOKENS) y un máximo de ítems por llamada.
+- Si una llamada de lote falla o devuelve otra cantidad de ítems, ese lote se reintenta
+  ítem por ítem: cada texto lleva su propio resultado/error.
+- Los resultados regresan en el orden de entrada.
+"""
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .tokens import estimate_tokens
+from .translation_cache import TranslationCache, cache_key
+
+NAHUATL_BATCH_MAX_ITEMS = 200          # ítems por petición HTTP
+NAHUATL_BATCH_TOKENS = 1500            # tokens fuente estimados por llamada upstream
+NAHUATL_BATCH_CALL_ITEMS = 40          # ítems por llamada upstream
+NAHUATL_BATCH_CONCURRENCY = 4          # llamadas upstream simultáneas por petición
+
+AskChunk = Callable[[List[str]], Awaitable[str]]
+AskOne = Callable[[str], Awaitable[str]]
+
+def pack(texts: List[str], max_tokens: int = NAHUATL_BATCH_TOKENS,
+         max_items: int = NAHUATL_BATCH_CALL_ITEMS) -> List[List[int]]:
+    """Agrupa índices de `texts` en lotes consecutivos dentro del presupuesto (un texto enorme va solo)."""
+    chunks: List[List[int]] = []
+    cur: List[int] = []
+    used = 0
+    for i, t in enumerate(texts):
+        cost = estimate_tokens(t)
+        if cur and (used + cost > max_tokens or len(cur) >= max_items):
+            chunks.append(cur)
+            cur, used = [], 0
+        cur.append(i)
+        used += cost
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def parse_reply(raw: str, n: int) -> Optional[List[str]]:
+    """Espera {"traducciones": [str, ...]} con exactamente n cadenas no vacías."""
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    items = data.get("traducciones") if isinstance(data, dict) else data
+    if not isinstance(items, list) or len(items) != n:
+        return None
+    out = [str(x).strip() for x in items]
+    return out if all(out) else None
+
+async def translate_batch(texts: List[str], model: str, cache: TranslationCache,
+                          ask_chunk: AskChunk, ask_one: AskOne) -> Dict[str, Any]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    groups: Dict[str, List[int]] = {}
+    for i, t in enumerate(texts):
+        if not (t or "").strip():
+            results[i] = {"index": i, "ok": False, "error": "texto vacío"}
+            continue
+        groups.setdefault(cache_key(t, model), []).append(i)
+
+    found: Dict[str, str] = {}
+    for key, idxs in groups.items():
+        hit = cache.get_local(texts[idxs[0]], model)
+        if hit is not None:
+            found[key] = hit
+    missing = [k for k in groups if k not in found]
+    if missing:
+        found.update(await run_in_threadpool(
+            cache.get_remote_many, [texts[groups[k][0]] for k in missing], model))
+    cached = set(found)
+
+    pending = [k for k in groups if k not in found]
+    errors: Dict[str, str] = {}
+    sources = [texts[groups[k][0]] for k in pending]
+    chunks = pack(sources)
+    sem = asyncio.Semaphore(NAHUATL_BATCH_CONCURRENCY)
+
+    async def _one(key: str, text: str) -> None:
+        try:
+            out = (await ask_one(text)).strip()
+            if not out:
+                raise ValueError("traducción vacía")
+            found[key] = out
+        except Exception as e:
+            errors[key] = str(e) or e.__class__.__name__
+
+    async def _chunk(idxs: List[int]) -> None:
+        chunk = [sources[i] for i in idxs]
+        async with sem:
+            reply = None
+            if len(chunk) > 1:
+                try:
+                    reply = parse_reply(await ask_chunk(chunk), len(chunk))
+                except Exception:
+                    reply = None
+            if reply is not None:
+                for i, out in zip(idxs, reply):
+                    found[pending[i]] = out
+            else:
+                await asyncio.gather(*(_one(pending[i], sources[i]) for i in idxs))
+
+    await asyncio.gather(*(_chunk(c) for c in chunks))
+
+    fresh = [(texts[groups[k][0]], found[k]) for k in pending if k in found]
+    if fresh:
+        await run_in_threadpool(cache.put_many, fresh, model)
+
+    for key, idxs in groups.items():
+        for i in idxs:
+            if key in found:
+                results[i] = {"index": i, "ok": True, "traduccion": found[key], "cached": key in cached}
+            else:
+                results[i] = {"index": i, "ok": False, "error": errors.get(key, "sin traducción")}
+    return {
+        "items": results,
+        "stats": {"total": len(texts), "unique": len(groups), "cached": len(cached),
+                  "translated": len(fresh), "failed": len(errors), "upstream_batches": len(chunks)},
+    }
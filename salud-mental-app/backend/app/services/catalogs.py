@@ -0,0 +1,115 @@
+# app/services/catalogs.py
+"""
+Catálogos localizados de instrumentos estáticos (preguntas DASS-21, pasos EEA).
+- es-MX es el texto canónico que registra routes/flows (register_source); otros idiomas se construyen UNA vez
+  (tarea en background al arrancar) traduciendo ítem por ítem.
+- Versionados por hash(texto fuente + idioma + modelo) y guardados en Mongo `catalogs`.
+  Un catálogo con status "reviewed" (revisado a mano) nunca se sobrescribe.
+- Se sirven desde memoria. El ETag sale del contenido servido (content_etag), no de la versión: un catálogo
+  incompleto (con texto fuente donde falló la traducción) y su reconstrucción comparten versión pero no ETag.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..db.mongo import get_db
+from .singleflight import SingleFlight
+
+log = logging.getLogger("uvicorn.info")
+
+COLLECTION = "catalogs"
+CANONICAL_LANG = "es-MX"
+# Un catálogo incompleto (traducción fallida) se reintenta como mucho cada N segundos
+REBUILD_INCOMPLETE_AFTER = 300
+
+Items = Union[List[str], Dict[str, str]]
+Translate = Callable[[str], Awaitable[str]]
+
+def catalog_lang(lang: str) -> str:
+    l = (lang or CANONICAL_LANG).lower()
+    return "nah" if l in ("nah", "nhe", "nhi", "nch", "nahuatl") else CANONICAL_LANG
+
+def source_version(items: Items, lang: str, model: str = "") -> str:
+    raw = json.dumps(items, ensure_ascii=False, sort_keys=True) + lang + model
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+def content_etag(items: Items, complete: bool) -> str:
+    raw = json.dumps(items, ensure_ascii=False, sort_keys=True) + ("" if complete else "\x00incompleto")
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+class CatalogStore:
+    def __init__(self) -> None:
+        # nombre → ítems canónicos (lista o dict ordenado), registrados por los routers dueños
+        self.sources: Dict[str, Items] = {}
+        self._mem: Dict[str, Dict[str, Any]] = {}
+        self._flight = SingleFlight()
+
+    def register_source(self, name: str, items: Items) -> None:
+        self.sources[name] = items
+        self._mem[f"{name}:{CANONICAL_LANG}"] = {
+            "name": name, "lang": CANONICAL_LANG, "version": source_version(items, CANONICAL_LANG),
+            "items": items, "status": "canonical", "complete": True, "etag": content_etag(items, True),
+        }
+
+    def get_cached(self, name: str, lang: str) -> Optional[Dict[str, Any]]:
+        return self._mem.get(f"{name}:{catalog_lang(lang)}")
+
+    def _load(self, name: str, lang: str) -> Optional[Dict[str, Any]]:
+        return get_db()[COLLECTION].find_one({"_id": f"{name}:{lang}"})
+
+    def _save(self, doc: Dict[str, Any]) -> None:
+        get_db()[COLLECTION].replace_one({"_id": doc["_id"], "status": {"$ne": "reviewed"}}, doc, upsert=True)
+
+    async def _build(self, name: str, lang: str, translate: Translate, model: str) -> Dict[str, Any]:
+        src = self.sources[name]
+        version = source_version(src, lang, model)
+        stored = await run_in_threadpool(self._load, name, lang)
+        if stored and (stored.get("status") == "reviewed" or
+                       (stored.get("version") == version and stored.get("complete"))):
+            if stored.get("version") != version:
+                log.warning(f"[catalogs] {name}:{lang} revisado pero desactualizado respecto a la fuente")
+            stored["etag"] = content_etag(stored["items"], stored.get("complete", True))
+            self._mem[f"{name}:{lang}"] = stored
+            return stored
+
+        start = time.time()
+        texts = list(src.values()) if isinstance(src, dict) else list(src)
+        out = await asyncio.gather(*(translate(t) for t in texts))
+        # translate devuelve el texto fuente si falla: se conserva y se marca incompleto
+        complete = all(o and o != t for o, t in zip(out, texts))
+        items: Items = dict(zip(src.keys(), out)) if isinstance(src, dict) else list(out)
+        doc = {
+            "_id": f"{name}:{lang}", "name": name, "lang": lang, "version": version,
+            "items": items, "status": "auto", "complete": complete,
+            "model": model, "built_at": time.time(), "etag": content_etag(items, complete),
+        }
+        await run_in_threadpool(self._save, doc)
+        self._mem[f"{name}:{lang}"] = doc
+        log.info(f"[catalogs] {name}:{lang} v{version} construido en {time.time() - start:.1f}s (completo={complete})")
+        return doc
+
+    async def get(self, name: str, lang: str, translate: Translate, model: str) -> Dict[str, Any]:
+        """Desde memoria; si falta (o quedó incompleto), construye una sola vez aunque haya concurrencia."""
+        lang = catalog_lang(lang)
+        doc = self._mem.get(f"{name}:{lang}")
+        if doc is not None and (doc.get("complete", True) or
+                                time.time() - doc.get("built_at", 0) < REBUILD_INCOMPLETE_AFTER):
+            return doc
+        try:
+            return await self._flight.do(f"{name}:{lang}", lambda: self._build(name, lang, translate, model))
+        except Exception as e:
+            log.warning(f"[catalogs] no se pudo construir {name}:{lang}: {e}")
+            return doc or self._mem[f"{name}:{CANONICAL_LANG}"]
+
+    async def warm(self, langs: List[str], translate: Translate, model: str) -> None:
+        """Tarea de arranque: deja listos todos los catálogos en `langs`."""
+        for lang in langs:
+            for name in self.sources:
+                await self.get(name, lang, translate, model)
+
+catalog_store = CatalogStore()
@@ -1,12 +1,12 @@
 ﻿"""
 Heurística simple de detección de banderas por texto (placeholder).
 En producción: usar NLU y listas curadas, con guardrails.
+Las listas y el autómata viven en services/guardrails (una sola pasada por texto).
 """
+from .guardrails import get_matcher
+
+_FLAG_ORDER = ("explicit_ideation", "hopelessness")
+
 def text_to_flags(text: str) -> list[str]:
-    t = (text or "").lower()
-    flags = []
-    if any(p in t for p in ["quiero morir", "quitarme la vida", "suicid", "me mato"]):
-        flags.append("explicit_ideation")
-    if any(p in t for p in ["sin esperanza", "no vale la pena", "no puedo más"]):
-        flags.append("hopelessness")
-    return flags
+    found = get_matcher().scan(text or "").flags
+    return [f for f in _FLAG_ORDER if f in found]
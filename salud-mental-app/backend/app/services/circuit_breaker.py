@@ -0,0 +1,155 @@
+# app/services/circuit_breaker.py
+"""
+Circuit breaker para los backends externos (Ollama, OpenAI).
+- closed: las llamadas pasan; se lleva una ventana de los últimos BREAKER_WINDOW resultados.
+  Cuenta como fallo una excepción o una llamada más lenta que `slow_after` segundos, también si se
+  cancela desde afuera (deadline de la petición) después de esperar ese tiempo.
+  Un rechazo por culpa de la petición (4xx: modelo inexistente, parámetros inválidos) NO es fallo:
+  el backend respondió bien y un cliente con `?model=` erróneo no debe abrir el circuito de todos.
+- open: si la tasa de fallos de la ventana supera `error_rate` (con al menos `min_calls`),
+  toda llamada falla al instante con CircuitOpen durante `open_for` segundos.
+- half_open: pasado ese tiempo se deja pasar UNA llamada de prueba; si sale bien se cierra,
+  si falla se vuelve a abrir.
+Los routers convierten CircuitOpen en la respuesta segura de respaldo (o 503 + Retry-After).
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+# Debe quedar por debajo del deadline más corto de una llamada al LLM (DEADLINE_INTERACTIVE_S = 20):
+# si el deadline corta antes, un host colgado nunca llega a contar como lento
+BREAKER_SLOW_S = float(os.getenv("BREAKER_SLOW_S", "15"))
+BREAKER_OPEN_S = float(os.getenv("BREAKER_OPEN_S", "15"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpen(RuntimeError):
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"circuito {name} abierto")
+        self.name = name
+        self.retry_after = retry_after
+
+class RequestRejected(RuntimeError):
+    """El backend respondió, pero rechazó la petición por culpa de la petición misma (4xx)."""
+
+def _is_caller_error(e: Exception) -> bool:
+    # openai.APIStatusError y similares traen status_code; 408/429 sí hablan de la salud del backend
+    if isinstance(e, RequestRejected):
+        return True
+    status = getattr(e, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+class CircuitBreaker:
+    def __init__(self, name: str, *, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, slow_after: float = BREAKER_SLOW_S,
+                 open_for: float = BREAKER_OPEN_S):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_after = slow_after
+        self.open_for = open_for
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._results: deque = deque(maxlen=window)   # True = fallo
+        self._probing = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> None:
+        """Lanza CircuitOpen si la llamada no debe intentarse ahora."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_for:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpen(self.name, self.retry_after())
+
+    def record(self, failed: bool) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                if failed:
+                    self._trip()
+                else:
+                    self.state = CLOSED
+                    self._results.clear()
+                return
+            self._results.append(failed)
+            n = len(self._results)
+            if self.state == CLOSED and n >= self.min_calls and sum(self._results) / n >= self.error_rate:
+                self._trip()
+
+    def record_error(self, e: Exception) -> None:
+        """Resultado de una llamada que lanzó `e` (los rechazos por culpa de la petición no cuentan)."""
+        self.record(not _is_caller_error(e))
+
+    def is_open(self) -> bool:
+        """True si ahora mismo rechazaría llamadas (sin consumir el intento de prueba)."""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.open_for
+
+    def abandon(self, elapsed: float = 0.0) -> None:
+        """
+        La llamada se canceló sin resultado (deadline vencido, candidato especulativo descartado).
+        Si ya llevaba `slow_after` esperando cuenta como llamada lenta; si no, no cuenta.
+        """
+        if elapsed >= self.slow_after:
+            self.record(True)
+            return
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def _trip(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._results.clear()
+        self.trips += 1
+
+    def retry_after(self) -> int:
+        return max(1, int(self.open_for - (time.monotonic() - self.opened_at) + 0.999))
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.allow()
+        start = time.perf_counter()
+        done = False
+        try:
+            result = await fn()
+            done = True
+        except Exception as e:
+            done = True
+            self.record_error(e)
+            raise
+        finally:
+            if not done:
+                self.abandon(time.perf_counter() - start)
+        self.record(time.perf_counter() - start > self.slow_after)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        n = len(self._results)
+        return {"state": self.state, "error_rate": round(sum(self._results) / n, 3) if n else 0.0,
+                "window": n, "trips": self.trips, "rejected": self.rejected,
+                "retry_after_s": self.retry_after() if self.state == OPEN else 0}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def breaker(name: str) -> CircuitBreaker:
+    b = _breakers.get(name)
+    if b is None:
+        b = _breakers.setdefault(name, CircuitBreaker(name))
+    return b
+
+def all_stats() -> Dict[str, Any]:
+    return {name: b.stats() for name, b in sorted(_breakers.items())}
@@ -0,0 +1,161 @@
+# app/services/deadline.py
+"""
+Deadline por petición, propagado a cada llamada saliente (Ollama, OpenAI, MongoDB).
+- El middleware de main.py fija un deadline absoluto (contextvar) según la clase del endpoint
+  (ROUTE_CLASSES → DEADLINE_CLASSES); el cliente puede ACORTARLO con el header X-Request-Deadline-Ms.
+- Cada llamada recibe como timeout lo que queda del presupuesto:
+    · corrutinas (httpx de Ollama, OpenAI): `await bounded("llm", coro)` (asyncio.wait_for, cancela la llamada)
+    · PyMongo en el threadpool: `with mongo_deadline("memory_read"):` (pymongo.timeout, CSOT)
+- Al agotarse se lanza DeadlineExceeded(stage); los routers responden con su fallback seguro
+  y stats() cuenta los vencimientos por etapa (/ai/metrics).
+Fuera de una petición (workers de fondo, tests) no hay deadline: budget() devuelve None.
+Las tareas de fondo que agenda una petición se lanzan con `background_task(coro)` para que no
+hereden su deadline (asyncio.create_task copia los contextvars de quien la crea).
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+T = TypeVar("T")
+
+DEADLINE_ENABLED = os.getenv("DEADLINE_ENABLED", "true").lower() == "true"
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+DEADLINE_MIN_S = 0.5     # un header más corto que esto se ignora (no vale la pena ni empezar)
+
+DEADLINE_CLASSES = {
+    "interactive": float(os.getenv("DEADLINE_INTERACTIVE_S", "20")),
+    "content": float(os.getenv("DEADLINE_CONTENT_S", "45")),
+    "stream": float(os.getenv("DEADLINE_STREAM_S", "90")),
+    "bulk": float(os.getenv("DEADLINE_BULK_S", "180")),
+    "default": float(os.getenv("DEADLINE_DEFAULT_S", "15")),
+}
+
+# Primer prefijo que coincide; rutas sin clase (métricas, ping, ...) no llevan deadline
+ROUTE_CLASSES = (
+    ("/ai/respuestas/stream", "stream"),
+    ("/ai/respuestas/voz", "stream"),
+    ("/ai/nahuatl/batch", "bulk"),
+    ("/ai/mindfullness", "content"),
+    ("/ai/tts", "content"),
+    ("/ai/genera_voz", "content"),
+    ("/ai/catalogs", "content"),   # un catálogo faltante se traduce en la petición
+    ("/ai/dass21", "content"),
+    ("/ai/saludos", "interactive"),
+    ("/ai/respuestas", "interactive"),
+    ("/ai/eea", "interactive"),
+    ("/ai/nahuatl", "interactive"),
+    ("/flows", "default"),
+)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+_exceeded: Dict[str, int] = {}
+_lock = threading.Lock()
+
+class DeadlineExceeded(RuntimeError):
+    def __init__(self, stage: str):
+        super().__init__(f"deadline vencido en {stage}")
+        self.stage = stage
+
+def route_budget(path: str, header: Optional[str] = None) -> Optional[float]:
+    """Segundos de presupuesto para `path`; el header solo puede acortarlo."""
+    cls = next((c for prefix, c in ROUTE_CLASSES if path.startswith(prefix)), None)
+    if cls is None:
+        return None
+    seconds = DEADLINE_CLASSES[cls]
+    try:
+        asked = float(header) / 1000 if header else None
+    except ValueError:
+        asked = None
+    if asked is not None and asked >= DEADLINE_MIN_S:
+        seconds = min(seconds, asked)
+    return seconds
+
+def start_request(path: str, header: Optional[str] = None):
+    """Fija el deadline de la petición. Devuelve el token para `finish_request` (o None)."""
+    if not DEADLINE_ENABLED:
+        return None
+    seconds = route_budget(path, header)
+    if seconds is None:
+        return None
+    return _deadline.set(time.monotonic() + seconds)
+
+def finish_request(token) -> None:
+    if token is not None:
+        _deadline.reset(token)
+
+def background_task(coro: Awaitable[T]) -> "asyncio.Task[T]":
+    """Tarea de fondo con un contexto limpio: no hereda el deadline de la petición que la agenda."""
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+def remaining() -> Optional[float]:
+    d = _deadline.get()
+    return None if d is None else d - time.monotonic()
+
+def exceeded(stage: str) -> DeadlineExceeded:
+    with _lock:
+        _exceeded[stage] = _exceeded.get(stage, 0) + 1
+    return DeadlineExceeded(stage)
+
+def check(stage: str) -> None:
+    """Lanza DeadlineExceeded(stage) si el deadline de la petición ya venció."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise exceeded(stage)
+
+def budget(stage: str, cap: Optional[float] = None) -> Optional[float]:
+    """Timeout para la próxima llamada de `stage` (a lo más `cap`); lanza si ya no queda tiempo."""
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise exceeded(stage)
+    return left if cap is None else min(left, cap)
+
+async def bounded(stage: str, aw: Awaitable[T]) -> T:
+    """Espera `aw` como mucho lo que queda del deadline (la cancela al vencer)."""
+    try:
+        timeout = budget(stage)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(aw):
+            aw.close()   # nunca se va a esperar
+        raise
+    if timeout is None:
+        return await aw
+    try:
+        return await asyncio.wait_for(aw, timeout)
+    except asyncio.TimeoutError:
+        if (remaining() or 0) > 0:
+            raise   # el timeout vino de adentro, no del deadline
+        raise exceeded(stage) from None
+
+@contextmanager
+def mongo_deadline(stage: str):
+    """Operaciones PyMongo del bloque limitadas a lo que queda del deadline (pymongo.timeout)."""
+    timeout = budget(stage)
+    if timeout is None:
+        yield
+        return
+    try:
+        with pymongo.timeout(timeout):
+            yield
+    except PyMongoError as e:
+        if e.timeout:
+            raise exceeded(stage) from e
+        raise
+
+def call_mongo(stage: str, fn: Callable[..., T], *args: Any, **kw: Any) -> T:
+    """fn(*args, **kw) dentro de mongo_deadline(stage); pensado para run_in_threadpool."""
+    with mongo_deadline(stage):
+        return fn(*args, **kw)
+
+def stats() -> Dict[str, Any]:
+    return {"enabled": DEADLINE_ENABLED, "classes": dict(DEADLINE_CLASSES),
+            "exceeded": dict(sorted(_exceeded.items()))}
@@ -0,0 +1,71 @@
+# app/services/generation_policy.py
+"""
+Política por endpoint para elegir entre reintentos en serie y candidatos especulativos.
+- Lleva una EWMA de la tasa de salidas marcadas por los guardrails.
+- Si la tasa supera el umbral, conviene lanzar LLM_SPECULATIVE_N candidatos en paralelo
+  (latencia ≈ 1 generación) en vez de reintentar en serie (hasta N generaciones).
+- La tasa solo se alimenta del primer intento en serie (prompt original): los reintentos con reglas
+  estrictas no son la misma población. En especulativo los candidatos que pierden la carrera se
+  cancelan, así que contar el candidato 0 solo cuando termina a tiempo sesgaría la tasa hacia arriba;
+  en su lugar 1 de cada LLM_SPECULATIVE_PROBE peticiones en modo especulativo va en serie como muestra.
+LLM_GENERATION_MODE=auto|serial|speculative fuerza el modo globalmente.
+"""
+import os
+import threading
+from typing import Any, Dict
+
+LLM_GENERATION_MODE = os.getenv("LLM_GENERATION_MODE", "auto").lower()
+LLM_SPECULATIVE_N = int(os.getenv("LLM_SPECULATIVE_N", "3"))
+LLM_SPECULATIVE_FLAG_RATE = float(os.getenv("LLM_SPECULATIVE_FLAG_RATE", "0.2"))
+LLM_SPECULATIVE_PROBE = int(os.getenv("LLM_SPECULATIVE_PROBE", "5"))
+EWMA_ALPHA = 0.1
+
+class GenerationPolicy:
+    def __init__(self, threshold: float = LLM_SPECULATIVE_FLAG_RATE, mode: str = LLM_GENERATION_MODE,
+                 speculative_n: int = LLM_SPECULATIVE_N, probe_every: int = LLM_SPECULATIVE_PROBE):
+        self.threshold = threshold
+        self.mode = mode
+        self.speculative_n = max(1, speculative_n)
+        self.probe_every = max(1, probe_every)
+        self.flag_rate = 0.0
+        self.samples = 0
+        self.probes = 0
+        self._since_probe = 0
+        self.chosen = {"serial": 0, "speculative": 0}
+        self._lock = threading.Lock()
+
+    def choose(self) -> str:
+        if self.mode in ("serial", "speculative"):
+            mode = self.mode
+        else:
+            mode = "speculative" if self.flag_rate > self.threshold else "serial"
+            if mode == "speculative":
+                self._since_probe += 1
+                if self._since_probe >= self.probe_every:   # muestra en serie para medir la tasa
+                    self._since_probe = 0
+                    self.probes += 1
+                    mode = "serial"
+        self.chosen[mode] += 1
+        return mode
+
+    def record(self, flagged: bool) -> None:
+        """Registra si una generación con el prompt original tropezó con los guardrails."""
+        with self._lock:
+            self.samples += 1
+            self.flag_rate += EWMA_ALPHA * ((1.0 if flagged else 0.0) - self.flag_rate)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"flag_rate": round(self.flag_rate, 4), "samples": self.samples,
+                "threshold": self.threshold, "mode": self.mode, "speculative_n": self.speculative_n,
+                "probe_every": self.probe_every, "probes": self.probes, "chosen": dict(self.chosen)}
+
+_policies: Dict[str, GenerationPolicy] = {}
+
+def policy_for(endpoint: str) -> GenerationPolicy:
+    p = _policies.get(endpoint)
+    if p is None:
+        p = _policies.setdefault(endpoint, GenerationPolicy())
+    return p
+
+def all_stats() -> Dict[str, Any]:
+    return {name: p.stats() for name, p in sorted(_policies.items())}
@@ -0,0 +1,117 @@
+# app/services/generation_profiles.py
+"""
+Perfiles de generación por endpoint: la forma de la salida que pide cada plantilla, declarada una vez.
+- num_predict: tope duro de tokens (options.num_predict de Ollama).
+- stop: secuencias de paro (options.stop), p. ej. que el modelo empiece a escribir otro turno.
+- max_sentences: corte temprano; se genera con stream y se cierra en cuanto hay N oraciones
+  completas (al cerrar la conexión Ollama deja de decodificar).
+GENERATION_PROFILES_ENABLED=false vuelve a la generación sin límites.
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from .sentence_pipeline import SentenceBudget
+
+GENERATION_PROFILES_ENABLED = os.getenv("GENERATION_PROFILES_ENABLED", "true").lower() == "true"
+
+# El modelo a veces sigue el transcript de la memoria e inventa el turno siguiente
+TURN_STOPS = ("\nUsuario:", "\nAsistente:")
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    num_predict: int
+    stop: Tuple[str, ...] = TURN_STOPS
+    max_sentences: Optional[int] = None
+
+    def options(self) -> Dict[str, Any]:
+        opts: Dict[str, Any] = {"num_predict": self.num_predict}
+        if self.stop:
+            opts["stop"] = list(self.stop)
+        return opts
+
+# ~1.5 tokens por palabra en español; holgura para no cortar a media frase antes del cupo de oraciones
+PROFILES: Dict[str, GenerationProfile] = {
+    # "30–70 palabras"
+    "saludos": GenerationProfile(num_predict=140, max_sentences=4),
+    # "1–3 frases"; un párrafo, sin Markdown
+    "respuestas": GenerationProfile(num_predict=160, stop=TURN_STOPS + ("\n\n",), max_sentences=3),
+    # lista numerada de ≥ 4 pasos, 20–70 palabras por ejercicio: solo tope de tokens
+    "mindfullness": GenerationProfile(num_predict=320),
+    # "SOLO UN paso (20–70 palabras)"
+    "eea": GenerationProfile(num_predict=140, max_sentences=5),
+}
+
+_stats: Dict[str, Dict[str, int]] = {}
+
+def profile_for(endpoint: Optional[str]) -> Optional[GenerationProfile]:
+    if not GENERATION_PROFILES_ENABLED or endpoint is None:
+        return None
+    return PROFILES.get(endpoint)
+
+def _record(endpoint: str, tokens: int, early: bool) -> None:
+    st = _stats.setdefault(endpoint, {"calls": 0, "tokens": 0, "early_stops": 0})
+    st["calls"] += 1
+    st["tokens"] += tokens
+    st["early_stops"] += int(early)
+
+def _with_options(profile: GenerationProfile, kw: Dict[str, Any]) -> Dict[str, Any]:
+    # las options explícitas de quien llama (seed, etc.) mandan sobre el perfil
+    return {**kw, "options": {**profile.options(), **(kw.get("options") or {})}}
+
+async def _shaped(ollama, model: str, prompt: str, profile: GenerationProfile, endpoint: str,
+                  meta: Dict[str, Any], **kw) -> AsyncIterator[str]:
+    budget = SentenceBudget(profile.max_sentences) if profile.max_sentences else None
+    stream = ollama.stream(model, prompt, **_with_options(profile, kw))
+    tokens = 0
+    try:
+        async for chunk in stream:
+            tokens += 1     # Ollama manda un fragmento por token
+            if budget is None:
+                yield chunk
+                continue
+            piece = budget.feed(chunk)
+            if piece:
+                yield piece
+            if budget.done:
+                break
+    finally:
+        await stream.aclose()
+        early = bool(budget and budget.done)
+        meta.update(eval_count=tokens, done_reason="sentences" if early else "stop")
+        _record(endpoint, tokens, early)
+
+async def shaped_stream(ollama, model: str, prompt: str, profile: Optional[GenerationProfile],
+                        endpoint: str, **kw) -> AsyncIterator[str]:
+    """
+    ollama.stream con el perfil aplicado: options + corte al completar max_sentences.
+    Quien corta antes de terminar debe cerrarlo (aclose) para soltar la conexión con Ollama.
+    """
+    stream = (ollama.stream(model, prompt, **kw) if profile is None
+              else _shaped(ollama, model, prompt, profile, endpoint, {}, **kw))
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        await stream.aclose()
+
+async def generate_with_profile(ollama, model: str, prompt: str, profile: Optional[GenerationProfile],
+                                endpoint: str, **kw) -> Dict[str, Any]:
+    """ollama.generate con el perfil; con max_sentences genera por stream para poder cortar antes."""
+    if profile is None:
+        return await ollama.generate(model, prompt, **kw)
+    if not profile.max_sentences:
+        data = await ollama.generate(model, prompt, **_with_options(profile, kw))
+        _record(endpoint, data.get("eval_count", 0), False)
+        return data
+    meta: Dict[str, Any] = {}
+    parts = [chunk async for chunk in _shaped(ollama, model, prompt, profile, endpoint, meta, **kw)]
+    return {"response": "".join(parts), "done": True, **meta}
+
+def all_stats() -> Dict[str, Any]:
+    return {
+        "enabled": GENERATION_PROFILES_ENABLED,
+        "profiles": {e: {**p.options(), "max_sentences": p.max_sentences} for e, p in PROFILES.items()},
+        "observed": {e: {**st, "avg_tokens": round(st["tokens"] / st["calls"], 1) if st["calls"] else None}
+                     for e, st in sorted(_stats.items())},
+    }
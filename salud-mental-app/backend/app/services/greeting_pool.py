@@ -0,0 +1,103 @@
+# app/services/greeting_pool.py
+"""
+Pool de saludos pregenerados para /ai/saludos.
+- Un bucket por idioma (GREETING_POOL_LANGS) con saludos que ya pasaron guardrails (y traducción),
+  escritos con el hueco NAME_SLOT; take() lo rellena con el nombre y sirve sin tocar el LLM.
+- Cada saludo se sirve una vez. Si un bucket baja de GREETING_POOL_LOW_WATER se despierta
+  el worker, que lo rellena hasta GREETING_POOL_SIZE con prioridad BULK en el scheduler.
+- Solo sirve peticiones sin memoria de sesión: con memoria, el saludo personalizado va por el LLM.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+log = logging.getLogger("uvicorn.info")
+
+GREETING_POOL_ENABLED = os.getenv("GREETING_POOL_ENABLED", "true").lower() == "true"
+GREETING_POOL_LANGS = [l.strip() for l in os.getenv("GREETING_POOL_LANGS", "es-MX,nah").split(",") if l.strip()]
+GREETING_POOL_SIZE = int(os.getenv("GREETING_POOL_SIZE", "20"))
+GREETING_POOL_LOW_WATER = int(os.getenv("GREETING_POOL_LOW_WATER", "5"))
+GREETING_POOL_RETRY_S = float(os.getenv("GREETING_POOL_RETRY_S", "30"))
+GREETING_POOL_MAX_FAILS = 3          # fallos seguidos antes de dejar un bucket para la siguiente vuelta
+
+NAME_SLOT = "{name}"
+
+# produce(lang) -> (texto con NAME_SLOT, modelo) o None si el candidato no sirve
+Producer = Callable[[str], Awaitable[Optional[Tuple[str, str]]]]
+
+class GreetingPool:
+    def __init__(self, langs: Iterable[str] = GREETING_POOL_LANGS, *, size: int = GREETING_POOL_SIZE,
+                 low_water: int = GREETING_POOL_LOW_WATER, retry_s: float = GREETING_POOL_RETRY_S,
+                 enabled: bool = GREETING_POOL_ENABLED):
+        self.size = size
+        self.low_water = low_water
+        self.retry_s = retry_s
+        self.enabled = enabled
+        self.buckets: Dict[str, Deque[Tuple[str, str]]] = {l: deque() for l in langs}
+        self._wake = asyncio.Event()
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def take(self, lang: str, name: str) -> Optional[Tuple[str, str]]:
+        """(saludo con el nombre, modelo) o None si el bucket está vacío o el idioma no tiene pool."""
+        bucket = self.buckets.get(lang)
+        if not self.enabled or bucket is None:
+            return None
+        if not bucket:
+            self.misses += 1
+            self._wake.set()
+            return None
+        text, model = bucket.popleft()
+        self.hits += 1
+        if len(bucket) < self.low_water:
+            self._wake.set()
+        return text.replace(NAME_SLOT, name), model
+
+    async def fill(self, lang: str, produce: Producer) -> int:
+        """Genera hasta dejar el bucket en `size`. Devuelve cuántos agregó."""
+        bucket, added, fails = self.buckets[lang], 0, 0
+        while len(bucket) < self.size and fails < GREETING_POOL_MAX_FAILS:
+            try:
+                item = await produce(lang)
+            except Exception as e:
+                self.errors += 1
+                fails += 1
+                log.warning(f"[greeting_pool] {lang}: {e}")
+                continue
+            if not item or NAME_SLOT not in item[0] or any(item[0] == t for t, _ in bucket):
+                self.rejected += 1
+                fails += 1
+                continue
+            bucket.append(item)
+            self.generated += 1
+            added += 1
+            fails = 0
+        return added
+
+    async def run(self, produce: Producer) -> None:
+        """Tarea de fondo del lifespan: llenado inicial y recarga por debajo de la marca baja."""
+        if not self.enabled:
+            return
+        while True:
+            self._wake.clear()
+            for lang, bucket in self.buckets.items():
+                if len(bucket) < self.low_water:   # al arrancar todos están vacíos: llenado inicial
+                    await self.fill(lang, produce)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.retry_s)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        served = self.hits + self.misses
+        return {"enabled": self.enabled, "sizes": {l: len(b) for l, b in self.buckets.items()},
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / served, 4) if served else None,
+                "generated": self.generated, "rejected": self.rejected, "errors": self.errors}
+
+greeting_pool = GreetingPool()
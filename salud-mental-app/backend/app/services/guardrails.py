@@ -0,0 +1,146 @@
+"""
+Motor único de guardrails (Aho-Corasick).
+- Normaliza términos y texto igual (minúsculas, sin acentos, espacios colapsados).
+- Construye el autómata UNA vez al importar (startup) con todas las listas curadas.
+- Devuelve todas las coincidencias y banderas en una sola pasada O(len(texto)).
+Lo usan routes/ai, routes/flows, chatbot_service y la cadena empática.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from unidecode import unidecode
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "ai" / "prompts"
+
+# ------------------- Listas curadas -------------------
+BANNED_TERMS = [
+    "suicidio","suicidarme","suicidarse","suicidios","suicidio asistido",
+    "quitarme la vida","me quiero matar","me mato","matarme","matarme ahora",
+    "asesinarme","hacerme daño","autolesion","autolesión","autolesionarme",
+    "lastimarme","me quiero lastimar","ahorcarme","cortarme",
+    "cortarse las venas","cortar las venas","envenenarme","ideación suicida",
+    "ideacion suicida","ideación suicida pasiva","deseo de estar muerto",
+    "desesperanza","falta de propósito","sentirse atrapado","retiro social",
+    "cambios de ánimo","comportamiento imprudente","cortarse / cortes",
+    "quemarse","autolesión / lesión auto-infligida","automutilación"
+]
+
+IDEATION_TERMS = ["quiero morir", "quitarme la vida", "suicid", "me mato"]
+HOPELESSNESS_TERMS = ["sin esperanza", "no vale la pena", "no puedo más"]
+CRISIS_KEYWORDS = ["quiero", "matar", "suic", "autoles", "hacerme daño", "lastimarme", "no quiero vivir"]
+
+def _load_lines(path: Path) -> List[str]:
+    if not path.exists():
+        return []
+    text = path.read_text(encoding="utf-8-sig")
+    return [l.strip() for l in text.splitlines() if l.strip()]
+
+BLOCKLIST = _load_lines(PROMPTS_DIR / "guardrails_bloqueo.txt")
+
+# ------------------- Normalización -------------------
+_WS_RE = re.compile(r"\s+")
+
+def normalize(txt: str) -> str:
+    return _WS_RE.sub(" ", unidecode((txt or "").lower())).strip()
+
+# ------------------- Autómata -------------------
+@dataclass(frozen=True)
+class GuardrailResult:
+    matches: Tuple[str, ...]   # términos (normalizados) encontrados, sin duplicados
+    flags: frozenset           # categorías activadas
+
+    def has(self, flag: str) -> bool:
+        return flag in self.flags
+
+    def __bool__(self) -> bool:
+        return bool(self.matches)
+
+class GuardrailMatcher:
+    """
+    Autómata Aho-Corasick sobre texto normalizado.
+    `terms_by_flag` mapea categoría → términos; un término puede tener varias categorías.
+    """
+
+    def __init__(self, terms_by_flag: Mapping[str, Iterable[str]]):
+        term_flags: Dict[str, set] = {}
+        for flag, terms in terms_by_flag.items():
+            for term in terms:
+                norm = normalize(term)
+                if norm:
+                    term_flags.setdefault(norm, set()).add(flag)
+
+        self.terms: List[str] = list(term_flags)
+        self.term_flags: List[frozenset] = [frozenset(term_flags[t]) for t in self.terms]
+        self.flags: frozenset = frozenset(terms_by_flag)
+        self.max_term_len = max((len(t) for t in self.terms), default=0)
+
+        # goto[estado][char] -> estado ; out[estado] -> índices de términos
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[int, ...]] = [()]
+        for idx, term in enumerate(self.terms):
+            node = 0
+            for ch in term:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(())
+                node = nxt
+            self._out[node] = self._out[node] + (idx,)
+
+        # Enlaces de fallo por BFS; las salidas se heredan del enlace de fallo
+        self._fail: List[int] = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _iter_hits(self, norm: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in norm:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                yield from out[node]
+
+    def scan(self, text: str, *, normalized: bool = False) -> GuardrailResult:
+        """Una sola pasada: todas las coincidencias y categorías."""
+        norm = text if normalized else normalize(text)
+        seen: Dict[int, None] = {}
+        for idx in self._iter_hits(norm):
+            seen.setdefault(idx, None)
+        flags = frozenset().union(*(self.term_flags[i] for i in seen)) if seen else frozenset()
+        return GuardrailResult(matches=tuple(self.terms[i] for i in seen), flags=flags)
+
+    def has_flag(self, text: str, flag: str, *, normalized: bool = False) -> bool:
+        """Corta en la primera coincidencia de la categoría (para checks booleanos)."""
+        norm = text if normalized else normalize(text)
+        term_flags = self.term_flags
+        return any(flag in term_flags[idx] for idx in self._iter_hits(norm))
+
+def build_default_matcher() -> GuardrailMatcher:
+    return GuardrailMatcher({
+        "banned": BANNED_TERMS,
+        "explicit_ideation": IDEATION_TERMS,
+        "hopelessness": HOPELESSNESS_TERMS,
+        "crisis": CRISIS_KEYWORDS,
+        "blocklist": BLOCKLIST,
+    })
+
+MATCHER = build_default_matcher()
+
+def get_matcher() -> GuardrailMatcher:
+    return MATCHER
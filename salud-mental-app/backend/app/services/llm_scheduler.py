@@ -0,0 +1,174 @@
+# app/services/llm_scheduler.py
+"""
+Control de admisión para el LLM (por modelo).
+- Límite de generaciones concurrentes por modelo = LLM_MAX_CONCURRENCY × hosts de Ollama que hoy lo
+  atienden (ollama_client.capacity, se recalcula en cada admisión) + cola de espera acotada.
+  Agregar hosts a OLLAMA_HOSTS sube la concurrencia admitida sin tocar el límite por host.
+  Una petición que lanza varias generaciones a la vez (modo especulativo) pide un cupo por cada una.
+- Clases de prioridad: los turnos de conversación (posible crisis) pasan antes
+  que el contenido y la generación masiva.
+- Cola llena o espera excedida → LLMSaturated (el router responde 429/503 + Retry-After).
+- Métricas: profundidad de cola y tiempo de espera (para autoescalado).
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..telemetry.metrics import histogram
+from .ollama_client import capacity as ollama_capacity
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))   # por host que atiende el modelo
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_MAX_WAIT = float(os.getenv("LLM_MAX_WAIT", "20"))
+
+# Menor = más prioritario
+PRIORITY_CRISIS = 0        # turnos de conversación (/respuestas)
+PRIORITY_INTERACTIVE = 1   # saludos, pasos guiados
+PRIORITY_CONTENT = 2       # ejercicios generados (mindfulness)
+PRIORITY_BULK = 3          # catálogos, lotes, resúmenes en background
+
+PRIORITY_NAMES = {PRIORITY_CRISIS: "crisis", PRIORITY_INTERACTIVE: "interactive",
+                  PRIORITY_CONTENT: "content", PRIORITY_BULK: "bulk"}
+
+class LLMSaturated(Exception):
+    def __init__(self, reason: str, retry_after: int, status_code: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+class _ModelGate:
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._heap: List[Tuple[int, int, int, asyncio.Future]] = []   # (prioridad, orden, cupos, fut)
+        self._seq = itertools.count()
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.avg_service = 2.0   # EWMA del tiempo de servicio (s) para estimar Retry-After
+
+    def queued(self) -> int:
+        return sum(1 for _, _, _, f in self._heap if not f.done())
+
+    def retry_after(self) -> int:
+        waiting = self.queued() + 1
+        return max(1, int(self.avg_service * waiting / max(1, self.limit)))
+
+    def _wake_next(self) -> None:
+        # en orden estricto: si a la cabeza no le alcanzan los cupos, los de atrás esperan (sin inanición)
+        while self._heap:
+            _, _, permits, fut = self._heap[0]
+            if fut.done():
+                heapq.heappop(self._heap)
+                continue
+            if self.active + permits > self.limit:
+                return
+            heapq.heappop(self._heap)
+            self.active += permits
+            fut.set_result(None)
+
+    async def acquire(self, priority: int, max_wait: float, permits: int = 1) -> int:
+        """Espera `permits` cupos (a lo más `limit`, si no nunca entraría). Devuelve los cupos tomados."""
+        permits = max(1, min(permits, self.limit))
+        if self.active + permits <= self.limit and not self.queued():
+            self.active += permits
+            return permits
+        if self.queued() >= self.max_queue:
+            self.rejected += 1
+            raise LLMSaturated("cola LLM llena", self.retry_after(), 429)
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), permits, fut))
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=max_wait)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            if fut.done() and not fut.cancelled():   # admitido justo al expirar: devolver el cupo
+                self.release(permits)
+            fut.cancel()
+            self._wake_next()   # la cabeza que bloqueaba ya no está
+            raise LLMSaturated("espera LLM excedida", self.retry_after(), 503)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(permits)
+            fut.cancel()
+            self._wake_next()
+            raise
+        return permits
+
+    def release(self, permits: int = 1) -> None:
+        self.active -= permits
+        self._wake_next()
+
+class LLMScheduler:
+    def __init__(self, limit: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 max_wait: float = LLM_MAX_WAIT, capacity: Optional[Callable[[str], int]] = None):
+        self.limit = limit          # por host; sin `capacity`, por modelo
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.capacity = capacity    # modelo → hosts que lo atienden
+        self._gates: Dict[str, _ModelGate] = {}
+
+    def _gate(self, model: str) -> _ModelGate:
+        g = self._gates.get(model)
+        if g is None:
+            g = self._gates.setdefault(model, _ModelGate(self.limit, self.max_queue))
+        if self.capacity is not None:
+            limit = self.limit * max(1, self.capacity(model))
+            if limit != g.limit:
+                g.limit = limit
+                g._wake_next()   # hosts nuevos: entran los que esperaban
+        return g
+
+    async def admit(self, model: str, priority: int = PRIORITY_INTERACTIVE,
+                    max_wait: Optional[float] = None, permits: int = 1) -> Callable[[], None]:
+        """
+        Espera turno (por prioridad) para generar con `model`. Devuelve release() idempotente.
+        `max_wait` (p. ej. lo que queda del deadline de la petición) acorta LLM_MAX_WAIT.
+        `permits`: generaciones simultáneas que lanzará quien llama (candidatos especulativos).
+        """
+        gate = self._gate(model)
+        queued_at = time.perf_counter()
+        permits = await gate.acquire(priority, self.max_wait if max_wait is None else min(self.max_wait, max_wait),
+                                     permits)
+        histogram(f"llm.queue_wait.{PRIORITY_NAMES.get(priority, priority)}").observe(
+            time.perf_counter() - queued_at)
+        gate.admitted += 1
+        start = time.perf_counter()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            gate.avg_service += 0.1 * ((time.perf_counter() - start) - gate.avg_service)
+            gate.release(permits)
+
+        return release
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int = PRIORITY_INTERACTIVE):
+        release = await self.admit(model, priority)
+        try:
+            yield
+        finally:
+            release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit, "max_queue": self.max_queue, "max_wait_s": self.max_wait,
+            "models": {
+                m: {"limit": g.limit, "active": g.active, "queued": g.queued(), "admitted": g.admitted,
+                    "rejected": g.rejected, "timeouts": g.timeouts,
+                    "avg_service_s": round(g.avg_service, 3)}
+                for m, g in sorted(self._gates.items())
+            },
+        }
+
+llm_scheduler = LLMScheduler(capacity=ollama_capacity)
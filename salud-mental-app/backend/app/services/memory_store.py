@@ -0,0 +1,109 @@
+# app/services/memory_store.py
+"""
+Memoria conversacional acotada: UN documento por sesión en `ai_memory`.
+- append: un solo update atómico ($push + $each + $slice) con upsert.
+- lectura: un find_one por _id (índice primario) con proyección $slice.
+- modo resumen (services/memory_summarizer): `summary` + `summarized_upto` en el mismo documento;
+  los mensajes ya resumidos se retiran con $pull en la misma escritura que guarda el resumen.
+- migrate_ai_messages(): migra el historial de la colección anterior `ai_messages`.
+  Uso: python -m app.services.memory_store migrate [--drop-old]
+"""
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..db.mongo import get_db
+
+COLLECTION = "ai_memory"
+LEGACY_COLLECTION = "ai_messages"
+
+def append(sid_oid, messages: List[Tuple[str, str]], max_messages: int) -> None:
+    """Agrega (role, text) y recorta a los últimos `max_messages` en una sola escritura."""
+    now = time.time()
+    docs = [{"role": role, "text": text, "ts": now} for role, text in messages]
+    get_db()[COLLECTION].update_one(
+        {"_id": sid_oid},
+        {
+            "$push": {"messages": {"$each": docs, "$slice": -max_messages}},
+            "$set": {"updated_at": now},
+        },
+        upsert=True,
+    )
+
+def get_messages(sid_oid, limit: int) -> List[Dict]:
+    """Últimos `limit` mensajes de la sesión (orden cronológico)."""
+    doc = get_db()[COLLECTION].find_one(
+        {"_id": sid_oid},
+        {"messages": {"$slice": -limit}},
+    )
+    return (doc or {}).get("messages", [])
+
+def get_context(sid_oid, limit: int) -> Tuple[str, List[Dict]]:
+    """(resumen acumulado, últimos `limit` mensajes) en una sola lectura."""
+    doc = get_db()[COLLECTION].find_one(
+        {"_id": sid_oid},
+        {"summary": 1, "messages": {"$slice": -limit}},
+    ) or {}
+    return doc.get("summary", ""), doc.get("messages", [])
+
+def get_for_summary(sid_oid) -> Optional[Dict]:
+    return get_db()[COLLECTION].find_one(
+        {"_id": sid_oid},
+        {"summary": 1, "summarized_upto": 1, "messages": 1},
+    )
+
+def save_summary(sid_oid, summary: str, upto: float, prev_upto: Optional[float]) -> bool:
+    """
+    Guarda el resumen que cubre los mensajes con ts <= upto y los retira de la ventana.
+    Control optimista: si otro proceso ya avanzó `summarized_upto`, no escribe (False).
+    """
+    res = get_db()[COLLECTION].update_one(
+        {"_id": sid_oid, "summarized_upto": prev_upto},
+        {
+            "$set": {"summary": summary, "summarized_upto": upto},
+            "$pull": {"messages": {"ts": {"$lte": upto}}},
+        },
+    )
+    return res.modified_count == 1
+
+def migrate_ai_messages(max_messages: int, drop_old: bool = False) -> Dict[str, int]:
+    """
+    Agrupa `ai_messages` por sesión (ordenado por ts) y lo escribe como ventana en `ai_memory`.
+    Idempotente: reemplaza la ventana de cada sesión migrada.
+    """
+    db = get_db()
+    pipeline = [
+        {"$sort": {"session_id": 1, "ts": 1}},
+        {"$group": {
+            "_id": "$session_id",
+            "messages": {"$push": {"role": "$role", "text": "$text", "ts": "$ts"}},
+            "updated_at": {"$max": "$ts"},
+        }},
+    ]
+    sessions = 0
+    for g in db[LEGACY_COLLECTION].aggregate(pipeline, allowDiskUse=True):
+        db[COLLECTION].update_one(
+            {"_id": g["_id"]},
+            {"$set": {"messages": g["messages"][-max_messages:], "updated_at": g["updated_at"]}},
+            upsert=True,
+        )
+        sessions += 1
+    if drop_old and sessions:
+        db[LEGACY_COLLECTION].drop()
+    return {"sessions": sessions}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["migrate"]:
+        print("uso: python -m app.services.memory_store migrate [--drop-old]")
+        sys.exit(2)
+
+    from dotenv import load_dotenv, find_dotenv
+    load_dotenv(find_dotenv())
+    from ..db.mongo import connect_to_mongo, disconnect_from_mongo
+    from ..routes.ai import MEMORY_MAX_TURNS
+
+    connect_to_mongo()
+    try:
+        print(migrate_ai_messages(MEMORY_MAX_TURNS * 2, drop_old="--drop-old" in sys.argv))
+    finally:
+        disconnect_from_mongo()
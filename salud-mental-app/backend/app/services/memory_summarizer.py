@@ -0,0 +1,131 @@
+# app/services/memory_summarizer.py
+"""
+Memoria con resumen incremental (MEMORY_MODE=summary).
+- Tras cada respuesta se agenda, en background, plegar los turnos más viejos que los
+  últimos MEMORY_RECENT_TURNS al `summary` del documento de `ai_memory`.
+- El prompt recibe: resumen + últimos turnos textuales, dentro de MEMORY_TOKEN_BUDGET
+  (estimación ~4 caracteres por token). Así el largo del prompt por sesión es ~constante.
+- Una sola tarea por sesión a la vez; si llegan más turnos mientras corre, se repite al terminar.
+- El resumen pasa por llm_scheduler con prioridad BULK: nunca le gana turno a un usuario.
+MEMORY_MODE=window (default) conserva el comportamiento anterior (ventana de mensajes).
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from . import memory_store
+from .deadline import background_task
+from .llm_scheduler import PRIORITY_BULK, llm_scheduler
+from .ollama_client import get_ollama
+from .tokens import estimate_tokens
+
+log = logging.getLogger("uvicorn.info")
+
+MEMORY_MODE = os.getenv("MEMORY_MODE", "window").lower()
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "600"))
+MEMORY_SUMMARY_WORDS = int(os.getenv("MEMORY_SUMMARY_WORDS", "120"))
+MEMORY_SUMMARY_MODEL = os.getenv("MEMORY_SUMMARY_MODEL") or os.getenv("OLLAMA_MODEL", "llama3.1:8b")
+
+TEMPLATE_RESUMEN = """
+Actualiza el resumen de una conversación de acompañamiento emocional.
+Escribe en español, en tercera persona, máximo {palabras} palabras, sin Markdown.
+Conserva: nombre y situación de la persona, emociones, temas, ejercicios ya propuestos
+y cualquier señal de riesgo. Omite saludos y relleno. Devuelve SOLO el resumen.
+
+Resumen previo:
+{resumen}
+
+Turnos nuevos:
+{turnos}
+"""
+
+def _line(m: Dict[str, Any]) -> str:
+    prefix = "Usuario:" if m["role"] == "user" else "Asistente:"
+    return f"{prefix} {m['text']}"
+
+def render(summary: str, messages: List[Dict[str, Any]], recent_turns: int = MEMORY_RECENT_TURNS,
+           token_budget: int = MEMORY_TOKEN_BUDGET) -> str:
+    """Resumen + los turnos más recientes que quepan en el presupuesto (los más nuevos primero)."""
+    budget = token_budget
+    head = ""
+    if summary:
+        head = f"Resumen: {summary}"
+        budget -= estimate_tokens(head)
+    lines: List[str] = []
+    for m in reversed(messages[-recent_turns * 2:]):
+        line = _line(m)
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        lines.append(line)
+        budget -= cost
+    lines.reverse()
+    return "\n".join([head, *lines] if head else lines)
+
+class MemorySummarizer:
+    def __init__(self, recent_turns: int = MEMORY_RECENT_TURNS, model: str = MEMORY_SUMMARY_MODEL):
+        self.recent_turns = recent_turns
+        self.model = model
+        self._running: Dict[Any, asyncio.Task] = {}
+        self._dirty: Set[Any] = set()
+        self.runs = 0
+        self.failures = 0
+        self.conflicts = 0
+
+    def schedule(self, sid_oid) -> None:
+        """Agenda (sin esperar) la actualización del resumen de la sesión."""
+        if sid_oid in self._running:
+            self._dirty.add(sid_oid)
+            return
+        # contexto limpio: el resumen no vive bajo el deadline de la petición que lo agenda
+        self._running[sid_oid] = background_task(self._loop(sid_oid))
+
+    async def _loop(self, sid_oid) -> None:
+        try:
+            while True:
+                self._dirty.discard(sid_oid)
+                try:
+                    await self.summarize(sid_oid)
+                except Exception as e:
+                    self.failures += 1
+                    log.warning(f"[memory] resumen de {sid_oid} falló: {e}")
+                if sid_oid not in self._dirty:
+                    break
+        finally:
+            self._running.pop(sid_oid, None)
+
+    async def summarize(self, sid_oid) -> bool:
+        """Pliega en el resumen los mensajes anteriores a los últimos `recent_turns` turnos."""
+        doc = await run_in_threadpool(memory_store.get_for_summary, sid_oid)
+        if not doc:
+            return False
+        older = doc.get("messages", [])[:-self.recent_turns * 2]
+        if not older:
+            return False
+        prompt = TEMPLATE_RESUMEN.format(
+            palabras=MEMORY_SUMMARY_WORDS,
+            resumen=doc.get("summary") or "(vacío)",
+            turnos="\n".join(_line(m) for m in older),
+        )
+        async with llm_scheduler.slot(self.model, PRIORITY_BULK):
+            data = await get_ollama().generate(self.model, prompt, temperature=0.2, top_p=0.9)
+        summary = (data.get("response") or "").strip()
+        if not summary:
+            return False
+        self.runs += 1
+        ok = await run_in_threadpool(memory_store.save_summary, sid_oid, summary,
+                                     older[-1]["ts"], doc.get("summarized_upto"))
+        if not ok:
+            self.conflicts += 1
+        return ok
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": MEMORY_MODE, "recent_turns": self.recent_turns, "token_budget": MEMORY_TOKEN_BUDGET,
+                "running": len(self._running), "runs": self.runs,
+                "failures": self.failures, "conflicts": self.conflicts}
+
+memory_summarizer = MemorySummarizer()
@@ -0,0 +1,116 @@
+# app/services/model_router.py
+"""
+Ruteo adaptativo de modelo por clase de tarea y presupuesto de latencia.
+- MODEL_ROUTING_MODELS lista los modelos de más ligero a más pesado (p. ej. "llama3.2:3b,llama3.1:8b").
+  Vacía → sin ruteo: todo va a OLLAMA_MODEL como antes.
+- Cada endpoint tiene una clase (short / content / empathetic) con su SLO de p95 en segundos.
+- Se elige el modelo MÁS PESADO cuya latencia reciente (p95 de la ventana) cabe en el SLO y cuya
+  tasa de salidas marcadas (reintentos por guardrails) no pasa MODEL_ROUTING_MAX_FLAG.
+  Si ninguno cabe, el más rápido observado.
+- La clase empathetic (respuestas) siempre usa el modelo más pesado.
+- Un modelo con pocas muestras se prueba (optimista) y una fracción MODEL_ROUTING_EXPLORE
+  de peticiones va a un modelo al azar, para que las estadísticas no se queden viejas.
+- `?model=` en la petición sigue mandando sobre el ruteo.
+"""
+import os
+import random
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+MODEL_ROUTING_MODELS = [m.strip() for m in os.getenv("MODEL_ROUTING_MODELS", "").split(",") if m.strip()]
+MODEL_ROUTING_WINDOW = int(os.getenv("MODEL_ROUTING_WINDOW", "50"))
+MODEL_ROUTING_MIN_SAMPLES = int(os.getenv("MODEL_ROUTING_MIN_SAMPLES", "5"))
+MODEL_ROUTING_EXPLORE = float(os.getenv("MODEL_ROUTING_EXPLORE", "0.05"))
+MODEL_ROUTING_MAX_FLAG = float(os.getenv("MODEL_ROUTING_MAX_FLAG", "0.3"))
+
+# Clase de tarea por endpoint
+ENDPOINT_TASK = {
+    "saludos": "short",
+    "eea": "short",
+    "mindfullness": "content",
+    "respuestas": "empathetic",
+}
+
+# SLO (p95 de la generación completa, en s) por clase
+TASK_SLO_S = {
+    "short": float(os.getenv("MODEL_SLO_SHORT", "2.5")),
+    "content": float(os.getenv("MODEL_SLO_CONTENT", "6")),
+    "empathetic": float(os.getenv("MODEL_SLO_EMPATHETIC", "10")),
+}
+
+# Conversación (posible riesgo): siempre el modelo más capaz
+HEAVY_ONLY = {"empathetic"}
+
+class _Window:
+    def __init__(self, size: int):
+        self.latencies: Deque[float] = deque(maxlen=size)
+        self.flags: Deque[bool] = deque(maxlen=size)
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(0.95 * len(values)))]
+
+    def flag_rate(self) -> float:
+        return sum(self.flags) / len(self.flags) if self.flags else 0.0
+
+class ModelRouter:
+    def __init__(self, models: List[str] = MODEL_ROUTING_MODELS, *, slos: Dict[str, float] = TASK_SLO_S,
+                 window: int = MODEL_ROUTING_WINDOW, min_samples: int = MODEL_ROUTING_MIN_SAMPLES,
+                 explore: float = MODEL_ROUTING_EXPLORE, max_flag_rate: float = MODEL_ROUTING_MAX_FLAG):
+        self.models = list(models)
+        self.slos = dict(slos)
+        self.window = window
+        self.min_samples = min_samples
+        self.explore = explore
+        self.max_flag_rate = max_flag_rate
+        self._windows: Dict[Tuple[str, str], _Window] = {}
+        self.chosen: Dict[str, Dict[str, int]] = {}
+
+    def _win(self, model: str, task: str) -> _Window:
+        w = self._windows.get((model, task))
+        if w is None:
+            w = self._windows[(model, task)] = _Window(self.window)
+        return w
+
+    def choose(self, endpoint: str, default: str) -> str:
+        """Modelo para `endpoint`; `default` (OLLAMA_MODEL) si el ruteo no está configurado."""
+        if not self.models:
+            return default
+        task = ENDPOINT_TASK.get(endpoint, "content")
+        model = self._pick(task)
+        counts = self.chosen.setdefault(endpoint, {})
+        counts[model] = counts.get(model, 0) + 1
+        return model
+
+    def _pick(self, task: str) -> str:
+        if task in HEAVY_ONLY:
+            return self.models[-1]
+        if random.random() < self.explore:
+            return random.choice(self.models)
+        slo = self.slos.get(task, self.slos["content"])
+        for model in reversed(self.models):   # del más pesado al más ligero
+            w = self._win(model, task)
+            if len(w.latencies) < self.min_samples:
+                return model
+            if w.p95() <= slo and w.flag_rate() <= self.max_flag_rate:
+                return model
+        return min(self.models, key=lambda m: self._win(m, task).p95())
+
+    def record(self, endpoint: str, model: str, elapsed: float, flagged: bool) -> None:
+        """Latencia de la generación completa (con reintentos) y si necesitó reintentar."""
+        w = self._win(model, ENDPOINT_TASK.get(endpoint, "content"))
+        w.latencies.append(elapsed)
+        w.flags.append(flagged)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": self.models,
+            "slos": self.slos,
+            "chosen": {e: dict(c) for e, c in self.chosen.items()},
+            "observed": {f"{m}|{t}": {"n": len(w.latencies), "p95": w.p95(), "flag_rate": round(w.flag_rate(), 3)}
+                         for (m, t), w in sorted(self._windows.items())},
+        }
+
+model_router = ModelRouter()
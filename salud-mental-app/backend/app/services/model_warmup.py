@@ -0,0 +1,78 @@
+# app/services/model_warmup.py
+"""
+Precarga de modelos de Ollama y keep-alive periódico.
+- Al arrancar (lifespan) carga OLLAMA_MODEL + la lista OLLAMA_WARM_MODELS,
+  así la primera petición de usuario no paga el tiempo de carga del modelo.
+- Después hace un ping cada OLLAMA_PING_INTERVAL segundos (renueva keep_alive),
+  de modo que Ollama no los descargue por inactividad.
+- Con `prefixes` (prefijos de sistema estables, p. ej. ai.SYSTEM_PREFIX) cada ping además
+  evalúa el prefijo con num_predict=1: queda en la KV-cache del runner para las peticiones reales.
+- status() alimenta /health: listo / error / tiempo de carga por modelo.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List
+
+from .ollama_client import get_ollama
+
+log = logging.getLogger("uvicorn.info")
+
+OLLAMA_WARM_MODELS = [m.strip() for m in os.getenv("OLLAMA_WARM_MODELS", "").split(",") if m.strip()]
+OLLAMA_PING_INTERVAL = float(os.getenv("OLLAMA_PING_INTERVAL", "240"))
+
+class ModelWarmer:
+    def __init__(self, interval: float = OLLAMA_PING_INTERVAL):
+        self.interval = interval
+        self.models: List[str] = []
+        self.prefixes: List[str] = []
+        self._status: Dict[str, Dict[str, Any]] = {}
+
+    def configure(self, models: Iterable[str], prefixes: Iterable[str] = ()) -> None:
+        self.prefixes = [p for p in prefixes if p]
+        self.models = list(dict.fromkeys(m for m in models if m))   # sin duplicados, en orden
+        for m in self.models:
+            self._status.setdefault(m, {"ready": False, "loads": 0, "load_s": None,
+                                        "last_ping": None, "error": None})
+
+    async def ping(self, model: str) -> bool:
+        st = self._status[model]
+        start = time.perf_counter()
+        try:
+            data = await get_ollama().load(model)
+            for prefix in self.prefixes:
+                await get_ollama().generate(model, "Hola", system=prefix, options={"num_predict": 1})
+        except Exception as e:
+            if st["ready"] or st["error"] is None:
+                log.warning(f"[warmup] {model} no disponible: {e}")
+            st.update(ready=False, error=str(e))
+            return False
+        elapsed = time.perf_counter() - start
+        if not st["ready"]:
+            # load_duration (ns) viene de Ollama; si no, el tiempo de pared
+            load_ns = data.get("load_duration")
+            st["load_s"] = round(load_ns / 1e9 if load_ns else elapsed, 3)
+            st["loads"] += 1
+            log.info(f"[warmup] {model} listo en {st['load_s']}s")
+        st.update(ready=True, error=None, last_ping=time.time())
+        return True
+
+    async def warm(self) -> Dict[str, bool]:
+        results = await asyncio.gather(*(self.ping(m) for m in self.models))
+        return dict(zip(self.models, results))
+
+    async def run(self, models: Iterable[str], prefixes: Iterable[str] = ()) -> None:
+        """Tarea de fondo del lifespan: precarga y luego keep-alive hasta cancelarse."""
+        self.configure(models, prefixes)
+        while True:
+            await self.warm()
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": bool(self.models) and all(self._status[m]["ready"] for m in self.models),
+            "models": {m: dict(self._status[m]) for m in self.models},
+        }
+
+model_warmer = ModelWarmer()
@@ -0,0 +1,388 @@
+# app/services/ollama_client.py
+"""
+Cliente asíncrono de Ollama con pool HTTP keep-alive compartido por proceso.
+- Se crea en el lifespan de main.py (connect_ollama) y lo reutilizan todos los /ai/*.
+- Las esperas al LLM son await: no ocupan hilos del threadpool de AnyIO.
+- Cada host tiene su circuit breaker (services/circuit_breaker): con Ollama caído o lento
+  las llamadas fallan al instante con CircuitOpen en lugar de esperar el timeout.
+- OLLAMA_HOSTS (lista separada por comas) reparte la carga entre varios servidores con OllamaPool:
+  menos peticiones en curso primero, preferencia por hosts con el modelo ya cargado,
+  y health checks que sacan y vuelven a admitir hosts solos.
+- Dentro de una petición, cada llamada espera como mucho lo que queda del deadline
+  (services/deadline); al vencer lanza DeadlineExceeded y el breaker solo lo cuenta como fallo
+  si ya se esperó más de BREAKER_SLOW_S (host lento, no presupuesto corto del cliente).
+"""
+import asyncio
+import logging
+import time
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
+
+import httpx
+
+from .circuit_breaker import CircuitOpen, RequestRejected, breaker
+from .deadline import DeadlineExceeded, bounded
+
+log = logging.getLogger("uvicorn.info")
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+OLLAMA_HOSTS = [h.strip() for h in os.getenv("OLLAMA_HOSTS", "").split(",") if h.strip()] or [OLLAMA_HOST]
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+OLLAMA_HEALTH_FAILS = int(os.getenv("OLLAMA_HEALTH_FAILS", "2"))   # checks fallidos seguidos para sacar un host
+OLLAMA_FAILOVER = int(os.getenv("OLLAMA_FAILOVER", "1"))           # reintentos en otro host si uno falla
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "64"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+# Cuánto mantiene Ollama el modelo en memoria tras cada petición ("" = su default de 5m)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+class OllamaError(RuntimeError):
+    pass
+
+class OllamaRequestError(OllamaError, RequestRejected):
+    """4xx de Ollama (modelo inexistente, petición inválida): culpa de la petición, no del host."""
+
+def _status_error(e: httpx.HTTPStatusError) -> OllamaError:
+    status = e.response.status_code
+    if 400 <= status < 500 and status not in (408, 429):
+        return OllamaRequestError(str(e))
+    return OllamaError(str(e))
+
+class OllamaClient:
+    def __init__(self, host: str = OLLAMA_HOST, *,
+                 max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 timeout: float = OLLAMA_TIMEOUT,
+                 keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive or None
+        self.breaker = breaker(f"ollama:{self.host}")
+        self._http = httpx.AsyncClient(
+            base_url=self.host,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            transport=transport,   # tests: httpx.MockTransport
+        )
+
+    @staticmethod
+    def _payload(model: str, prompt: str, *, stream: bool, temperature: float, top_p: float,
+                 system: Optional[str] = None, options: Optional[Dict[str, Any]] = None,
+                 keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {"temperature": temperature, "top_p": top_p, **(options or {})},
+        }
+        if system is not None:
+            body["system"] = system
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        return body
+
+    async def generate(self, model: str, prompt: str, *, temperature: float = 0.5,
+                       top_p: float = 0.5, **kw) -> Dict[str, Any]:
+        """POST /api/generate sin stream. Devuelve el JSON completo (response, eval_count, ...)."""
+        kw.setdefault("keep_alive", self.keep_alive)
+        body = self._payload(model, prompt, stream=False, temperature=temperature, top_p=top_p, **kw)
+        return await bounded("llm", self.breaker.call(lambda: self._post_generate(body)))
+
+    async def _post_generate(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            r = await self._http.post("/api/generate", json=body)
+            r.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise _status_error(e) from e
+        except httpx.HTTPError as e:
+            raise OllamaError(str(e) or e.__class__.__name__) from e
+        data = r.json()
+        if data.get("error"):
+            raise OllamaError(data["error"])
+        return data
+
+    async def stream(self, model: str, prompt: str, *, temperature: float = 0.5,
+                     top_p: float = 0.5, **kw) -> AsyncIterator[str]:
+        """POST /api/generate con stream: produce fragmentos de texto conforme llegan."""
+        kw.setdefault("keep_alive", self.keep_alive)
+        body = self._payload(model, prompt, stream=True, temperature=temperature, top_p=top_p, **kw)
+        self.breaker.allow()
+        start, outcome, produced = time.perf_counter(), None, False
+        try:
+            # cabeceras y cada línea esperan como mucho lo que queda del deadline de la petición
+            req = self._http.build_request("POST", "/api/generate", json=body)
+            r = await bounded("llm", self._http.send(req, stream=True))
+            try:
+                r.raise_for_status()
+                lines = r.aiter_lines()
+                while True:
+                    try:
+                        line = await bounded("llm", lines.__anext__())
+                    except StopAsyncIteration:
+                        break
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise OllamaError(data["error"])
+                    if data.get("response"):
+                        produced = True
+                        yield data["response"]
+                    if data.get("done"):
+                        break
+            finally:
+                await r.aclose()
+            outcome = time.perf_counter() - start > self.breaker.slow_after
+        except httpx.HTTPStatusError as e:
+            err = _status_error(e)
+            outcome = not isinstance(err, RequestRejected)
+            raise err from e
+        except httpx.HTTPError as e:
+            outcome = True
+            raise OllamaError(str(e) or e.__class__.__name__) from e
+        except OllamaError:
+            outcome = True
+            raise
+        except DeadlineExceeded:
+            if time.perf_counter() - start >= self.breaker.slow_after:
+                outcome = True               # venció esperando a un host lento: cuenta contra él
+            raise
+        finally:
+            if outcome is None and produced:
+                self.breaker.record(False)   # el consumidor cortó (p. ej. perfil con max_sentences): el host respondió
+            elif outcome is None:
+                self.breaker.abandon(time.perf_counter() - start)   # cortado antes del primer token
+            else:
+                self.breaker.record(outcome)
+
+    async def load(self, model: str, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        """Carga `model` en memoria sin generar (prompt vacío) y renueva su keep_alive."""
+        body = {"model": model, "keep_alive": keep_alive or self.keep_alive or "5m"}
+        return await bounded("llm", self.breaker.call(lambda: self._post_generate(body)))
+
+    async def tags(self) -> Dict[str, Any]:
+        r = await self._http.get("/api/tags", timeout=3)
+        r.raise_for_status()
+        return r.json()
+
+    async def ps(self) -> Dict[str, Any]:
+        """GET /api/ps: modelos cargados en memoria ahora mismo."""
+        r = await self._http.get("/api/ps", timeout=3)
+        r.raise_for_status()
+        return r.json()
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+def _model_name(name: str) -> str:
+    # Ollama acepta "llama3" como "llama3:latest"
+    return name if ":" in name else f"{name}:latest"
+
+def _names(payload: Dict[str, Any]) -> Set[str]:
+    return {_model_name(m.get("name") or m.get("model") or "") for m in payload.get("models", [])}
+
+class _Backend:
+    """Estado de un host dentro del pool."""
+    def __init__(self, client: OllamaClient):
+        self.client = client
+        self.healthy = True
+        self.fails = 0
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.installed: Optional[Set[str]] = None   # None = aún no se consultó /api/tags
+        self.loaded: Set[str] = set()
+
+    def available(self) -> bool:
+        return self.healthy and not self.client.breaker.is_open()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"healthy": self.healthy, "outstanding": self.outstanding, "requests": self.requests,
+                "errors": self.errors, "loaded": sorted(self.loaded),
+                "installed": sorted(self.installed) if self.installed is not None else None,
+                "breaker": self.client.breaker.state}
+
+class OllamaPool:
+    """
+    Mismo API que OllamaClient (generate/stream/load/tags) repartido entre varios hosts.
+    Colocación por modelo: primero hosts con el modelo cargado (/api/ps), luego con el modelo
+    instalado (/api/tags) y luego hosts sin inventario todavía; nunca uno que no lo tiene.
+    Dentro de cada grupo gana el de menos peticiones en curso. Si un host falla antes de
+    responder se reintenta en el siguiente de esa lista (OLLAMA_FAILOVER).
+    """
+    def __init__(self, clients: List[OllamaClient], *, health_interval: float = OLLAMA_HEALTH_INTERVAL,
+                 max_fails: int = OLLAMA_HEALTH_FAILS, failover: int = OLLAMA_FAILOVER):
+        self.backends = [_Backend(c) for c in clients]
+        self.health_interval = health_interval
+        self.max_fails = max_fails
+        self.failover = failover
+
+    @property
+    def hosts(self) -> List[str]:
+        return [b.client.host for b in self.backends]
+
+    def _tiers(self, up: List[_Backend], model: str) -> List[List[_Backend]]:
+        model = _model_name(model)
+        return [[b for b in up if model in b.loaded],
+                [b for b in up if model not in b.loaded and b.installed and model in b.installed],
+                [b for b in up if b.installed is None]]
+
+    def capacity(self, model: str) -> int:
+        """Hosts que hoy reciben `model`: el primer grupo no vacío de _candidates (la ruta nunca pasa de él)."""
+        tiers = self._tiers([b for b in self.backends if b.available()], model)
+        return next((len(t) for t in tiers if t), 0)
+
+    def _candidates(self, model: str) -> List[_Backend]:
+        up = [b for b in self.backends if b.available()]
+        if not up:
+            raise CircuitOpen("ollama", max(1, int(self.health_interval)))
+        tiers = self._tiers(up, model)
+        ordered = [b for tier in tiers for b in sorted(tier, key=lambda b: (b.outstanding, b.requests))]
+        if not ordered:
+            raise OllamaError(f"ningún host sano tiene el modelo {_model_name(model)}")
+        return ordered
+
+    async def generate(self, model: str, prompt: str, **kw) -> Dict[str, Any]:
+        last: Optional[Exception] = None
+        for b in self._candidates(model)[:1 + self.failover]:
+            b.outstanding += 1
+            b.requests += 1
+            try:
+                data = await b.client.generate(model, prompt, **kw)
+            except (OllamaError, CircuitOpen) as e:
+                b.errors += 1
+                last = e
+                continue
+            finally:
+                b.outstanding -= 1
+            b.loaded.add(_model_name(model))
+            return data
+        raise last
+
+    async def stream(self, model: str, prompt: str, **kw) -> AsyncIterator[str]:
+        last: Optional[Exception] = None
+        for b in self._candidates(model)[:1 + self.failover]:
+            b.outstanding += 1
+            b.requests += 1
+            started = False
+            inner = b.client.stream(model, prompt, **kw)
+            try:
+                async for chunk in inner:
+                    started = True
+                    yield chunk
+            except (OllamaError, CircuitOpen) as e:
+                b.errors += 1
+                if started:   # ya salió texto al cliente: no se puede repetir en otro host
+                    raise
+                last = e
+                continue
+            finally:
+                await inner.aclose()   # quien consume cortó antes (guardrails, cliente que se fue)
+                b.outstanding -= 1
+            b.loaded.add(_model_name(model))
+            return
+        raise last
+
+    async def load(self, model: str, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        """Carga el modelo en TODOS los hosts sanos que lo tienen (o cuyo inventario se desconoce)."""
+        name = _model_name(model)
+        targets = [b for b in self.backends if b.available()
+                   and (b.installed is None or name in b.installed)]
+        if not targets:
+            self._candidates(model)   # lanza CircuitOpen / OllamaError con el motivo
+        results = await asyncio.gather(*(b.client.load(model, keep_alive) for b in targets),
+                                       return_exceptions=True)
+        ok = None
+        for b, res in zip(targets, results):
+            if isinstance(res, Exception):
+                b.errors += 1
+                continue
+            b.loaded.add(name)
+            if ok is None:
+                ok = res
+        if ok is None:
+            raise results[0]
+        return ok
+
+    async def tags(self) -> Dict[str, Any]:
+        """Unión de /api/tags de los hosts sanos (+ el detalle por host)."""
+        seen: Dict[str, Any] = {}
+        per_host: Dict[str, Any] = {}
+        for b, res in zip(self.backends, await asyncio.gather(
+                *(b.client.tags() for b in self.backends), return_exceptions=True)):
+            if isinstance(res, Exception):
+                per_host[b.client.host] = {"error": str(res)}
+                continue
+            per_host[b.client.host] = sorted(_names(res))
+            for m in res.get("models", []):
+                seen.setdefault(m.get("name"), m)
+        return {"models": list(seen.values()), "hosts": per_host}
+
+    async def check(self, b: _Backend) -> bool:
+        """Health check de un host: refresca inventario y modelos cargados; saca/readmite el host."""
+        try:
+            installed, loaded = await asyncio.gather(b.client.tags(), b.client.ps())
+        except Exception as e:
+            b.fails += 1
+            if b.healthy and b.fails >= self.max_fails:
+                b.healthy = False
+                b.loaded.clear()
+                log.warning(f"[ollama] {b.client.host} fuera del pool: {e}")
+            return False
+        b.fails = 0
+        b.installed = _names(installed)
+        b.loaded = _names(loaded)
+        if not b.healthy:
+            b.healthy = True
+            log.info(f"[ollama] {b.client.host} de vuelta en el pool")
+        return True
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(b) for b in self.backends))
+
+    async def run(self) -> None:
+        """Tarea de fondo del lifespan: health checks cada `health_interval` segundos."""
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.health_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {b.client.host: b.stats() for b in self.backends}
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(b.client.aclose() for b in self.backends))
+
+_client: Optional[Union[OllamaClient, OllamaPool]] = None
+
+def connect_ollama() -> Union[OllamaClient, OllamaPool]:
+    """Crea el pool del proceso (uno o varios hosts de OLLAMA_HOSTS). Se llama en startup (lifespan)."""
+    global _client
+    if _client is None:
+        _client = OllamaPool([OllamaClient(h) for h in OLLAMA_HOSTS])
+    return _client
+
+async def run_health_checks() -> None:
+    """Health checks del pool (no-op si el cliente es un OllamaClient suelto, p. ej. en tests)."""
+    if isinstance(_client, OllamaPool):
+        await _client.run()
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    return _client.stats() if isinstance(_client, OllamaPool) else None
+
+async def close_ollama() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+def capacity(model: str) -> int:
+    """Hosts que hoy atienden `model` (1 con un OllamaClient suelto): escala los cupos de llm_scheduler."""
+    return max(1, _client.capacity(model)) if isinstance(_client, OllamaPool) else 1
+
+def get_ollama() -> Union[OllamaClient, OllamaPool]:
+    if _client is None:
+        raise RuntimeError("Ollama no inicializado. Llama connect_ollama() en startup.")
+    return _client
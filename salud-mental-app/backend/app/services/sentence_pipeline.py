@@ -0,0 +1,113 @@
+# app/services/sentence_pipeline.py
+"""
+Pipeline por oraciones: generar → (traducir) → TTS, con salida en orden.
+- SentenceSplitter corta el texto que va llegando del LLM en oraciones completas.
+- ordered_pipeline lanza la etapa (traducción + síntesis) de cada oración en cuanto existe,
+  mientras las siguientes se siguen generando, y entrega los resultados en el orden original.
+  Así el primer audio tarda ~ una oración, no la suma de las tres etapas completas.
+- SentenceBudget deja pasar texto hasta completar N oraciones (corte temprano de generación).
+"""
+import asyncio
+import re
+from typing import AsyncIterator, Awaitable, Callable, List, TypeVar
+
+T = TypeVar("T")
+
+SENTENCE_MIN_CHARS = 24        # oraciones más cortas se juntan con la siguiente
+PIPELINE_MAX_INFLIGHT = 4      # oraciones en traducción/síntesis a la vez
+
+_BOUNDARY_RE = re.compile(r"[.!?…]+[\"”»)\]]*\s+")
+
+class SentenceSplitter:
+    def __init__(self, min_chars: int = SENTENCE_MIN_CHARS):
+        self.min_chars = min_chars
+        self.buf = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        """Agrega texto y devuelve las oraciones que ya quedaron completas."""
+        self.buf += chunk
+        out, start = [], 0
+        for m in _BOUNDARY_RE.finditer(self.buf):
+            if len(self.buf[start:m.end()].strip()) >= self.min_chars:
+                out.append(self.buf[start:m.end()].strip())
+                start = m.end()
+        self.buf = self.buf[start:]
+        return out
+
+    def flush(self) -> List[str]:
+        rest, self.buf = self.buf.strip(), ""
+        return [rest] if rest else []
+
+class SentenceBudget:
+    """Deja pasar el texto del LLM hasta completar `max_sentences` oraciones; después `done`."""
+    def __init__(self, max_sentences: int, min_chars: int = 12):
+        self.max_sentences = max_sentences
+        self.min_chars = min_chars      # "1." o "Sí." sueltos no cuentan como oración
+        self.buf = ""
+        self.count = 0
+        self.done = False
+        self._pos = 0                   # fin de la última oración contada
+        self._emitted = 0
+
+    def feed(self, chunk: str) -> str:
+        """Devuelve la parte de `chunk` que cabe en el cupo (sin el inicio de la oración sobrante)."""
+        if self.done:
+            return ""
+        self.buf += chunk
+        for m in _BOUNDARY_RE.finditer(self.buf, self._pos):
+            if len(self.buf[self._pos:m.end()].strip()) < self.min_chars:
+                continue
+            self.count += 1
+            self._pos = m.end()
+            if self.count >= self.max_sentences:
+                cut = m.start() + len(m.group().rstrip())
+                out, self._emitted, self.done = self.buf[self._emitted:cut], cut, True
+                return out
+        out, self._emitted = self.buf[self._emitted:], len(self.buf)
+        return out
+
+async def ordered_pipeline(source: AsyncIterator[str], stage: Callable[[int, str], Awaitable[T]],
+                           max_inflight: int = PIPELINE_MAX_INFLIGHT) -> AsyncIterator[T]:
+    """
+    Aplica `stage(i, oración)` a cada elemento de `source` de forma concurrente
+    (hasta `max_inflight` a la vez) y produce los resultados en orden.
+    Si `source` o una etapa fallan, la excepción se propaga al consumidor; al cerrar
+    el generador se cancela todo lo pendiente.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    sem = asyncio.Semaphore(max_inflight)
+    tasks: List[asyncio.Task] = []
+
+    async def _staged(i: int, sentence: str) -> T:
+        try:
+            return await stage(i, sentence)
+        finally:
+            sem.release()
+
+    async def _produce() -> None:
+        try:
+            i = 0
+            async for sentence in source:
+                await sem.acquire()
+                task = asyncio.create_task(_staged(i, sentence))
+                tasks.append(task)
+                queue.put_nowait(task)
+                i += 1
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.create_task(_produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield await item
+    finally:
+        producer.cancel()
+        for t in tasks:
+            t.cancel()
@@ -0,0 +1,43 @@
+# app/services/session_cache.py
+"""
+Caché en proceso de existencia de sesiones (para _ensure_sid).
+- Positivos con TTL largo, negativos (sid inexistente) con TTL corto.
+- flows.first_contact_start llama mark_created() para invalidar un negativo previo.
+"""
+import os
+from typing import Any, Dict, Optional
+
+from .cache import TTLCache
+
+SESSION_CACHE_MAX = int(os.getenv("SESSION_CACHE_MAX", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "600"))
+SESSION_CACHE_NEG_TTL = float(os.getenv("SESSION_CACHE_NEG_TTL", "30"))
+
+class SessionCache:
+    def __init__(self, max_entries: int = SESSION_CACHE_MAX,
+                 ttl: float = SESSION_CACHE_TTL, negative_ttl: float = SESSION_CACHE_NEG_TTL):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.negative_ttl = negative_ttl
+        self.negative_hits = 0
+
+    def lookup(self, oid) -> Optional[bool]:
+        """True/False si se conoce el resultado; None si hay que ir a Mongo."""
+        known = self._cache.get(oid)
+        if known is False:
+            self.negative_hits += 1
+        return known
+
+    def remember(self, oid, exists: bool) -> None:
+        self._cache.set(oid, exists, ttl=None if exists else self.negative_ttl)
+
+    def mark_created(self, oid) -> None:
+        self._cache.set(oid, True)
+
+    def forget(self, oid) -> None:
+        self._cache.pop(oid)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "negative_hits": self.negative_hits,
+                "negative_ttl_s": self.negative_ttl}
+
+session_cache = SessionCache()
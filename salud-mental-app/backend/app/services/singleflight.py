@@ -0,0 +1,38 @@
+# app/services/singleflight.py
+"""
+Single-flight (asyncio): llamadas concurrentes con la misma llave comparten
+una sola ejecución en vuelo; las demás esperan su resultado.
+La ejecución corre como tarea propia: si un llamador se cancela (cliente que
+se desconecta), los demás siguen esperando el mismo resultado.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0        # ejecuciones reales
+        self.coalesced = 0    # peticiones que reutilizaron una ejecución en vuelo
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marcar como recuperada aunque nadie la espere
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.calls += 1
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def inflight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "inflight": len(self._inflight)}
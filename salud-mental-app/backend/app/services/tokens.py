@@ -0,0 +1,8 @@
+# app/services/tokens.py
+"""
+Estimación barata de tokens (~4 caracteres por token), sin tokenizador.
+La usan el presupuesto de la memoria resumida y el empaquetado de lotes de traducción.
+"""
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
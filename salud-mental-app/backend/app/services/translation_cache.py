@@ -0,0 +1,147 @@
+# app/services/translation_cache.py
+"""
+Caché de traducciones español → náhuatl en dos niveles.
+- L1: LRU en proceso con TTL (respuestas repetidas en microsegundos).
+- L2: colección Mongo `translation_cache` (compartida entre réplicas), con índice TTL
+  sobre `expires_at` y recorte por tamaño.
+Llave: sha256(modelo + texto fuente normalizado).
+"""
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from ..db.mongo import get_db
+from .cache import TTLCache
+
+TRANSLATION_CACHE_MAX = int(os.getenv("TRANSLATION_CACHE_MAX", "2048"))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(7 * 24 * 3600)))
+TRANSLATION_CACHE_MONGO_MAX = int(os.getenv("TRANSLATION_CACHE_MONGO_MAX", "50000"))
+COLLECTION = "translation_cache"
+
+_WS_RE = re.compile(r"\s+")
+
+def normalize_source(text: str) -> str:
+    # Solo forma Unicode y espacios: mayúsculas/acentos sí cambian la traducción.
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_source(text)}".encode("utf-8")).hexdigest()
+
+class TranslationCache:
+    # Cada cuántas escrituras se revisa el tamaño de la colección en Mongo
+    TRIM_EVERY = 200
+
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_MAX,
+                 ttl: float = TRANSLATION_CACHE_TTL,
+                 mongo_max: int = TRANSLATION_CACHE_MONGO_MAX):
+        self.local = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.ttl = ttl
+        self.mongo_max = mongo_max
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    # ---- L1 (no bloquea: apto para el event loop) ----
+    def get_local(self, text: str, model: str) -> Optional[str]:
+        return self.local.get(cache_key(text, model))
+
+    # ---- L2 (PyMongo: llamar vía threadpool) ----
+    def get_remote(self, text: str, model: str) -> Optional[str]:
+        key = cache_key(text, model)
+        try:
+            doc = get_db()[COLLECTION].find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"translation": 1},
+            )
+        except Exception:
+            self.l2_errors += 1
+            return None
+        if not doc:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        self.local.set(key, doc["translation"])
+        return doc["translation"]
+
+    def get_remote_many(self, texts: List[str], model: str) -> Dict[str, str]:
+        """Varios textos en UNA consulta ($in). Devuelve {cache_key: traducción} de los encontrados."""
+        keys = [cache_key(t, model) for t in texts]
+        try:
+            docs = list(get_db()[COLLECTION].find(
+                {"_id": {"$in": keys}, "expires_at": {"$gt": datetime.utcnow()}},
+                {"translation": 1},
+            ))
+        except Exception:
+            self.l2_errors += 1
+            return {}
+        found = {d["_id"]: d["translation"] for d in docs}
+        self.l2_hits += len(found)
+        self.l2_misses += len(set(keys)) - len(found)
+        for key, translation in found.items():
+            self.local.set(key, translation)
+        return found
+
+    def put(self, text: str, model: str, translation: str) -> None:
+        """Escribe en ambos niveles. La parte Mongo es bloqueante (threadpool)."""
+        self.put_many([(text, translation)], model)
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]], model: str) -> None:
+        """Como put() para varios (texto, traducción): una sola escritura bulk en Mongo."""
+        now = datetime.utcnow()
+        ops = []
+        for text, translation in pairs:
+            key = cache_key(text, model)
+            self.local.set(key, translation)
+            ops.append(UpdateOne(
+                {"_id": key},
+                {"$set": {
+                    "model": model,
+                    "source": normalize_source(text),
+                    "translation": translation,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                }},
+                upsert=True,
+            ))
+        if not ops:
+            return
+        try:
+            coll = get_db()[COLLECTION]
+            coll.bulk_write(ops, ordered=False)
+            with self._lock:
+                before = self._writes
+                self._writes += len(ops)
+                trim = self._writes // self.TRIM_EVERY != before // self.TRIM_EVERY
+            if trim:
+                self._trim(coll)
+        except Exception:
+            self.l2_errors += 1
+
+    def _trim(self, coll) -> None:
+        excess = coll.estimated_document_count() - self.mongo_max
+        if excess <= 0:
+            return
+        old_ids = [d["_id"] for d in coll.find({}, {"_id": 1}).sort("created_at", 1).limit(excess)]
+        if old_ids:
+            coll.delete_many({"_id": {"$in": old_ids}})
+
+    def stats(self) -> Dict[str, Any]:
+        l1 = self.local.stats()
+        lookups = l1["hits"] + l1["misses"]
+        hits = l1["hits"] + self.l2_hits
+        return {
+            "l1": l1,
+            "l2": {"hits": self.l2_hits, "misses": self.l2_misses, "errors": self.l2_errors,
+                   "max_docs": self.mongo_max},
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+translation_cache = TranslationCache()
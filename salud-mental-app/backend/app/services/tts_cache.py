@@ -0,0 +1,188 @@
+# app/services/tts_cache.py
+"""
+Caché en disco de audio TTS direccionada por contenido.
+- Llave: sha256(modelo, voz, formato, texto) → archivo <llave>.<fmt> en TTS_CACHE_DIR.
+- Límite de tamaño total con expulsión LRU (índice en memoria, reconstruido al arrancar).
+- Síntesis idénticas en vuelo se fusionan en una sola llamada upstream (SingleFlight).
+- Lectura: open() abre el archivo bajo el mismo lock con el que store() expulsa y borra; el descriptor
+  abierto sigue siendo legible aunque el archivo se borre después. Un archivo que ya no existe es un fallo.
+- stream_fill() reenvía el audio del upstream conforme llega y lo escribe a la caché al mismo tiempo.
+  La llave se reserva con claim() ANTES del primer await: las peticiones idénticas que llegan mientras
+  tanto esperan ese stream (get_or_synthesize) en vez de abrir otro upstream.
+La llave sirve además como ETag fuerte.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .singleflight import SingleFlight
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".cache/tts")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "512"))
+
+def audio_key(text: str, voice: str, fmt: str, model: str) -> str:
+    raw = "\x00".join([model, voice, fmt, text.strip()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class AudioCache:
+    def __init__(self, root: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()   # nombre de archivo → bytes
+        self._total = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._streaming: Dict[str, asyncio.Future] = {}   # llave → se resuelve al terminar stream_fill
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self) -> None:
+        if not self.root.exists():
+            return
+        files = [p for p in self.root.iterdir() if p.is_file() and not p.name.startswith(".tmp")]
+        for p in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = p.stat().st_size
+            self._index[p.name] = size
+            self._total += size
+
+    def path_for(self, key: str, fmt: str) -> Path:
+        return self.root / f"{key}.{fmt}"
+
+    def open(self, key: str, fmt: str) -> Optional[BinaryIO]:
+        """Audio en caché abierto para lectura (quien lo recibe lo cierra) o None si no está."""
+        name = f"{key}.{fmt}"
+        with self._lock:
+            if name not in self._index:
+                return None
+            try:
+                f = open(self.root / name, "rb")
+            except FileNotFoundError:   # borrado externo: se limpia el índice
+                self._total -= self._index.pop(name)
+                return None
+            self._index.move_to_end(name)
+        self.hits += 1
+        return f
+
+    def busy(self, key: str) -> bool:
+        """Hay una síntesis o un stream_fill en curso (o reservado) para `key`."""
+        return key in self._streaming or self._flight.inflight(key)
+
+    def claim(self, key: str) -> Optional[asyncio.Future]:
+        """
+        Reserva `key` para un stream_fill (síncrono: sin await entre la revisión y el registro).
+        Devuelve el futuro que hay que pasarle a stream_fill(), o None si ya hay otra síntesis en curso.
+        """
+        if self.busy(key):
+            return None
+        done = asyncio.get_running_loop().create_future()
+        self._streaming[key] = done
+        return done
+
+    def release(self, key: str, done: asyncio.Future, complete: bool = False) -> None:
+        """Libera la reserva de claim() y despierta a quienes esperaban (idempotente)."""
+        if self._streaming.get(key) is done:
+            del self._streaming[key]
+        if not done.done():
+            done.set_result(complete)
+
+    def _commit(self, tmp: Path, key: str, fmt: str, size: int) -> Path:
+        """Rename atómico del temporal y expulsión LRU (borrado bajo el lock: ver open())."""
+        path = self.path_for(key, fmt)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += size - self._index.pop(path.name, 0)
+            self._index[path.name] = size
+            while self._total > self.max_bytes and len(self._index) > 1:
+                name, victim_size = self._index.popitem(last=False)
+                self._total -= victim_size
+                self.evictions += 1
+                try:
+                    (self.root / name).unlink()
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def store(self, key: str, fmt: str, data: bytes) -> Path:
+        """Escritura atómica (tmp + rename) y expulsión LRU. Bloqueante: usar vía threadpool."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}"
+        tmp.write_bytes(data)
+        return self._commit(tmp, key, fmt, len(data))
+
+    async def get_or_synthesize(self, text: str, voice: str, fmt: str, model: str,
+                                synth: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Bytes del audio: de la caché, del stream_fill en curso con la misma llave o sintetizando."""
+        key = audio_key(text, voice, fmt, model)
+        f = self.open(key, fmt)
+        if f is None and key in self._streaming:
+            await asyncio.shield(self._streaming[key])   # otra petición lo está transmitiendo
+            f = self.open(key, fmt)
+        if f is not None:
+            with f:
+                return await run_in_threadpool(f.read)
+        self.misses += 1
+
+        async def _fill() -> bytes:
+            data = await synth()
+            await run_in_threadpool(self.store, key, fmt, data)
+            return data
+
+        return await self._flight.do(key, _fill)
+
+    async def stream_fill(self, key: str, fmt: str, chunks: AsyncIterator[bytes],
+                          done: asyncio.Future) -> AsyncIterator[bytes]:
+        """
+        Reenvía `chunks` (audio del upstream) conforme llegan y los escribe a un temporal; si el stream
+        termina completo, el archivo entra a la caché. Cortado a medias (cliente que se va, error) no se guarda.
+        `done` es la reserva de claim(key): se libera al terminar, con o sin éxito.
+        """
+        self.misses += 1
+        tmp, out = None, None
+        size, complete = 0, False
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / f".tmp-{uuid.uuid4().hex}"
+            out = open(tmp, "wb")
+            async for chunk in chunks:
+                await run_in_threadpool(out.write, chunk)
+                size += len(chunk)
+                yield chunk
+            complete = True
+        finally:
+            try:
+                if out is not None:
+                    out.close()
+                if complete:
+                    await run_in_threadpool(self._commit, tmp, key, fmt, size)
+                else:
+                    if tmp is not None:
+                        tmp.unlink(missing_ok=True)
+                    aclose = getattr(chunks, "aclose", None)
+                    if aclose is not None:
+                        await aclose()   # corta también la descarga upstream
+            finally:
+                self.release(key, done, complete)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "files": len(self._index),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "inflight": self._flight.stats(),
+        }
+
+audio_cache = AudioCache()
@@ -0,0 +1,66 @@
+"""
+Métricas en proceso (sin dependencias externas).
+- Histogramas de latencia con buckets fijos y percentiles aproximados.
+- Registro por nombre; /ai/metrics expone snapshot() como JSON.
+"""
+import bisect
+import math
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[min(i, len(self.counts) - 1)] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Límite superior del bucket que contiene el cuantil q (estimación)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        acc = 0
+        for le, c in zip(self.buckets, self.counts):
+            acc += c
+            if acc >= target:
+                return le if le != math.inf else self.buckets[-2]
+        return self.buckets[-2]
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, acc = {}, 0
+        for le, c in zip(self.buckets, self.counts):
+            acc += c
+            cumulative["+Inf" if le == math.inf else str(le)] = acc
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "avg": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+_registry: Dict[str, Histogram] = {}
+_registry_lock = threading.Lock()
+
+def histogram(name: str) -> Histogram:
+    h = _registry.get(name)
+    if h is None:
+        with _registry_lock:
+            h = _registry.setdefault(name, Histogram())
+    return h
+
+def snapshot(prefix: str = "") -> Dict[str, Any]:
+    return {name: h.snapshot() for name, h in sorted(_registry.items()) if name.startswith(prefix)}
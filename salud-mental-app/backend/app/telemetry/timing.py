@@ -0,0 +1,97 @@
+"""
+Tiempos por etapa dentro de una petición (sin dependencias externas).
+- El middleware de main.py abre un colector por petición (contextvar) en /ai y /flows.
+- `with span("memory_read"):` registra una etapa; también funciona dentro del threadpool
+  (run_in_threadpool copia el contexto).
+- Al terminar: header `Server-Timing` + histogramas `stage.<nombre>` (ver /ai/metrics).
+- Respuestas en stream (SSE de /ai/respuestas/stream y /voz): el header sale antes que el cuerpo,
+  así que las etapas que corren mientras se transmite (llm, translate, tts, memory_write) no van
+  en Server-Timing; `observe_late_spans` las manda a los histogramas cuando el cuerpo termina.
+- STAGE_TIMING_ENABLED=false (o fuera de una petición) → span() devuelve un no-op compartido:
+  el costo es un ContextVar.get().
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional, Tuple, TypeVar
+
+from .metrics import histogram
+
+STAGE_TIMING_ENABLED = os.getenv("STAGE_TIMING_ENABLED", "true").lower() == "true"
+STAGE_TIMING_PREFIXES = ("/ai", "/flows")
+
+Spans = List[Tuple[str, float, Optional[str]]]   # (nombre, segundos, descripción)
+T = TypeVar("T")
+
+_spans: ContextVar[Optional[Spans]] = ContextVar("stage_spans", default=None)
+
+class _Span:
+    __slots__ = ("spans", "name", "desc", "start")
+
+    def __init__(self, spans: Spans, name: str, desc: Optional[str]):
+        self.spans = spans
+        self.name = name
+        self.desc = desc
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.spans.append((self.name, time.perf_counter() - self.start, self.desc))
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+def span(name: str, desc: Optional[str] = None):
+    spans = _spans.get()
+    if spans is None:
+        return _NOOP
+    return _Span(spans, name, desc)
+
+def start_request(path: str):
+    """Abre el colector si la ruta se instrumenta. Devuelve el token para `finish_request`."""
+    if not STAGE_TIMING_ENABLED or not path.startswith(STAGE_TIMING_PREFIXES):
+        return None
+    return _spans.set([])
+
+def current_spans() -> Optional[Spans]:
+    """Colector de la petición en curso (el cuerpo de un StreamingResponse sigue escribiendo en él)."""
+    return _spans.get()
+
+def _observe(spans: Spans) -> None:
+    for name, secs, _ in spans:
+        histogram(f"stage.{name}").observe(secs)
+
+def finish_request(token) -> Optional[str]:
+    """Cierra el colector, alimenta los histogramas y devuelve el valor del header Server-Timing."""
+    spans = _spans.get()
+    _spans.reset(token)
+    if not spans:
+        return None
+    spans = spans[:]   # lo que llegue después es de observe_late_spans
+    _observe(spans)
+    parts = []
+    for name, secs, desc in spans:
+        part = f"{name};dur={secs * 1000:.1f}"
+        if desc:
+            part += f';desc="{desc}"'
+        parts.append(part)
+    return ", ".join(parts)
+
+async def observe_late_spans(body: AsyncIterator[T], spans: Spans, flushed: int) -> AsyncIterator[T]:
+    """Envuelve el cuerpo de la respuesta; al terminar, los spans posteriores a `flushed` van a los histogramas."""
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        _observe(spans[flushed:])
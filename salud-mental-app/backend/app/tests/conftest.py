@@ -8,6 +8,7 @@ import sys
 import uuid
 from pathlib import Path
 
+import httpx
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from asgi_lifespan import LifespanManager
@@ -21,6 +22,8 @@ ROOT_DIR = Path(__file__).resolve().parents[1]   # .../backend/app
 sys.path.insert(0, str(ROOT_DIR.parent))         # .../backend
 
 from app.main import app  # noqa
+import app.services.ollama_client as oc  # noqa
+from app.services import circuit_breaker  # noqa
 
 @pytest_asyncio.fixture
 async def async_client():
@@ -29,6 +32,27 @@ async def async_client():
         async with AsyncClient(transport=transport, base_url="http://testserver") as client:
             yield client
 
+@pytest_asyncio.fixture
+async def fake_ollama(monkeypatch):
+    """
+    Fábrica de OllamaClient con transporte en memoria: fake_ollama(handler, host=..., install=True, **kw).
+    Con install=True queda como cliente del proceso (get_ollama). Cada test arranca con breakers
+    nuevos (el registro es global por nombre) y los clientes se cierran al terminar.
+    """
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    clients = []
+
+    def make(handler, host: str = "http://fake", *, install: bool = True, **kw):
+        client = oc.OllamaClient(host, transport=httpx.MockTransport(handler), **kw)
+        clients.append(client)
+        if install:
+            monkeypatch.setattr(oc, "_client", client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
 # -------- Helpers --------
 async def _register(client: AsyncClient, *, role: str = "usuario"):
     email = f"test_{uuid.uuid4().hex[:8]}@example.com"
@@ -0,0 +1,55 @@
+# backend/app/tests/test_batch_translation.py
+import pytest
+
+from app.services.batch_translation import pack, parse_reply, translate_batch
+from app.services.translation_cache import TranslationCache, cache_key
+
+class _MemCache(TranslationCache):
+    """TranslationCache con L2 en un dict (sin Mongo)."""
+    def __init__(self, remote):
+        super().__init__(max_entries=100, ttl=60)
+        self.remote = remote
+        self.stored = []
+
+    def get_remote_many(self, texts, model):
+        return {cache_key(t, model): self.remote[t] for t in texts if t in self.remote}
+
+    def put_many(self, pairs, model):
+        for t, tr in pairs:
+            self.local.set(cache_key(t, model), tr)
+            self.stored.append((t, tr))
+
+def test_pack_respects_token_and_item_limits():
+    assert pack(["a" * 40] * 5, max_tokens=25, max_items=10) == [[0, 1], [2, 3], [4]]
+    assert pack(["a"] * 5, max_tokens=1000, max_items=2) == [[0, 1], [2, 3], [4]]
+    assert pack(["a" * 400, "b"], max_tokens=10, max_items=10) == [[0], [1]]
+
+def test_parse_reply_requires_exact_count():
+    assert parse_reply('{"traducciones": ["x", "y"]}', 2) == ["x", "y"]
+    assert parse_reply('{"traducciones": ["x"]}', 2) is None
+    assert parse_reply("no json", 1) is None
+
+@pytest.mark.asyncio
+async def test_batch_dedupes_uses_cache_and_isolates_failures():
+    cache = _MemCache({"Hola": "Niltze"})
+    chunk_calls = []
+
+    async def ask_chunk(texts):
+        chunk_calls.append(texts)
+        return '{"traducciones": ["mal"]}'     # cantidad incorrecta → reintento por ítem
+
+    async def ask_one(text):
+        if text == "falla":
+            raise RuntimeError("upstream 500")
+        return f"nah:{text}"
+
+    out = await translate_batch(["Hola", "Respira", "falla", "Respira ", ""], "m", cache, ask_chunk, ask_one)
+    items = out["items"]
+    assert [it["index"] for it in items] == [0, 1, 2, 3, 4]
+    assert items[0] == {"index": 0, "ok": True, "traduccion": "Niltze", "cached": True}
+    assert items[1]["traduccion"] == items[3]["traduccion"] == "nah:Respira"
+    assert items[2] == {"index": 2, "ok": False, "error": "upstream 500"}
+    assert not items[4]["ok"]
+    assert chunk_calls == [["Respira", "falla"]]
+    assert cache.stored == [("Respira", "nah:Respira")]
+    assert out["stats"]["unique"] == 3 and out["stats"]["upstream_batches"] == 1
@@ -0,0 +1,68 @@
+# backend/app/tests/test_catalogs.py
+import asyncio
+import pytest
+from app.services.catalogs import CatalogStore
+
+pytestmark = pytest.mark.asyncio
+
+class _MemoryCatalogStore(CatalogStore):
+    """Persistencia en memoria en lugar de Mongo."""
+    def __init__(self):
+        super().__init__()
+        self.saved = {}
+
+    def _load(self, name, lang):
+        return self.saved.get(f"{name}:{lang}")
+
+    def _save(self, doc):
+        self.saved[doc["_id"]] = doc
+
+async def test_localized_catalog_is_built_once_and_versioned():
+    store = _MemoryCatalogStore()
+    store.register_source("demo", ["uno", "dos"])
+    calls = []
+
+    async def translate(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return f"nah:{text}"
+
+    docs = await asyncio.gather(*[store.get("demo", "nahuatl", translate, "m") for _ in range(3)])
+    assert calls == ["uno", "dos"]
+    assert docs[0]["items"] == ["nah:uno", "nah:dos"] and docs[0]["complete"]
+    assert store.get_cached("demo", "nah")["version"] == docs[0]["version"]
+    assert store.get_cached("demo", "es-MX")["items"] == ["uno", "dos"]
+
+async def test_reviewed_catalog_is_never_overwritten():
+    store = _MemoryCatalogStore()
+    store.register_source("demo", ["uno"])
+    store.saved["demo:nah"] = {"_id": "demo:nah", "lang": "nah", "version": "old",
+                               "items": ["revisado"], "status": "reviewed"}
+
+    async def translate(text):
+        raise AssertionError("no debe traducir")
+
+    doc = await store.get("demo", "nah", translate, "m")
+    assert doc["items"] == ["revisado"]
+
+async def test_rebuilt_incomplete_catalog_gets_a_new_etag(monkeypatch):
+    import app.services.catalogs as catalogs
+    store = _MemoryCatalogStore()
+    store.register_source("demo", ["uno", "dos"])
+    down = True
+
+    async def translate(text):
+        return text if down else f"nah:{text}"   # falla → texto fuente
+
+    partial = await store.get("demo", "nah", translate, "m")
+    assert not partial["complete"]
+
+    down = False
+    monkeypatch.setattr(catalogs, "REBUILD_INCOMPLETE_AFTER", 0)
+    full = await store.get("demo", "nah", translate, "m")
+    assert full["complete"] and full["version"] == partial["version"]
+    assert full["etag"] != partial["etag"]
+
+    from app.routes.ai import _catalog_headers
+    assert _catalog_headers(partial)["Cache-Control"] == "no-cache"
+    assert _catalog_headers(full) == {"ETag": f'"{full["etag"]}"', "Cache-Control": "public, max-age=3600"}
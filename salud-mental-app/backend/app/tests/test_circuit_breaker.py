@@ -0,0 +1,79 @@
+# backend/app/tests/test_circuit_breaker.py
+import json
+import time
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+pytestmark = pytest.mark.asyncio
+
+async def _fail():
+    raise RuntimeError("backend caído")
+
+async def _ok():
+    return "ok"
+
+async def test_breaker_trips_probes_and_recovers():
+    b = CircuitBreaker("t", window=10, min_calls=3, error_rate=0.5, open_for=0.05)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            await b.call(_fail)
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpen):
+        await b.call(_ok)
+
+    time.sleep(0.06)
+    b.allow()                       # sonda half-open
+    assert b.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        b.allow()                   # solo una sonda a la vez
+    b.record(False)
+    assert b.state == CLOSED
+    assert await b.call(_ok) == "ok"
+
+async def test_slow_calls_count_as_failures():
+    b = CircuitBreaker("lento", window=4, min_calls=2, error_rate=0.5, slow_after=0.0)
+    await b.call(_ok)
+    await b.call(_ok)
+    assert b.state == OPEN
+
+async def test_open_ollama_circuit_returns_safe_reply_fast(fake_ollama):
+    import app.routes.ai as ai
+
+    def handler(req: httpx.Request):
+        return httpx.Response(500, json={"error": "boom"})
+
+    client = fake_ollama(handler)
+    client.breaker.min_calls, client.breaker.open_for = 1, 60
+
+    with pytest.raises(Exception):
+        await ai.saludos(name="Ana", sid=None, model="m", temp=None, topp=None, lang="es-MX")
+    assert client.breaker.state == OPEN
+
+    start = time.perf_counter()
+    out = await ai.respuestas(name="Ana", interaccion="Estoy cansada", sid=None, model="m",
+                              temp=None, topp=None, lang="es-MX")
+    assert out["degraded"] and out["respuesta"] == ai.fallback_response("Estoy cansada")
+    assert time.perf_counter() - start < 0.1
+
+async def test_rejected_requests_do_not_open_the_circuit(fake_ollama):
+    import app.routes.ai as ai
+
+    def handler(req: httpx.Request):
+        if json.loads(req.content)["model"] == "nope":
+            return httpx.Response(404, json={"error": "model 'nope' not found"})
+        return httpx.Response(200, json={"response": "Hola Ana, soy CoralIA. ¿Cómo te sientes hoy?", "done": True})
+
+    client = fake_ollama(handler)
+    client.breaker.min_calls = 1
+
+    for _ in range(5):
+        with pytest.raises(HTTPException) as exc:
+            await ai.saludos(name="Ana", sid=None, model="nope", temp=None, topp=None, lang="es-MX")
+        assert exc.value.status_code == 400
+    assert client.breaker.state == CLOSED and client.breaker.stats()["error_rate"] == 0.0
+
+    out = await ai.saludos(name="Ana", sid=None, model="m", temp=None, topp=None, lang="es-MX")
+    assert not out.get("degraded")
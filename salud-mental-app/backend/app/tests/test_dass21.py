@@ -1 +1,63 @@
-﻿def test_dass(): assert True
+# backend/app/tests/test_dass21.py
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.routes import flows
+
+def test_dass(): assert True
+
+class _Sessions:
+    """Colección mínima: cuenta viajes y aplica $set con rutas "answers.<i>"."""
+    def __init__(self, doc):
+        self.doc = doc
+        self.calls = []
+
+    def _set(self, fields):
+        for key, value in fields.items():
+            if key.startswith("answers."):
+                self.doc["answers"][int(key.split(".")[1])] = value
+            else:
+                self.doc[key] = value
+
+    def find_one_and_update(self, flt, update, projection=None, return_document=ReturnDocument.BEFORE):
+        self.calls.append("find_one_and_update")
+        if flt["_id"] != self.doc["_id"]:
+            return None
+        self._set(update["$set"])
+        return {"_id": self.doc["_id"], "answers": list(self.doc["answers"])}
+
+    def update_one(self, flt, update):
+        self.calls.append("update_one")
+        self._set(update["$set"])
+
+class _Db:
+    def __init__(self, sessions):
+        self.sessions = sessions
+
+def _fake_db(monkeypatch, answers):
+    sessions = _Sessions({"_id": ObjectId(), "state": "DASS21", "answers": answers})
+    monkeypatch.setattr(flows, "get_db", lambda: _Db(sessions))
+    return sessions
+
+def test_progress_scores_on_complete_answers():
+    assert flows._dass21_progress([1] * 20 + [None]) == {
+        "done": False, "next_index": 20, "next_text": flows.DASS21_QUESTIONS[20]}
+    done = flows._dass21_progress([3] * 21)
+    assert done["done"] and done["scores"]["depresion"] == {"score": 42, "severity": "extremo"}
+    assert flows._dass21_progress([])["next_index"] == 0
+
+def test_answer_is_one_round_trip_until_complete(monkeypatch):
+    sessions = _fake_db(monkeypatch, [0] * 20 + [None])
+    sid = str(sessions.doc["_id"])
+    out = flows.dass21_answer(flows.DassAnswerIn(session_id=sid, index=3, value=2))
+    assert out["next_index"] == 20 and sessions.calls == ["find_one_and_update"]
+    assert sessions.doc["answers"][3] == 2
+
+    out = flows.dass21_answer(flows.DassAnswerIn(session_id=sid, index=20, value=1))
+    assert out["done"] and out["scores"]["ansiedad"]["score"] == 4
+    assert sessions.doc["state"] == "NEGOTIATION" and sessions.doc["dass21_result"] == out["scores"]
+
+def test_bulk_answers_score_in_one_write(monkeypatch):
+    sessions = _fake_db(monkeypatch, [None] * 21)
+    out = flows.dass21_answers(flows.DassAnswersIn(session_id=str(sessions.doc["_id"]), answers=[1] * 21))
+    assert out["done"] and out["scores"]["estres"] == {"score": 14, "severity": "normal"}
+    assert sessions.calls == ["find_one_and_update"] and sessions.doc["answers"] == [1] * 21
@@ -0,0 +1,126 @@
+# backend/app/tests/test_deadline.py
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import deadline
+
+def test_budget_by_route_class_and_header_only_shortens():
+    assert deadline.route_budget("/ai/saludos") == deadline.DEADLINE_CLASSES["interactive"]
+    assert deadline.route_budget("/ai/respuestas/stream") == deadline.DEADLINE_CLASSES["stream"]
+    assert deadline.route_budget("/ai/saludos", "2000") == 2.0
+    assert deadline.route_budget("/ai/saludos", "9999999") == deadline.DEADLINE_CLASSES["interactive"]
+    assert deadline.route_budget("/ai/saludos", "basura") == deadline.DEADLINE_CLASSES["interactive"]
+    assert deadline.route_budget("/ai/metrics") is None
+    for path in ("/ai/genera_voz", "/ai/catalogs/dass21", "/ai/dass21"):   # llegan a OpenAI/TTS
+        assert deadline.route_budget(path) == deadline.DEADLINE_CLASSES["content"]
+    assert deadline.budget("llm") is None            # fuera de una petición no hay deadline
+
+@pytest.mark.asyncio
+async def test_bounded_cancels_call_and_counts_stage():
+    token = deadline.start_request("/ai/saludos", "500")
+    before = deadline.stats()["exceeded"].get("demo", 0)
+    try:
+        with pytest.raises(deadline.DeadlineExceeded):
+            await deadline.bounded("demo", asyncio.sleep(5))
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.budget("demo")
+    finally:
+        deadline.finish_request(token)
+    assert deadline.stats()["exceeded"]["demo"] == before + 2
+    assert deadline.remaining() is None
+
+@pytest.mark.asyncio
+async def test_slow_llm_returns_safe_fallback_within_deadline(fake_ollama):
+    import app.routes.ai as ai
+
+    async def handler(req: httpx.Request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={"response": "tarde", "done": True})
+
+    client = fake_ollama(handler)
+
+    token = deadline.start_request("/ai/saludos", "600")
+    start = asyncio.get_running_loop().time()
+    try:
+        out = await ai.saludos(name="Ana", sid=None, model="m", temp=None, topp=None, lang="es-MX")
+    finally:
+        deadline.finish_request(token)
+    assert out["degraded"] and "Ana" in out["respuesta"]
+    assert asyncio.get_running_loop().time() - start < 2
+    assert client.breaker.stats()["window"] == 0     # presupuesto corto del cliente: el host no cuenta como lento
+    assert deadline.stats()["exceeded"]["llm"] >= 1
+
+@pytest.mark.asyncio
+async def test_hung_llm_trips_breaker_through_deadline(fake_ollama):
+    import app.routes.ai as ai
+    from app.services.circuit_breaker import OPEN
+
+    calls = []
+
+    async def handler(req: httpx.Request):
+        calls.append(req)
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={"response": "tarde", "done": True})
+
+    client = fake_ollama(handler)
+    client.breaker.slow_after, client.breaker.min_calls = 0.3, 2
+
+    for _ in range(2):
+        token = deadline.start_request("/ai/saludos", "600")
+        try:
+            await ai.saludos(name="Ana", sid=None, model="m", temp=None, topp=None, lang="es-MX")
+        finally:
+            deadline.finish_request(token)
+    assert client.breaker.state == OPEN
+
+    start = asyncio.get_running_loop().time()
+    out = await ai.saludos(name="Ana", sid=None, model="m", temp=None, topp=None, lang="es-MX")
+    assert out["degraded"] and asyncio.get_running_loop().time() - start < 0.1
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_stream_queue_wait_is_capped_by_deadline(fake_ollama, monkeypatch):
+    import app.routes.ai as ai
+    from app.services.llm_scheduler import LLMScheduler
+
+    sched = LLMScheduler(limit=1, max_queue=4, max_wait=30)
+    monkeypatch.setattr(ai, "llm_scheduler", sched)
+    held = await sched.admit("m")   # el modelo está ocupado más allá del deadline
+    fake_ollama(lambda req: httpx.Response(500))
+
+    token = deadline.start_request("/ai/respuestas/stream", "600")
+    start = asyncio.get_running_loop().time()
+    try:
+        resp = await ai.respuestas_stream(name="Ana", interaccion="Tengo examen mañana", sid=None,
+                                          model="m", temp=None, topp=None, lang="es-MX")
+        body = "".join([chunk async for chunk in resp.body_iterator])
+    finally:
+        deadline.finish_request(token)
+        held()
+    assert asyncio.get_running_loop().time() - start < 2
+    assert "event: token" in body and '"degraded": true' in body
+
+@pytest.mark.asyncio
+async def test_nahuatl_translation_is_bounded_by_deadline(fake_ollama, monkeypatch):
+    # fake_ollama también aísla los breakers: el de "openai" no se comparte con otras pruebas
+    from types import SimpleNamespace
+    import app.routes.ai as ai
+
+    async def create(**kw):
+        await asyncio.sleep(5)   # OpenAI colgado
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai, "OPENAI_KEY", "sk-test")
+    monkeypatch.setattr(ai, "require_async_openai", lambda: fake)
+    monkeypatch.setattr(ai.translation_cache, "get_remote", lambda text, model: None)
+
+    token = deadline.start_request("/ai/nahuatl", "600")
+    start = asyncio.get_running_loop().time()
+    try:
+        out = await ai.nahuatl(texto="Respira profundo")
+    finally:
+        deadline.finish_request(token)
+    assert out == {"traduccion": "Respira profundo"}   # fallback: el texto fuente
+    assert asyncio.get_running_loop().time() - start < 2
@@ -0,0 +1,17 @@
+# backend/app/tests/test_generation_policy.py
+import random
+
+from app.services.generation_policy import GenerationPolicy
+
+def test_flag_rate_converges_to_true_rate_while_speculating():
+    rng = random.Random(7)
+    for p, final_mode in ((0.3, "speculative"), (0.1, "serial")):
+        policy = GenerationPolicy(threshold=0.2, mode="auto", speculative_n=3, probe_every=4)
+        policy.flag_rate = 0.5   # arranca en modo especulativo
+        rates = []
+        for _ in range(8000):
+            if policy.choose() == "serial":   # solo el primer intento en serie registra
+                policy.record(rng.random() < p)
+                rates.append(policy.flag_rate)
+        assert abs(sum(rates[-1000:]) / 1000 - p) < 0.04
+        assert max(policy.chosen, key=policy.chosen.get) == final_mode
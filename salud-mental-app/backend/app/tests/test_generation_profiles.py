@@ -0,0 +1,40 @@
+# backend/app/tests/test_generation_profiles.py
+import json
+
+import httpx
+import pytest
+
+from app.services.generation_profiles import GenerationProfile, generate_with_profile
+from app.services.sentence_pipeline import SentenceBudget
+
+def test_budget_cuts_after_n_sentences_without_leaking_next_one():
+    budget = SentenceBudget(2, min_chars=5)
+    out = "".join(budget.feed(c) for c in ["Hola Ana.", " Respira ", "conmigo. Y luego", " cuéntame."])
+    assert out == "Hola Ana. Respira conmigo."
+    assert budget.done and budget.feed(" más") == ""
+
+@pytest.mark.asyncio
+async def test_generate_stops_streaming_once_sentence_budget_is_met(fake_ollama):
+    words = "Estoy aquí contigo. Respira lento. ¿Qué sientes ahora? Otra frase más. Y otra."
+    sent, bodies = [], []
+
+    async def lines():
+        for w in words.split(" "):
+            sent.append(w)
+            yield (json.dumps({"response": w + " ", "done": False}) + "\n").encode()
+        yield (json.dumps({"response": "", "done": True}) + "\n").encode()
+
+    def handler(req: httpx.Request):
+        bodies.append(json.loads(req.content))
+        return httpx.Response(200, content=lines())
+
+    client = fake_ollama(handler, install=False)
+    profile = GenerationProfile(num_predict=50, max_sentences=3)
+
+    data = await generate_with_profile(client, "m", "hola", profile, "demo", options={"seed": 1})
+    assert data["response"] == "Estoy aquí contigo. Respira lento. ¿Qué sientes ahora?"
+    assert data["done_reason"] == "sentences" and len(sent) < len(words.split(" "))
+    assert bodies[0]["stream"] is True
+    assert bodies[0]["options"]["num_predict"] == 50 and bodies[0]["options"]["seed"] == 1
+    assert "\nUsuario:" in bodies[0]["options"]["stop"]
+    assert client.breaker.stats()["window"] == 1   # corte deliberado cuenta como éxito
@@ -0,0 +1,59 @@
+# backend/app/tests/test_greeting_pool.py
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.greeting_pool import NAME_SLOT, GreetingPool
+
+pytestmark = pytest.mark.asyncio
+
+async def test_fill_take_and_low_water_refill():
+    n = iter(range(100))
+
+    async def produce(lang):
+        i = next(n)
+        if i == 1:
+            return "Hola sin hueco", "m"   # candidato sin NAME_SLOT: se descarta
+        return f"Hola {NAME_SLOT}, saludo {i}.", "m"
+
+    pool = GreetingPool(["es-MX"], size=4, low_water=2, retry_s=5)
+    assert await pool.fill("es-MX", produce) == 4
+    assert pool.stats()["rejected"] == 1
+
+    assert pool.take("es-MX", "Ana") == ("Hola Ana, saludo 0.", "m")
+    assert pool.take("nah", "Ana") is None           # idioma sin bucket
+    pool.take("es-MX", "Luis")
+    assert not pool._wake.is_set()
+    pool.take("es-MX", "Sofía")                       # queda 1 < low_water
+    assert pool._wake.is_set()
+
+    worker = asyncio.create_task(pool.run(produce))
+    for _ in range(50):
+        await asyncio.sleep(0)
+    worker.cancel()
+    assert pool.stats()["sizes"]["es-MX"] == 4
+
+async def test_saludos_served_from_pool_without_llm(fake_ollama, monkeypatch):
+    import app.routes.ai as ai
+
+    calls = []
+
+    def handler(req: httpx.Request):
+        calls.append(json.loads(req.content))
+        return httpx.Response(200, json={"response": f"¡Hola, {NAME_SLOT}! Soy CoralIA. ¿Cómo estás hoy?",
+                                         "done": True})
+
+    fake_ollama(handler)
+    pool = GreetingPool(["es-MX", "nah"], size=1, low_water=1)
+    monkeypatch.setattr(ai, "greeting_pool", pool)
+
+    assert await pool.fill("es-MX", ai.produce_pooled_greeting) == 1
+    assert NAME_SLOT in calls[0]["prompt"]
+    out = await ai.saludos(name="Ana", sid=None, model=None, temp=None, topp=None, lang="es-MX")
+    assert out["respuesta"] == "¡Hola, Ana! Soy CoralIA. ¿Cómo estás hoy?" and out["pooled"]
+    assert len(calls) == 1
+
+    out = await ai.saludos(name="Luis", sid=None, model=None, temp=None, topp=None, lang="es-MX")
+    assert "pooled" not in out and len(calls) == 2   # bucket vacío: camino en vivo
@@ -0,0 +1,23 @@
+# backend/app/tests/test_guardrails.py
+from app.services.guardrails import GuardrailMatcher, get_matcher
+from app.services.chatbot_service import text_to_flags
+from app.routes.ai import contains_banned, contains_refusal
+
+def test_matcher_matches_and_flags_in_one_pass():
+    m = GuardrailMatcher({"a": ["he", "hers"], "b": ["she", "his"]})
+    res = m.scan("USHERS")
+    assert set(res.matches) == {"she", "he", "hers"}
+    assert res.flags == {"a", "b"}
+    assert not m.scan("nada aquí")
+
+def test_normalization_accents_and_spaces():
+    m = get_matcher()
+    assert m.has_flag("Tengo   IDEACIÓN   suicida", "banned")
+    assert contains_banned("quiero AUTOLESIONARME")
+    assert not contains_banned("Hoy quiero respirar tranquila")
+
+def test_call_sites_flags():
+    assert text_to_flags("me siento sin esperanza") == ["hopelessness"]
+    assert text_to_flags("quiero morir, no vale la pena") == ["explicit_ideation", "hopelessness"]
+    assert get_matcher().has_flag("¿Cómo matarme?", "blocklist")
+    assert contains_refusal("Lo siento, pero no puedo ayudarte")
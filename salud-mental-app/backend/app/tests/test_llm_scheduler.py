@@ -0,0 +1,65 @@
+# backend/app/tests/test_llm_scheduler.py
+import asyncio
+import pytest
+from app.services.llm_scheduler import (
+    LLMSaturated, LLMScheduler, PRIORITY_BULK, PRIORITY_CRISIS,
+)
+
+pytestmark = pytest.mark.asyncio
+
+async def test_higher_priority_is_admitted_first():
+    sched = LLMScheduler(limit=1, max_queue=4, max_wait=5)
+    order = []
+    first = await sched.admit("m", PRIORITY_BULK)
+
+    async def worker(tag, prio):
+        async with sched.slot("m", prio):
+            order.append(tag)
+
+    bulk = asyncio.create_task(worker("bulk", PRIORITY_BULK))
+    await asyncio.sleep(0)
+    crisis = asyncio.create_task(worker("crisis", PRIORITY_CRISIS))
+    await asyncio.sleep(0)
+    first()
+    await asyncio.gather(bulk, crisis)
+    assert order == ["crisis", "bulk"]
+    assert sched.stats()["models"]["m"]["active"] == 0
+
+async def test_full_queue_is_rejected_with_429():
+    sched = LLMScheduler(limit=1, max_queue=1, max_wait=5)
+    release = await sched.admit("m")
+    waiter = asyncio.create_task(sched.admit("m"))
+    await asyncio.sleep(0)
+    with pytest.raises(LLMSaturated) as exc:
+        await sched.admit("m")
+    assert exc.value.status_code == 429 and exc.value.retry_after >= 1
+    release()
+    (await waiter)()
+    assert sched.stats()["models"]["m"]["rejected"] == 1
+
+async def test_wait_timeout_returns_503():
+    sched = LLMScheduler(limit=1, max_queue=4, max_wait=0.05)
+    release = await sched.admit("m")
+    with pytest.raises(LLMSaturated) as exc:
+        await sched.admit("m")
+    assert exc.value.status_code == 503
+    release()
+    assert sched.stats()["models"]["m"]["queued"] == 0
+
+async def test_multi_permit_request_waits_for_enough_slots():
+    sched = LLMScheduler(limit=3, max_queue=4, max_wait=5)
+    single = await sched.admit("m")
+    batch = asyncio.create_task(sched.admit("m", PRIORITY_CRISIS, permits=3))
+    await asyncio.sleep(0)
+    assert not batch.done() and sched.stats()["models"]["m"]["active"] == 1
+
+    late = asyncio.create_task(sched.admit("m", PRIORITY_BULK))
+    await asyncio.sleep(0)
+    assert not late.done()          # no se cuela delante del lote aunque quedan cupos libres
+
+    single()
+    release_batch = await batch
+    assert sched.stats()["models"]["m"]["active"] == 3
+    release_batch()
+    (await late)()
+    assert sched.stats()["models"]["m"]["active"] == 0
@@ -0,0 +1,64 @@
+# backend/app/tests/test_memory_summarizer.py
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import deadline, memory_store
+from app.services.memory_summarizer import MemorySummarizer, render
+from app.services.tokens import estimate_tokens
+
+def _msgs(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "text": f"mensaje {i} " * 5, "ts": float(i)}
+            for i in range(n)]
+
+def test_render_keeps_summary_and_recent_turns_within_budget():
+    out = render("Ana habla de estrés laboral.", _msgs(20), recent_turns=3, token_budget=10_000)
+    assert out.startswith("Resumen: Ana habla de estrés laboral.")
+    assert "mensaje 14" in out and "mensaje 13" not in out
+
+    small = render("Ana habla de estrés laboral.", _msgs(20), recent_turns=3, token_budget=40)
+    assert estimate_tokens(small) <= 40 + 3
+    assert "mensaje 19" in small and "mensaje 14" not in small
+
+@pytest.mark.asyncio
+async def test_summarize_folds_older_turns(fake_ollama, monkeypatch):
+    doc = {"summary": "", "summarized_upto": None, "messages": _msgs(10)}
+    saved = {}
+    monkeypatch.setattr(memory_store, "get_for_summary", lambda sid: doc)
+    monkeypatch.setattr(memory_store, "save_summary",
+                        lambda sid, summary, upto, prev: saved.update(summary=summary, upto=upto, prev=prev) or True)
+
+    prompts = []
+    def handler(req: httpx.Request):
+        prompts.append(req.content.decode())
+        return httpx.Response(200, json={"response": "Ana se siente agotada por el trabajo.", "done": True})
+
+    fake_ollama(handler)
+
+    assert await MemorySummarizer(recent_turns=3, model="m").summarize("sid")
+    assert saved == {"summary": "Ana se siente agotada por el trabajo.", "upto": 3.0, "prev": None}
+    assert "mensaje 3" in prompts[0] and "mensaje 4" not in prompts[0]
+
+@pytest.mark.asyncio
+async def test_scheduled_summary_outlives_the_request_deadline(fake_ollama, monkeypatch):
+    doc = {"summary": "", "summarized_upto": None, "messages": _msgs(10)}
+    saved = []
+    monkeypatch.setattr(memory_store, "get_for_summary", lambda sid: doc)
+    monkeypatch.setattr(memory_store, "save_summary", lambda sid, summary, upto, prev: saved.append(summary) or True)
+
+    async def handler(req: httpx.Request):
+        await asyncio.sleep(0.7)   # más que todo el presupuesto de la petición que lo agendó
+        return httpx.Response(200, json={"response": "Resumen.", "done": True})
+
+    fake_ollama(handler)
+    summarizer = MemorySummarizer(recent_turns=3, model="m")
+    before = deadline.stats()["exceeded"].get("llm", 0)
+    token = deadline.start_request("/ai/respuestas", "500")
+    try:
+        summarizer.schedule("sid")
+    finally:
+        deadline.finish_request(token)
+    await asyncio.gather(*summarizer._running.values())
+    assert saved == ["Resumen."] and summarizer.failures == 0
+    assert deadline.stats()["exceeded"].get("llm", 0) == before
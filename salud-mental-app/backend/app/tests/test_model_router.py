@@ -0,0 +1,40 @@
+# backend/app/tests/test_model_router.py
+from app.services.model_router import ModelRouter
+
+SMALL, LARGE = "small:3b", "large:8b"
+
+def _router(**kw):
+    return ModelRouter([SMALL, LARGE], slos={"short": 2.0, "content": 6.0, "empathetic": 10.0},
+                       min_samples=3, explore=0.0, **kw)
+
+def test_without_models_uses_default():
+    assert ModelRouter([]).choose("saludos", "llama3.1:8b") == "llama3.1:8b"
+
+def test_short_tasks_fall_back_to_small_model_when_large_misses_slo():
+    r = _router()
+    assert r.choose("saludos", LARGE) == LARGE          # sin muestras: se prueba el pesado
+    for _ in range(3):
+        r.record("saludos", LARGE, 3.5, False)
+    assert r.choose("saludos", LARGE) == SMALL          # el pesado no cabe en 2 s
+    assert r.choose("mindfullness", LARGE) == LARGE     # otra clase, otro presupuesto
+
+def test_large_model_kept_when_budget_allows_and_empathetic_pinned():
+    r = _router()
+    for _ in range(3):
+        r.record("eea", LARGE, 1.2, False)
+    assert r.choose("eea", LARGE) == LARGE
+    for _ in range(3):
+        r.record("respuestas", LARGE, 30.0, True)
+    assert r.choose("respuestas", LARGE) == LARGE
+
+def test_high_flag_rate_skips_model_and_fastest_wins_when_none_fit():
+    r = _router(max_flag_rate=0.3, window=3)
+    for _ in range(3):
+        r.record("saludos", LARGE, 1.0, True)
+        r.record("saludos", SMALL, 2.5, False)
+    # el pesado se marca seguido y el ligero no cabe en 2 s: gana el más rápido observado
+    assert r.choose("saludos", LARGE) == LARGE
+    for _ in range(3):
+        r.record("saludos", SMALL, 1.5, False)
+    assert r.choose("saludos", LARGE) == SMALL
+    assert r.stats()["chosen"]["saludos"] == {LARGE: 1, SMALL: 1}
@@ -0,0 +1,33 @@
+# backend/app/tests/test_model_warmup.py
+import json
+import httpx
+import pytest
+
+from app.services.model_warmup import ModelWarmer
+
+pytestmark = pytest.mark.asyncio
+
+async def test_warm_loads_models_and_reports_readiness(fake_ollama):
+    calls = []
+
+    def handler(req: httpx.Request):
+        body = json.loads(req.content)
+        calls.append(body)
+        if body["model"] == "missing":
+            return httpx.Response(404, json={"error": "model not found"})
+        return httpx.Response(200, json={"done": True, "load_duration": 2_500_000_000})
+
+    fake_ollama(handler, keep_alive="30m")
+
+    warmer = ModelWarmer(interval=60)
+    warmer.configure(["a", "missing", "a"])
+    assert await warmer.warm() == {"a": True, "missing": False}
+    assert all("prompt" not in c and c["keep_alive"] == "30m" for c in calls)
+
+    st = warmer.status()
+    assert st["ready"] is False
+    assert st["models"]["a"]["ready"] and st["models"]["a"]["load_s"] == 2.5
+    assert "404" in st["models"]["missing"]["error"]
+
+    await warmer.ping("a")   # keep-alive: no cuenta como nueva carga
+    assert warmer.status()["models"]["a"]["loads"] == 1
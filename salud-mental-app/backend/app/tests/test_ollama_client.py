@@ -0,0 +1,76 @@
+# backend/app/tests/test_ollama_client.py
+import asyncio
+import json
+import httpx
+import pytest
+
+from app.routes.ai import safe_generate
+
+pytestmark = pytest.mark.asyncio
+
+def _replies(fake_ollama, replies):
+    """Cliente en memoria que devuelve `replies` en orden."""
+    calls = []
+
+    def handler(req: httpx.Request):
+        calls.append(json.loads(req.content))
+        return httpx.Response(200, json={"response": replies[min(len(calls), len(replies)) - 1], "done": True})
+
+    fake_ollama(handler)
+    return calls
+
+async def test_safe_generate_retries_on_flagged_output(fake_ollama):
+    calls = _replies(fake_ollama, ["No puedo ayudar con eso.", "Respiremos juntos. ¿Qué sientes?"])
+
+    texto, _, intentos, flagged = await safe_generate("m", "hola", 0.5, 0.9)
+    assert texto == "Respiremos juntos. ¿Qué sientes?"
+    assert intentos == 2 and not flagged
+    assert calls[0]["options"] == {"temperature": 0.5, "top_p": 0.9}
+    assert "REGLA ESTRICTA" in calls[1]["prompt"]
+
+async def test_identical_prompts_share_one_generation(fake_ollama):
+    import app.routes.ai as ai
+
+    calls = _replies(fake_ollama, ["Hola, soy CoralIA."])
+    before = ai._llm_flight.coalesced
+
+    outs = await asyncio.gather(*[safe_generate("m", "saludo", 0.5, 0.5, coalesce=True) for _ in range(5)])
+    assert len(calls) == 1
+    assert {o[0] for o in outs} == {"Hola, soy CoralIA."}
+    assert ai._llm_flight.coalesced - before == 4
+
+async def test_speculative_mode_returns_first_passing_candidate(fake_ollama, monkeypatch):
+    import app.routes.ai as ai
+    from app.services.generation_policy import GenerationPolicy
+
+    prompts = []
+
+    async def handler(req: httpx.Request):
+        body = json.loads(req.content)
+        prompts.append(body["prompt"])
+        if "REGLA ESTRICTA" in body["prompt"]:
+            await asyncio.sleep(0.02)   # el candidato 0 (prompt original) termina primero
+            return httpx.Response(200, json={"response": "Respiremos juntos.", "done": True})
+        return httpx.Response(200, json={"response": "No puedo ayudar.", "done": True})
+
+    fake_ollama(handler)
+    policy = GenerationPolicy(mode="speculative", speculative_n=4)
+    monkeypatch.setattr(ai, "policy_for", lambda endpoint: policy)
+
+    texto, _, _, flagged = await safe_generate("m", "hola", 0.5, 0.5, endpoint="demo")
+    assert texto == "Respiremos juntos." and not flagged
+    assert len(prompts) == 4
+    # los candidatos especulativos no alimentan la tasa (la miden las muestras en serie)
+    assert policy.chosen["speculative"] == 1 and policy.samples == 0
+    assert ai.histogram("llm.speculative.demo").count == 1
+
+async def test_endpoints_send_stable_system_prefix(fake_ollama):
+    import app.routes.ai as ai
+
+    calls = _replies(fake_ollama, ["Hola, soy CoralIA. ¿Cómo te sientes hoy?"])
+
+    await ai.saludos(name="Ana", sid=None, model="m", temp=None, topp=None, lang="es-MX")
+    await ai.saludos(name="Luis", sid=None, model="m", temp=None, topp=None, lang="nah")
+    assert calls[0]["system"] == calls[1]["system"] == ai.SYSTEM_PREFIX
+    assert ai.banned_terms[0] in ai.SYSTEM_PREFIX
+    assert ai.banned_terms[0] not in calls[0]["prompt"]
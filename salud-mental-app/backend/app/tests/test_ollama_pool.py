@@ -0,0 +1,108 @@
+# backend/app/tests/test_ollama_pool.py
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import app.services.ollama_client as oc
+from app.services.circuit_breaker import CircuitOpen
+
+pytestmark = pytest.mark.asyncio
+
+def _host(fake_ollama, name, *, installed=("m:latest",), loaded=(), down=False, delay=0.0):
+    """Host en memoria; `state["down"]` lo apaga/enciende durante la prueba."""
+    state = {"down": down, "calls": 0}
+
+    async def handler(req: httpx.Request):
+        if state["down"]:
+            raise httpx.ConnectError("caído", request=req)
+        if req.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": m} for m in installed]})
+        if req.url.path == "/api/ps":
+            return httpx.Response(200, json={"models": [{"name": m} for m in loaded]})
+        state["calls"] += 1
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"response": name, "done": True,
+                                         "model": json.loads(req.content)["model"]})
+
+    return fake_ollama(handler, f"http://{name}", install=False), state
+
+async def test_routes_to_hosts_with_model_loaded_and_least_outstanding(fake_ollama):
+    a, sa = _host(fake_ollama, "pool-a", loaded=("m:latest",), delay=0.05)
+    b, sb = _host(fake_ollama, "pool-b", loaded=("m:latest",), delay=0.05)
+    c, sc = _host(fake_ollama, "pool-c", installed=("otro:latest",))
+    pool = oc.OllamaPool([a, b, c])
+    await pool.check_all()
+
+    outs = await asyncio.gather(*(pool.generate("m", "hola") for _ in range(6)))
+    assert {o["response"] for o in outs} == {"pool-a", "pool-b"}
+    assert sa["calls"] == sb["calls"] == 3 and sc["calls"] == 0
+    with pytest.raises(oc.OllamaError):
+        await pool.generate("inexistente", "hola")
+
+async def test_unhealthy_host_is_removed_and_readmitted(fake_ollama):
+    a, sa = _host(fake_ollama, "pool-d", loaded=("m:latest",))
+    b, sb = _host(fake_ollama, "pool-e")
+    pool = oc.OllamaPool([a, b], max_fails=1)
+    await pool.check_all()
+
+    sa["down"] = True
+    await pool.check_all()
+    assert pool.stats()["http://pool-d"]["healthy"] is False
+    assert (await pool.generate("m", "hola"))["response"] == "pool-e"
+
+    sb["down"] = True
+    await pool.check_all()
+    with pytest.raises(CircuitOpen):
+        await pool.generate("m", "hola")
+
+    sa["down"] = False
+    await pool.check_all()
+    assert (await pool.generate("m", "hola"))["response"] == "pool-d"
+
+async def test_failover_to_next_host_on_error(fake_ollama):
+    a, sa = _host(fake_ollama, "pool-f", loaded=("m:latest",))
+    b, _ = _host(fake_ollama, "pool-g")
+    pool = oc.OllamaPool([a, b])
+    await pool.check_all()
+
+    sa["down"] = True   # el health check aún no se enteró
+    assert (await pool.generate("m", "hola"))["response"] == "pool-g"
+    assert pool.stats()["http://pool-f"]["errors"] == 1
+
+async def test_stream_closed_early_releases_host_stream(fake_ollama):
+    lines = b"".join((json.dumps({"response": f"t{i} ", "done": False}) + "\n").encode() for i in range(100))
+    client = fake_ollama(lambda req: httpx.Response(200, content=lines), "http://pool-s", install=False)
+    pool = oc.OllamaPool([client])
+
+    stream = pool.stream("m", "hola")
+    assert await stream.__anext__() == "t0 "
+    await stream.aclose()   # p. ej. corte por guardrails
+    # el stream del host ya se cerró (sin esperar al GC): su finally registró la llamada en el breaker
+    assert client.breaker.stats()["window"] == 1 and pool.backends[0].outstanding == 0
+
+async def test_scheduler_limit_scales_with_hosts_serving_the_model(fake_ollama):
+    from app.services.llm_scheduler import LLMScheduler
+
+    a, _ = _host(fake_ollama, "cap-a", loaded=("m:latest",))
+    b, _ = _host(fake_ollama, "cap-b", loaded=("m:latest",))
+    c, _ = _host(fake_ollama, "cap-c")
+    pool = oc.OllamaPool([a, b, c])
+    await pool.check_all()
+    assert pool.capacity("m") == 2          # cap-c solo lo tiene instalado: no recibe tráfico
+    assert pool.capacity("otro") == 0
+
+    sched = LLMScheduler(limit=1, max_queue=4, max_wait=5, capacity=pool.capacity)
+    held = [await sched.admit("m") for _ in range(2)]
+    waiter = asyncio.create_task(sched.admit("m"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    pool.backends[2].loaded.add("m:latest")   # cap-c cargó el modelo (health check)
+    late = asyncio.create_task(sched.admit("m"))
+    third = await asyncio.wait_for(waiter, 1)   # tercer cupo para quien ya esperaba
+    assert not late.done() and sched.stats()["models"]["m"]["limit"] == 3
+    for release in (*held, third):
+        release()
+    (await late)()
@@ -0,0 +1,89 @@
+# backend/app/tests/test_respuestas_stream.py
+import json
+
+import httpx
+import pytest
+from bson import ObjectId
+
+import app.routes.ai as ai
+
+pytestmark = pytest.mark.asyncio
+
+TERM = ai.banned_terms[0]
+
+def _ollama_stream(fake_ollama, chunks):
+    """Ollama en memoria que transmite `chunks` como NDJSON; devuelve la lista de peticiones."""
+    calls = []
+
+    async def lines():
+        for c in chunks:
+            yield (json.dumps({"response": c, "done": False}) + "\n").encode()
+        yield (json.dumps({"response": "", "done": True}) + "\n").encode()
+
+    def handler(req: httpx.Request):
+        calls.append(json.loads(req.content))
+        return httpx.Response(200, content=lines())
+
+    fake_ollama(handler)
+    return calls
+
+@pytest.fixture
+def memory(monkeypatch):
+    """Sesión válida sin Mongo: registra lo que se guardaría en la memoria."""
+    saved = []
+
+    async def ensure_sid(sid):
+        return ObjectId(sid)
+
+    monkeypatch.setattr(ai, "_ensure_sid_async", ensure_sid)
+    monkeypatch.setattr(ai, "_get_memory_text", lambda sid_oid, max_turns=0: "")
+    monkeypatch.setattr(ai, "_append_memory", lambda sid_oid, role, text: saved.append((role, text)))
+    return saved
+
+async def _run(interaccion):
+    resp = await ai.respuestas_stream(name="Ana", interaccion=interaccion, sid=str(ObjectId()), model="m",
+                                      temp=None, topp=None, lang="es-MX")
+    body = "".join([chunk async for chunk in resp.body_iterator])
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    sent = "".join(d["text"] for e, d in events if e == "token")
+    return events, sent
+
+async def test_banned_term_split_inside_holdback_never_reaches_client(fake_ollama, memory):
+    _ollama_stream(fake_ollama, ["Te escucho, Ana, ", TERM[:3], TERM[3:], " es algo que"])
+
+    events, sent = await _run("Estoy muy cansada")
+    assert sent == ""                                   # todo seguía retenido en la ventana
+    assert [e for e, _ in events] == ["crisis", "done"]
+    assert events[-1][1]["flagged"] and events[-1][1]["respuesta"] == ai.crisis_reply("Ana")
+    assert memory == [("user", "Estoy muy cansada"), ("assistant", ai.crisis_reply("Ana"))]
+
+async def test_banned_term_split_outside_holdback_is_cut_before_its_prefix_is_sent(fake_ollama, memory):
+    safe = "Gracias por contarme cómo te sientes, a veces el cansancio pesa mucho y cuesta pedir ayuda, "
+    assert len(safe) > ai.STREAM_HOLDBACK
+    # el término llega partido y seguido de mucho texto: queda lejos del final del buffer
+    _ollama_stream(fake_ollama, [safe, TERM[:2], TERM[2:] + " " + "y seguimos hablando " * 10])
+
+    events, sent = await _run("Estoy muy cansada")
+    assert sent and safe.startswith(sent)                # solo salió texto anterior al término
+    assert events[-2][0] == "crisis" and events[-1][1]["flagged"]
+    assert memory[-1] == ("assistant", ai.crisis_reply("Ana"))
+    assert all(safe not in text for _, text in memory)  # nunca la salida parcial
+
+async def test_crisis_input_skips_llm_and_remembers_crisis_text(fake_ollama, memory):
+    calls = _ollama_stream(fake_ollama, ["no debería generarse"])
+
+    events, sent = await _run(f"pienso en el {TERM}")
+    assert calls == [] and sent == ""
+    assert [e for e, _ in events] == ["crisis", "done"] and events[-1][1]["crisis"]
+    assert memory == [("user", f"pienso en el {TERM}"), ("assistant", ai.crisis_reply("Ana"))]
+
+async def test_clean_stream_is_fully_delivered_and_remembered(fake_ollama, memory):
+    _ollama_stream(fake_ollama, ["Respira conmigo, ", "Ana. Estoy aquí ", "para escucharte."])
+
+    events, sent = await _run("Tengo examen mañana")
+    assert sent == "Respira conmigo, Ana. Estoy aquí para escucharte."
+    assert not events[-1][1]["flagged"]
+    assert memory[-1] == ("assistant", "Respira conmigo, Ana. Estoy aquí para escucharte.")
@@ -0,0 +1,50 @@
+# backend/app/tests/test_sentence_pipeline.py
+import asyncio
+import pytest
+
+from app.services.sentence_pipeline import SentenceSplitter, ordered_pipeline
+
+def test_splitter_emits_complete_sentences_and_merges_short_ones():
+    sp = SentenceSplitter(min_chars=10)
+    out = []
+    for chunk in ["Hola. Respira ", "conmigo un momento. ¿Cómo te", " sientes hoy? Aquí", " estoy"]:
+        out += sp.feed(chunk)
+    assert out == ["Hola. Respira conmigo un momento.", "¿Cómo te sientes hoy?"]
+    assert sp.flush() == ["Aquí estoy"]
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_stages_concurrently_and_keeps_order():
+    async def source():
+        for s in ["uno", "dos", "tres"]:
+            await asyncio.sleep(0.01)
+            yield s
+
+    delays = {"uno": 0.08, "dos": 0.01, "tres": 0.03}
+    finished = []
+
+    async def stage(i, s):
+        await asyncio.sleep(delays[s])
+        finished.append(s)
+        return (i, s)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    out = [r async for r in ordered_pipeline(source(), stage)]
+    assert out == [(0, "uno"), (1, "dos"), (2, "tres")]
+    assert finished[0] == "dos"                       # se procesan a la vez…
+    assert loop.time() - start < 0.08 + 0.01 * 3 + 0.05   # …no en serie
+
+@pytest.mark.asyncio
+async def test_pipeline_propagates_source_errors_after_earlier_items():
+    async def source():
+        yield "ok"
+        raise RuntimeError("llm caído")
+
+    async def stage(i, s):
+        return s
+
+    got = []
+    with pytest.raises(RuntimeError):
+        async for r in ordered_pipeline(source(), stage):
+            got.append(r)
+    assert got == ["ok"]
@@ -0,0 +1,14 @@
+# backend/app/tests/test_session_cache.py
+from bson import ObjectId
+from app.services.session_cache import SessionCache
+
+def test_negative_entry_is_replaced_when_session_is_created():
+    cache = SessionCache(max_entries=10, ttl=60, negative_ttl=60)
+    oid = ObjectId()
+    assert cache.lookup(oid) is None
+    cache.remember(oid, False)
+    assert cache.lookup(oid) is False
+    cache.mark_created(oid)
+    assert cache.lookup(oid) is True
+    st = cache.stats()
+    assert st["hits"] == 2 and st["misses"] == 1 and st["negative_hits"] == 1
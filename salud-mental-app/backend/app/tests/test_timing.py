@@ -0,0 +1,53 @@
+# backend/app/tests/test_timing.py
+import pytest
+from fastapi.concurrency import run_in_threadpool
+
+from app.telemetry import timing
+from app.telemetry.metrics import histogram
+
+def test_span_is_noop_outside_a_request():
+    assert timing.start_request("/auth/login") is None
+    with timing.span("memory_read") as s:
+        pass
+    assert s is timing._NOOP
+
+@pytest.mark.asyncio
+async def test_spans_from_event_loop_and_threadpool_reach_the_header():
+    before = histogram("stage.memory_write").count
+    token = timing.start_request("/ai/respuestas")
+
+    def _write():
+        with timing.span("memory_write"):
+            pass
+
+    with timing.span("llm", "intento 1"):
+        await run_in_threadpool(_write)
+    header = timing.finish_request(token)
+    assert header.startswith('memory_write;dur=')
+    assert 'llm;dur=' in header and 'desc="intento 1"' in header
+    assert histogram("stage.memory_write").count == before + 1
+    assert timing._spans.get() is None
+
+@pytest.mark.asyncio
+async def test_spans_recorded_while_streaming_reach_histograms():
+    import asyncio
+    import contextvars
+
+    before = histogram("stage.tts").count
+    token = timing.start_request("/ai/respuestas/voz")
+    spans = timing.current_spans()
+    body_ctx = contextvars.copy_context()   # el cuerpo corre en la tarea de la app, con su copia del contexto
+
+    async def body():
+        with timing.span("tts"):
+            pass
+        yield b"event: done\n\n"
+
+    flushed = len(spans)
+    assert timing.finish_request(token) is None     # el header salió sin la etapa del cuerpo
+
+    async def consume():
+        return [chunk async for chunk in timing.observe_late_spans(body(), spans, flushed)]
+
+    assert await asyncio.get_running_loop().create_task(consume(), context=body_ctx) == [b"event: done\n\n"]
+    assert histogram("stage.tts").count == before + 1
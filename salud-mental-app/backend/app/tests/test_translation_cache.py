@@ -0,0 +1,21 @@
+# backend/app/tests/test_translation_cache.py
+import time
+from app.services.cache import TTLCache
+from app.services.translation_cache import cache_key
+
+def test_ttl_cache_lru_and_expiry():
+    c = TTLCache(max_entries=2, ttl=60)
+    c.set("a", 1); c.set("b", 2)
+    assert c.get("a") == 1          # "a" pasa a ser el más reciente
+    c.set("c", 3)                   # expulsa "b"
+    assert c.get("b") is None and c.get("c") == 3
+    c.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert c.get("d") is None
+    st = c.stats()
+    assert st["evictions"] >= 1 and st["expirations"] == 1 and 0 < st["hit_rate"] < 1
+
+def test_cache_key_normalizes_whitespace_but_not_case():
+    assert cache_key("Hola   amigo ", "m") == cache_key("Hola amigo", "m")
+    assert cache_key("Hola amigo", "m") != cache_key("hola amigo", "m")
+    assert cache_key("Hola amigo", "m1") != cache_key("Hola amigo", "m2")
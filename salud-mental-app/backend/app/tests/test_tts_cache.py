@@ -0,0 +1,148 @@
+# backend/app/tests/test_tts_cache.py
+import asyncio
+import pytest
+from app.services.tts_cache import AudioCache, audio_key
+
+pytestmark = pytest.mark.asyncio
+
+async def test_identical_synthesis_is_merged_and_cached(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10_000)
+    calls = []
+
+    async def synth():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return b"audio"
+
+    datas = await asyncio.gather(*[cache.get_or_synthesize("hola", "shimmer", "mp3", "m", synth) for _ in range(4)])
+    assert len(calls) == 1 and set(datas) == {b"audio"}
+
+    await cache.get_or_synthesize("hola", "shimmer", "mp3", "m", synth)
+    assert len(calls) == 1 and cache.hits == 1
+
+async def test_size_cap_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10)
+
+    async def synth():
+        return b"12345"
+
+    await cache.get_or_synthesize("a", "v", "mp3", "m", synth)
+    await cache.get_or_synthesize("b", "v", "mp3", "m", synth)
+    await cache.get_or_synthesize("a", "v", "mp3", "m", synth)   # "a" pasa a más reciente
+    await cache.get_or_synthesize("c", "v", "mp3", "m", synth)   # expulsa "b"
+    assert cache.path_for(audio_key("a", "v", "mp3", "m"), "mp3").exists()
+    assert cache.evictions == 1 and cache.stats()["bytes"] == 10
+
+async def test_open_file_survives_eviction_and_missing_file_is_a_miss(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=5)
+    key = audio_key("a", "v", "mp3", "m")
+    cache.store(key, "mp3", b"12345")
+    f = cache.open(key, "mp3")
+    cache.store(audio_key("b", "v", "mp3", "m"), "mp3", b"67890")   # expulsa y borra "a"
+    assert not cache.path_for(key, "mp3").exists()
+    with f:
+        assert f.read() == b"12345"      # el descriptor abierto sigue leyendo
+    assert cache.open(key, "mp3") is None
+
+    other = audio_key("b", "v", "mp3", "m")
+    cache.path_for(other, "mp3").unlink()  # borrado externo
+    assert cache.open(other, "mp3") is None and cache.stats()["files"] == 0
+
+async def test_stream_fill_forwards_chunks_and_caches_only_complete_streams(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10_000)
+
+    async def upstream():
+        for part in (b"au", b"di", b"o"):
+            await asyncio.sleep(0)
+            yield part
+
+    key = audio_key("hola", "v", "mp3", "m")
+    done = cache.claim(key)
+    assert cache.claim(key) is None       # la llave ya está reservada
+    reader = asyncio.ensure_future(cache.get_or_synthesize("hola", "v", "mp3", "m", None))
+    assert [c async for c in cache.stream_fill(key, "mp3", upstream(), done)] == [b"au", b"di", b"o"]
+    assert await reader == b"audio"       # esperó al stream en lugar de sintetizar otra vez
+    with cache.open(key, "mp3") as f:
+        assert f.read() == b"audio"
+
+    cut_key = audio_key("corto", "v", "mp3", "m")
+    stream = cache.stream_fill(cut_key, "mp3", upstream(), cache.claim(cut_key))
+    assert await stream.__anext__() == b"au"
+    await stream.aclose()                  # el cliente se fue a media descarga
+    assert cache.open(cut_key, "mp3") is None and not cache.busy(cut_key)
+    assert not list(tmp_path.glob(".tmp-*"))
+
+async def test_tts_bytes_streams_miss_then_serves_ranges_from_cache(tmp_path, monkeypatch):
+    from contextlib import asynccontextmanager
+    from types import SimpleNamespace
+    from starlette.requests import Request
+    import app.routes.ai as ai
+
+    calls = []
+
+    class _Resp:
+        async def iter_bytes(self, size):
+            for part in (b"0123", b"4567", b"89"):
+                yield part
+
+    @asynccontextmanager
+    async def create(**kw):
+        calls.append(kw)
+        yield _Resp()
+
+    fake = SimpleNamespace(audio=SimpleNamespace(speech=SimpleNamespace(
+        with_streaming_response=SimpleNamespace(create=create))))
+    monkeypatch.setattr(ai, "require_async_openai", lambda: fake)
+    monkeypatch.setattr(ai, "audio_cache", AudioCache(str(tmp_path), max_bytes=10_000))
+
+    def _req(headers=()):
+        return Request({"type": "http", "method": "POST", "path": "/ai/tts_bytes", "query_string": b"",
+                        "headers": [(k.encode(), v.encode()) for k, v in headers]})
+
+    async def _body(resp):
+        return b"".join([c if isinstance(c, bytes) else c.encode() async for c in resp.body_iterator])
+
+    payload = {"text": "Hola", "voice": "shimmer", "format": "mp3"}
+    miss = await ai.tts_bytes(_req(), payload)
+    assert await _body(miss) == b"0123456789" and len(calls) == 1
+
+    part = await ai.tts_bytes(_req([("range", "bytes=2-5")]), payload)
+    assert part.status_code == 206 and part.headers["content-range"] == "bytes 2-5/10"
+    assert await _body(part) == b"2345" and len(calls) == 1
+
+    etag = miss.headers["etag"]
+    assert (await ai.tts_bytes(_req([("if-none-match", etag)]), payload)).status_code == 304
+
+async def test_concurrent_tts_bytes_misses_make_one_upstream_call(tmp_path, monkeypatch):
+    from contextlib import asynccontextmanager
+    from types import SimpleNamespace
+    from starlette.requests import Request
+    import app.routes.ai as ai
+
+    calls = []
+
+    class _Resp:
+        async def iter_bytes(self, size):
+            for part in (b"0123", b"4567", b"89"):
+                await asyncio.sleep(0.01)
+                yield part
+
+    @asynccontextmanager
+    async def create(**kw):
+        calls.append(kw)
+        await asyncio.sleep(0.01)
+        yield _Resp()
+
+    fake = SimpleNamespace(audio=SimpleNamespace(speech=SimpleNamespace(
+        with_streaming_response=SimpleNamespace(create=create))))
+    monkeypatch.setattr(ai, "require_async_openai", lambda: fake)
+    monkeypatch.setattr(ai, "audio_cache", AudioCache(str(tmp_path), max_bytes=10_000))
+
+    async def _get():
+        req = Request({"type": "http", "method": "POST", "path": "/ai/tts_bytes", "query_string": b"",
+                       "headers": []})
+        resp = await ai.tts_bytes(req, {"text": "Hola", "voice": "shimmer", "format": "mp3"})
+        return b"".join([c if isinstance(c, bytes) else c.encode() async for c in resp.body_iterator])
+
+    bodies = await asyncio.gather(*[_get() for _ in range(5)])
+    assert bodies == [b"0123456789"] * 5 and len(calls) == 1
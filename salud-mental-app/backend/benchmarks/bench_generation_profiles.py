@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_generation_profiles.py
+"""
+Benchmark de los perfiles de generación (services/generation_profiles) por endpoint.
+Compara generación sin límites contra el perfil (num_predict + stop + corte por oraciones):
+tokens generados por respuesta y latencia p50/p95.
+
+Uso (desde backend/):
+  python -m benchmarks.bench_generation_profiles [--requests 30] [--concurrency 4]
+      Ollama simulado (benchmarks/fake_backends) con respuestas largas (--reply-tokens).
+  python -m benchmarks.bench_generation_profiles --host http://127.0.0.1:11434 --model llama3.1:8b
+      Ollama real.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.routes.ai import (  # noqa: E402
+    MODEL_DEFAULT, SYSTEM_PREFIX, TEMPLATE_EEA, TEMPLATE_MINDFULLNESS, TEMPLATE_RESPUESTAS,
+    TEMPLATE_SALUDO, prefix_lang_instruction,
+)
+from app.services.generation_profiles import PROFILES, generate_with_profile  # noqa: E402
+from app.services.ollama_client import OllamaClient  # noqa: E402
+from benchmarks.fake_backends import FakeProfile, ServerThread, ollama_app  # noqa: E402
+
+LANG = prefix_lang_instruction("es-MX")
+PROMPTS = {
+    "saludos": TEMPLATE_SALUDO.format(lang_prefix=LANG, memoria="(sin mensajes previos)", name="Ana"),
+    "respuestas": TEMPLATE_RESPUESTAS.format(lang_prefix=LANG, memoria="(sin mensajes previos)",
+                                             contexto="Nombre: Ana. Mensaje: Tengo examen mañana y estoy nerviosa."),
+    "mindfullness": TEMPLATE_MINDFULLNESS.format(lang_prefix=LANG, memoria="(sin mensajes previos)",
+                                                 contexto="Nombre: Ana. Ansiedad antes de dormir."),
+    "eea": TEMPLATE_EEA.format(lang_prefix=LANG, contexto="Nombre: Ana. Paso 1 de 4."),
+}
+
+async def _run(client: OllamaClient, model: str, endpoint: str, shaped: bool, n: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    profile = PROFILES[endpoint] if shaped else None
+
+    async def _one():
+        async with sem:
+            start = time.perf_counter()
+            data = await generate_with_profile(client, model, PROMPTS[endpoint], profile, endpoint,
+                                               system=SYSTEM_PREFIX)
+            return time.perf_counter() - start, data.get("eval_count", 0)
+
+    rows = await asyncio.gather(*(_one() for _ in range(n)))
+    return [r[0] for r in rows], [r[1] for r in rows]
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default=None, help="Ollama real; por defecto uno simulado")
+    ap.add_argument("--model", default=MODEL_DEFAULT)
+    ap.add_argument("--requests", type=int, default=30)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--reply-tokens", type=int, default=150, help="largo medio de la respuesta simulada")
+    args = ap.parse_args()
+
+    fake = None
+    if args.host is None:
+        fake = ServerThread(ollama_app(FakeProfile(reply_tokens=args.reply_tokens, flag_rate=0.0))).start()
+    client = OllamaClient(args.host or fake.url)
+    try:
+        await client.load(args.model)
+        print(f"{'endpoint':>12} | {'modo':>8} | {'tokens':>7} | {'p50 ms':>8} | {'p95 ms':>8}")
+        for endpoint in PROFILES:
+            for shaped in (False, True):
+                lat, tokens = await _run(client, args.model, endpoint, shaped, args.requests, args.concurrency)
+                print(f"{endpoint:>12} | {'perfil' if shaped else 'libre':>8} | {statistics.mean(tokens):>7.0f} | "
+                      f"{_pct(lat, .5):>8.0f} | {_pct(lat, .95):>8.0f}")
+    finally:
+        await client.aclose()
+        if fake:
+            fake.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
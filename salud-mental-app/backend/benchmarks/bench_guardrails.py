@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_guardrails.py
+"""
+Benchmark del motor de guardrails.
+Compara el chequeo anterior (normalizar la lista completa + `any(t in texto)` por llamada)
+contra el autómata Aho-Corasick, creciendo la lista de términos hasta miles de entradas.
+
+Uso (desde backend/):  python -m benchmarks.bench_guardrails [--texts 2000]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.guardrails import BANNED_TERMS, GuardrailMatcher, normalize  # noqa: E402
+
+SIZES = [len(BANNED_TERMS), 256, 1024, 4096, 8192]
+
+SAMPLE = (
+    "Hoy me siento cansada, el trabajo me tiene agotada y no duermo bien. "
+    "Quisiera encontrar la forma de relajarme un poco antes de dormir, "
+    "¿me ayudas con un ejercicio de respiración? "
+)
+
+def _synthetic_terms(n: int, rnd: random.Random) -> list[str]:
+    terms = list(BANNED_TERMS)
+    while len(terms) < n:
+        words = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 9))) for _ in range(rnd.randint(1, 3))]
+        terms.append(" ".join(words))
+    return terms[:n]
+
+def _naive_contains(text: str, terms: list[str]) -> bool:
+    norm = normalize(text)
+    banned_norm = [normalize(t) for t in terms]
+    return any(t in norm for t in banned_norm)
+
+def _bench(fn, texts) -> float:
+    start = time.perf_counter()
+    for t in texts:
+        fn(t)
+    return len(texts) / (time.perf_counter() - start)
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=2000)
+    args = ap.parse_args()
+
+    rnd = random.Random(42)
+    texts = [SAMPLE * rnd.randint(1, 4) for _ in range(args.texts)]
+
+    print(f"{'términos':>9} | {'build ms':>9} | {'naive txt/s':>12} | {'automata txt/s':>14} | {'speedup':>8}")
+    for size in SIZES:
+        terms = _synthetic_terms(size, rnd)
+        t0 = time.perf_counter()
+        matcher = GuardrailMatcher({"banned": terms})
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        # el naive es O(n_terms) por texto: se acota la muestra para que termine rápido
+        naive_sample = texts[: max(20, args.texts * 64 // size)]
+        naive = _bench(lambda t: _naive_contains(t, terms), naive_sample)
+        fast = _bench(lambda t: matcher.has_flag(t, "banned"), texts)
+        print(f"{size:>9} | {build_ms:>9.1f} | {naive:>12.0f} | {fast:>14.0f} | {fast / naive:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
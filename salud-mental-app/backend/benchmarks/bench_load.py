@@ -0,0 +1,186 @@
+# backend/benchmarks/bench_load.py
+"""
+Prueba de carga de /ai/* contra Ollama y OpenAI simulados (benchmarks/fake_backends).
+Levanta los servidores falsos y la app real (uvicorn, cada uno en su hilo), genera tráfico
+concurrente con una mezcla de endpoints y reporta p50/p95/p99, throughput, errores
+y saturación del threadpool de AnyIO (muestreado dentro del loop de la app).
+
+Uso (desde backend/, con MongoDB accesible en MONGO_URI):
+  python -m benchmarks.bench_load --concurrency 32 --duration 30 \\
+      --mix saludos=5,respuestas=4,tts=1 --flag-rate 0.1 --tokens-per-s 40
+  --ollama-hosts N levanta N Ollamas falsos detrás de un OllamaPool (escalado horizontal).
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.fake_backends import FakeProfile, ServerThread, ollama_app, openai_app  # noqa: E402
+
+MESSAGES = [
+    "Hoy me siento muy cansada.", "Tengo examen mañana y estoy nerviosa.",
+    "Discutí con mi mamá.", "No duermo bien.", "Me cuesta concentrarme.",
+]
+NAMES = ["Ana", "Luis", "Sofía", "Diego", "Valeria"]
+
+def _parse_mix(raw: str) -> dict:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"saludos", "respuestas", "stream", "tts"}
+    if unknown:
+        raise SystemExit(f"endpoints desconocidos en --mix: {sorted(unknown)}")
+    return mix
+
+def _request(kind: str, lang: str, rnd: random.Random, tts_pool: int):
+    if kind == "saludos":
+        return "GET", "/ai/saludos", {"params": {"name": rnd.choice(NAMES), "lang": lang}}
+    if kind == "respuestas":
+        return "GET", "/ai/respuestas", {"params": {"name": rnd.choice(NAMES), "lang": lang,
+                                                    "interaccion": rnd.choice(MESSAGES)}}
+    if kind == "stream":
+        return "GET", "/ai/respuestas/stream", {"params": {"name": rnd.choice(NAMES), "lang": lang,
+                                                           "interaccion": rnd.choice(MESSAGES)}}
+    text = f"Respira conmigo, ejercicio número {rnd.randrange(tts_pool)}."
+    return "POST", "/ai/tts_bytes", {"json": {"text": text, "format": "mp3"}}
+
+async def _sample_threadpool(stop: asyncio.Event, samples: list, interval: float = 0.05) -> None:
+    """Corre DENTRO del loop de la app: el limitador de hilos es por loop."""
+    from anyio import to_thread
+    limiter = to_thread.current_default_thread_limiter()
+    while not stop.is_set():
+        st = limiter.statistics()
+        samples.append((st.borrowed_tokens, st.total_tokens, st.tasks_waiting))
+        await asyncio.sleep(interval)
+
+def _pct(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+def _report(results: dict, elapsed: float, pool: list, metrics: dict) -> None:
+    print(f"\n{'endpoint':>11} | {'n':>6} | {'err':>5} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'req/s':>7}")
+    total = 0
+    for kind, rows in sorted(results.items()):
+        ok = [d for d, status in rows if status < 400]
+        err = len(rows) - len(ok)
+        total += len(rows)
+        if ok:
+            print(f"{kind:>11} | {len(rows):>6} | {err:>5} | {_pct(ok, .5):>8.0f} | {_pct(ok, .95):>8.0f} | "
+                  f"{_pct(ok, .99):>8.0f} | {len(rows) / elapsed:>7.1f}")
+        else:
+            print(f"{kind:>11} | {len(rows):>6} | {err:>5} | {'-':>8} | {'-':>8} | {'-':>8} | {len(rows) / elapsed:>7.1f}")
+    print(f"\nthroughput total: {total / elapsed:.1f} req/s en {elapsed:.1f}s")
+
+    codes = defaultdict(int)
+    for rows in results.values():
+        for _, status in rows:
+            codes[status] += 1
+    print("status:", dict(sorted(codes.items())))
+
+    if pool:
+        busy = [b / t for b, t, _ in pool if t]
+        print(f"threadpool: uso medio {statistics.mean(busy):.0%}, máx {max(b for b, _, _ in pool)}/{pool[0][1]} hilos, "
+              f"saturado {sum(1 for b, t, _ in pool if b >= t) / len(pool):.0%} del tiempo, "
+              f"máx en espera {max(w for _, _, w in pool)}")
+    for host, st in (metrics.get("ollama_pool") or {}).items():
+        print(f"ollama[{host}]: requests={st['requests']} errors={st['errors']} healthy={st['healthy']}")
+    sched = (metrics.get("llm_scheduler") or {}).get("models", {})
+    for model, st in sched.items():
+        print(f"llm_scheduler[{model}]: admitted={st['admitted']} rejected={st['rejected']} timeouts={st['timeouts']}")
+
+async def _drive(base_url: str, args, mix: dict) -> dict:
+    results = defaultdict(list)
+    kinds, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def _user(seed: int) -> None:
+            rnd = random.Random(seed)
+            while time.perf_counter() < deadline:
+                kind = rnd.choices(kinds, weights)[0]
+                method, path, kw = _request(kind, args.lang, rnd, args.tts_pool)
+                start = time.perf_counter()
+                try:
+                    r = await client.request(method, path, **kw)
+                    await r.aread()
+                    status = r.status_code
+                except httpx.HTTPError:
+                    status = 599
+                results[kind].append((time.perf_counter() - start, status))
+
+        await asyncio.gather(*(_user(i) for i in range(args.concurrency)))
+        metrics = (await client.get("/ai/metrics")).json()
+        metrics["ollama_pool"] = (await client.get("/health")).json().get("ollama")
+    return {"results": results, "metrics": metrics}
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--mix", default="saludos=4,respuestas=5,tts=1")
+    ap.add_argument("--lang", default="es-MX")
+    ap.add_argument("--tts-pool", type=int, default=50, help="frases distintas para TTS (aciertos de caché)")
+    ap.add_argument("--ttft", type=float, default=FakeProfile.ttft)
+    ap.add_argument("--tokens-per-s", type=float, default=FakeProfile.tokens_per_s)
+    ap.add_argument("--reply-tokens", type=int, default=FakeProfile.reply_tokens)
+    ap.add_argument("--flag-rate", type=float, default=FakeProfile.flag_rate)
+    ap.add_argument("--openai-latency", type=float, default=FakeProfile.openai_latency)
+    ap.add_argument("--tts-latency", type=float, default=FakeProfile.tts_latency)
+    ap.add_argument("--ollama-hosts", type=int, default=1, help="servidores Ollama falsos en el pool")
+    args = ap.parse_args()
+    mix = _parse_mix(args.mix)
+
+    profile = FakeProfile(ttft=args.ttft, tokens_per_s=args.tokens_per_s, reply_tokens=args.reply_tokens,
+                          flag_rate=args.flag_rate, openai_latency=args.openai_latency,
+                          tts_latency=args.tts_latency)
+    fake_ollamas = [ServerThread(ollama_app(profile)).start() for _ in range(args.ollama_hosts)]
+    fake_openai = ServerThread(openai_app(profile)).start()
+
+    # La app lee .env con override=True: los clientes se fijan aquí, antes del lifespan
+    # (connect_ollama reutiliza el cliente existente; require_async_openai también).
+    from openai import AsyncOpenAI
+    import app.routes.ai as ai
+    import app.services.ollama_client as oc
+    from app.main import app
+    from app.services.tts_cache import AudioCache
+
+    oc._client = oc.OllamaPool([oc.OllamaClient(f.url) for f in fake_ollamas])
+    ai.OPENAI_KEY = "fake"
+    ai._openai_async = AsyncOpenAI(api_key="fake", base_url=f"{fake_openai.url}/v1")
+    ai.audio_cache = AudioCache(Path(tempfile.mkdtemp(prefix="tts-bench-")))
+
+    server = ServerThread(app).start()
+    for name in ("uvicorn.info", "app.http", "httpx"):   # el log por petición distorsiona la medición
+        logging.getLogger(name).setLevel(logging.WARNING)
+    pool: list = []
+    stop = asyncio.Event()
+    sampler = asyncio.run_coroutine_threadsafe(_sample_threadpool(stop, pool), server.loop)
+    try:
+        print(f"carga: {args.concurrency} usuarios × {args.duration:.0f}s, mezcla {mix}, lang={args.lang}, "
+              f"{args.ollama_hosts} host(s) Ollama")
+        start = time.perf_counter()
+        out = asyncio.run(_drive(server.url, args, mix))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.loop.call_soon_threadsafe(stop.set)
+        sampler.result(timeout=5)
+        server.stop()
+        for f in fake_ollamas:
+            f.stop()
+        fake_openai.stop()
+    _report(out["results"], elapsed, pool, out["metrics"])
+
+if __name__ == "__main__":
+    main()
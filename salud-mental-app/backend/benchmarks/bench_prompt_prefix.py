@@ -0,0 +1,92 @@
+# backend/benchmarks/bench_prompt_prefix.py
+"""
+Benchmark del prefijo de sistema estable contra un Ollama real.
+Compara el layout anterior (reglas + lista de términos prohibidos incrustadas a mitad del prompt)
+contra SYSTEM_PREFIX en el campo `system` + sufijo variable, con mensajes distintos en cada petición.
+Mide prompt_eval_count / prompt_eval_duration que reporta Ollama (num_predict=1 para aislar el prefill).
+
+Uso (desde backend/):  python -m benchmarks.bench_prompt_prefix [--model llama3.1:8b] [--requests 20]
+Requiere OLLAMA_HOST accesible.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.routes.ai import (  # noqa: E402
+    MODEL_DEFAULT, SYSTEM_PREFIX, TEMPLATE_RESPUESTAS, banned_terms, prefix_lang_instruction,
+)
+from app.services.ollama_client import OllamaClient  # noqa: E402
+
+# Plantilla previa: todo en el prompt, con la parte estática después de la memoria
+LEGACY_TEMPLATE = """
+{lang_prefix}
+Actúa como acompañante emocional breve y empático. Responde en 1–3 frases, sin Markdown.
+Adáptate exactamente al mensaje. Si hace una pregunta, respóndela primero y añade un micro-paso práctico
+(respiración corta, anclaje, o sugerir hablar con alguien de confianza).
+Termina con una pregunta abierta breve para continuar la conversación.
+
+Memoria (últimos turnos):
+{memoria}
+
+REGLA DE SEGURIDAD:
+No menciones términos de autolesión/suicidio:
+{lista_prohibidas}
+
+REGLA ANTI-RECHAZO:
+Nunca uses negativas del tipo "no puedo..." ni similares.
+
+Contexto y mensaje actual: {contexto}
+"""
+
+MESSAGES = [
+    "Hoy me siento muy cansada y no sé por qué.",
+    "Tengo examen mañana y estoy nerviosa.",
+    "Discutí con mi mamá y me siento mal.",
+    "No puedo dormir bien desde hace días.",
+    "Me cuesta concentrarme en el trabajo.",
+]
+
+def _memoria(i: int) -> str:
+    return f"Usuario: mensaje previo {i}\nAsistente: respuesta previa {i}"
+
+async def _run(client: OllamaClient, model: str, n: int, split: bool):
+    evals, counts = [], []
+    for i in range(n):
+        msg = MESSAGES[i % len(MESSAGES)] + f" (#{i})"
+        kw = {"lang_prefix": prefix_lang_instruction("es-MX"), "memoria": _memoria(i),
+              "contexto": f"Nombre: Ana. Mensaje: {msg}"}
+        if split:
+            data = await client.generate(model, TEMPLATE_RESPUESTAS.format(**kw), system=SYSTEM_PREFIX,
+                                         options={"num_predict": 1})
+        else:
+            data = await client.generate(model, LEGACY_TEMPLATE.format(lista_prohibidas=", ".join(banned_terms), **kw),
+                                         options={"num_predict": 1})
+        evals.append(data.get("prompt_eval_duration", 0) / 1e6)
+        counts.append(data.get("prompt_eval_count", 0))
+    return evals[1:], counts[1:]   # la primera petición de cada layout siempre evalúa todo
+
+def _report(label: str, evals, counts) -> None:
+    print(f"{label:>8} | {statistics.mean(counts):>10.0f} | {statistics.median(evals):>12.1f} | "
+          f"{statistics.mean(evals):>12.1f}")
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default=MODEL_DEFAULT)
+    ap.add_argument("--requests", type=int, default=20)
+    args = ap.parse_args()
+
+    client = OllamaClient()
+    try:
+        await client.load(args.model)
+        print(f"{'layout':>8} | {'tokens eval':>10} | {'p50 eval ms':>12} | {'avg eval ms':>12}")
+        _report("inline", *await _run(client, args.model, args.requests, split=False))
+        _report("system", *await _run(client, args.model, args.requests, split=True))
+    finally:
+        await client.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+# backend/benchmarks/fake_backends.py
+"""
+Servidores locales que imitan a Ollama y a OpenAI para pruebas de carga.
+- Ollama: POST /api/generate (con y sin stream, carga con prompt vacío), GET /api/tags y /api/ps.
+- OpenAI: POST /v1/chat/completions (incluye modo JSON del lote de traducción), POST /v1/audio/speech.
+- Perfil configurable: latencia hasta el primer token, tokens/s, largo de respuesta,
+  fracción de salidas "marcadas" (frase de rechazo que los guardrails deben atrapar),
+  latencia y tamaño del audio TTS.
+Cada servidor corre en su propio hilo con su propio event loop (ServerThread),
+así no compiten por el loop de la app bajo prueba.
+"""
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+REPLY_WORDS = (
+    "Gracias por contarme cómo te sientes. Respira conmigo: inhala en cuatro tiempos, "
+    "sostén cuatro y exhala en seis. Estoy aquí para acompañarte con calma. "
+    "¿Qué te ayudaría un poco en este momento?"
+).split()
+FLAGGED_REPLY = "No puedo ayudar con eso."
+
+@dataclass
+class FakeProfile:
+    ttft: float = 0.15            # s hasta el primer token (prefill + cola)
+    tokens_per_s: float = 40.0    # velocidad de decodificación
+    reply_tokens: int = 60        # tokens por respuesta (media)
+    flag_rate: float = 0.05       # fracción de respuestas con frase de rechazo
+    openai_latency: float = 0.3   # s por chat.completions
+    tts_latency: float = 0.5      # s por audio.speech
+    tts_bytes: int = 40_000       # tamaño del audio devuelto
+
+def _reply(profile: FakeProfile, rnd: random.Random) -> list:
+    if rnd.random() < profile.flag_rate:
+        return FLAGGED_REPLY.split()
+    n = max(5, int(rnd.gauss(profile.reply_tokens, profile.reply_tokens * 0.2)))
+    return [REPLY_WORDS[i % len(REPLY_WORDS)] for i in range(n)]
+
+def ollama_app(profile: FakeProfile) -> FastAPI:
+    app = FastAPI()
+    rnd = random.Random(7)
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "llama3.1:8b"}]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": "llama3.1:8b", "model": "llama3.1:8b"}]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        if not body.get("prompt"):
+            return {"model": body.get("model"), "response": "", "done": True, "load_duration": 0}
+        words = _reply(profile, rnd)
+        prompt_tokens = len((body.get("system") or "") + body["prompt"]) // 4
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if num_predict:
+            words = words[:num_predict]
+        meta = {"prompt_eval_count": prompt_tokens, "eval_count": len(words),
+                "prompt_eval_duration": int(profile.ttft * 1e9),
+                "eval_duration": int(len(words) / profile.tokens_per_s * 1e9)}
+
+        if not body.get("stream", True):
+            await asyncio.sleep(profile.ttft + len(words) / profile.tokens_per_s)
+            return {"model": body["model"], "response": " ".join(words), "done": True, **meta}
+
+        async def _lines():
+            await asyncio.sleep(profile.ttft)
+            for w in words:
+                yield json.dumps({"model": body["model"], "response": w + " ", "done": False}) + "\n"
+                await asyncio.sleep(1 / profile.tokens_per_s)
+            yield json.dumps({"model": body["model"], "response": "", "done": True, **meta}) + "\n"
+
+        return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+    return app
+
+_TEXTS_RE = re.compile(r"Textos: (\[.*\])\s*$", re.S)
+
+def openai_app(profile: FakeProfile) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        await asyncio.sleep(profile.openai_latency)
+        user = body["messages"][-1]["content"]
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            m = _TEXTS_RE.search(user)
+            texts = json.loads(m.group(1)) if m else []
+            content = json.dumps({"traducciones": [f"nah: {t}" for t in texts]}, ensure_ascii=False)
+        else:
+            content = "nah: " + user.rsplit("Texto:", 1)[-1].strip()
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(user) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(user) + len(content)) // 4},
+        }
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request):
+        await request.json()
+        await asyncio.sleep(profile.tts_latency)
+        return Response(b"\xff\xfb" + b"\x00" * (profile.tts_bytes - 2), media_type="audio/mpeg")
+
+    return app
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ServerThread:
+    """Corre una app ASGI con uvicorn en un hilo propio (loop propio)."""
+    def __init__(self, app, port: int = 0):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port,
+                                                    log_level="warning", lifespan="on"))
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self, timeout: float = 30) -> "ServerThread":
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"el servidor en {self.url} no arrancó")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=10)